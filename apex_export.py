@@ -0,0 +1,470 @@
+'''
+Streaming export of Apex tables to local snapshots (.csv, .npz, .parquet or .feather), and
+incremental sync of csv snapshots against the server.
+
+    python apex_export.py [table] [out_path]
+    python apex_export.py sync [--reconcile] [table ...]
+'''
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select, or_
+
+from emnengr.apex.emnphysprop2 import ChemInfo, Databank, BinCoeffSet, BinCoeff, ConstValueData, ApexSession
+
+EXPORT_TABLES = {
+    'ChemInfo': ChemInfo,
+    'Databank': Databank,
+    'BinCoeffSet': BinCoeffSet,
+    'BinCoeff': BinCoeff,
+    'ConstValueData': ConstValueData,
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _get_table(table_name):
+    if table_name not in EXPORT_TABLES:
+        raise ValueError(f'unknown Apex table {table_name}.  choose from {list(EXPORT_TABLES)}')
+    return EXPORT_TABLES[table_name].__table__
+
+
+def iter_table_chunks(session, table_name, chunk_size=DEFAULT_CHUNK_SIZE, where=None):
+    # server-side cursor: rows arrive chunk_size at a time instead of the whole table at once
+    table = _get_table(table_name)
+    query = select(table).order_by(*table.primary_key.columns)
+    if where is not None:
+        query = query.where(where)
+    connection = session.connection().execution_options(stream_results=True, yield_per=chunk_size)
+    result = connection.execute(query)
+    for partition in result.partitions(chunk_size):
+        yield [tuple(row) for row in partition]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _ErrorLog:
+    # per-row failures go to a side file (created on first error) instead of the console; a log
+    # left by an earlier run is removed up front so a clean run leaves none behind
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        _remove(path)
+
+    def record(self, row_index, row, error):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self.count += 1
+        self._file.write(json.dumps({'row': row_index, 'values': [repr(v) for v in row], 'error': repr(error)}) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class _CsvSink:
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows, first_index, errors):
+        for offset, row in enumerate(rows):
+            try:
+                self._writer.writerow(row)
+            except Exception as e:
+                errors.record(first_index + offset, row, e)
+
+    def close(self):
+        self._file.close()
+
+
+class _NpzSink:
+    # npz cannot be appended to, so columns are accumulated and written once at close
+
+    def __init__(self, path, columns):
+        self._path = path
+        self._columns = columns
+        self._values = [[] for _ in columns]
+
+    def write(self, rows, first_index, errors):
+        for offset, row in enumerate(rows):
+            if len(row) != len(self._columns):
+                errors.record(first_index + offset, row, ValueError('column count mismatch'))
+                continue
+            for values, value in zip(self._values, row):
+                values.append(value)
+
+    def close(self):
+        arrays = {}
+        for column, values in zip(self._columns, self._values):
+            if len(values) > 0 and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+                arrays[column] = np.array(values, dtype=np.int64)
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values if v is not None):
+                arrays[column] = np.array([np.nan if v is None else v for v in values], dtype=float)
+            else:
+                arrays[column] = np.array(['' if v is None else str(v) for v in values], dtype=str)
+        with open(self._path, 'wb') as npz_file:
+            np.savez_compressed(npz_file, **arrays)
+
+
+class _ArrowSink:
+    # parquet and feather (arrow ipc) are both written one record batch per chunk
+
+    def __init__(self, path, columns, file_format):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(f'pyarrow is required for {file_format} export')
+        self._pa = pa
+        self._path = path
+        self._columns = columns
+        self._format = file_format
+        self._writer = None
+
+    def write(self, rows, first_index, errors):
+        pa = self._pa
+        good_rows = []
+        for offset, row in enumerate(rows):
+            if len(row) != len(self._columns):
+                errors.record(first_index + offset, row, ValueError('column count mismatch'))
+            else:
+                good_rows.append(row)
+        if len(good_rows) == 0:
+            return
+        try:
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(list(values)) for values in zip(*good_rows)], names=self._columns
+            )
+            if self._writer is not None:
+                batch = batch.cast(self._writer.schema)
+        except Exception as e:
+            for offset, row in enumerate(good_rows):
+                errors.record(first_index + offset, row, e)
+            return
+        if self._writer is None:
+            if self._format == 'parquet':
+                self._writer = pa.parquet.ParquetWriter(self._path, batch.schema)
+            else:
+                self._writer = pa.ipc.new_file(self._path, batch.schema)
+        if self._format == 'parquet':
+            self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _open_sink(path, columns):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return _CsvSink(path, columns)
+    if extension == '.npz':
+        return _NpzSink(path, columns)
+    if extension == '.parquet':
+        return _ArrowSink(path, columns, 'parquet')
+    if extension in ('.feather', '.arrow'):
+        return _ArrowSink(path, columns, 'feather')
+    raise ValueError(f'unsupported export format {extension}.  use .csv, .npz, .parquet or .feather')
+
+
+def export_table(table_name, out_path, chunk_size=DEFAULT_CHUNK_SIZE, session=None, error_path=None):
+    '''
+    Stream an Apex table to out_path (.csv, .npz, .parquet or .feather) in primary key order.
+    The file is written under a temporary name and moved into place when complete (and removed
+    if the export fails); rows that cannot be written are recorded in error_path (default
+    <out_path>.errors.jsonl), which is replaced on every run.
+    '''
+    columns = _get_table(table_name).columns.keys()
+    root, extension = os.path.splitext(out_path)
+    tmp_path = f'{root}.tmp{extension}'
+    errors = _ErrorLog(error_path or f'{out_path}.errors.jsonl')
+    start = time.perf_counter()
+    n_rows = 0
+    try:
+        sink = _open_sink(tmp_path, columns)
+        try:
+            if session is None:
+                with ApexSession() as session:
+                    for rows in iter_table_chunks(session, table_name, chunk_size):
+                        sink.write(rows, n_rows, errors)
+                        n_rows += len(rows)
+            else:
+                for rows in iter_table_chunks(session, table_name, chunk_size):
+                    sink.write(rows, n_rows, errors)
+                    n_rows += len(rows)
+        finally:
+            try:
+                sink.close()
+            finally:
+                errors.close()
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        # never leave a half-written snapshot behind; out_path keeps its previous contents
+        _remove(tmp_path)
+        raise
+    return {
+        'table': table_name,
+        'path': out_path,
+        'rows': n_rows,
+        'errors': errors.count,
+        'elapsed_s': time.perf_counter() - start,
+    }
+
+
+def _column_type(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = str
+    if python_type not in (int, float, datetime.datetime, datetime.date):
+        python_type = str
+    return python_type
+
+
+def _key_type(table_name):
+    key_columns = list(_get_table(table_name).primary_key.columns)
+    if len(key_columns) != 1:
+        return None, None
+    return key_columns[0], _column_type(key_columns[0])
+
+
+def _parse(python_type, value):
+    # csv text, a stored mark or a database value as the column's python type, so that
+    # comparisons are numeric/chronological ('10' > '9') rather than lexical
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        return str(value) if python_type is str else value
+    if python_type in (datetime.datetime, datetime.date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def _mark_json(value):
+    return value.isoformat() if isinstance(value, datetime.date) else value
+
+
+def _sync_state_path(snapshot_path):
+    return f'{snapshot_path}.sync.json'
+
+
+def _read_sync_state(snapshot_path):
+    try:
+        with open(_sync_state_path(snapshot_path), encoding='utf-8') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sync_state(snapshot_path, state):
+    state = dict(state, high_water_mark=_mark_json(state['high_water_mark']), change_mark=_mark_json(state['change_mark']))
+    tmp_path = f'{_sync_state_path(snapshot_path)}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(tmp_path, _sync_state_path(snapshot_path))
+
+
+def _scan_snapshot(snapshot_path, columns, key_index, key_type, change_index=None, change_type=str):
+    '''
+    Recover the high-water marks from an existing csv snapshot. Returns None when the file is not
+    a snapshot export_table could have written, and so cannot be merged into: a different
+    header, the header repeated further down (old append-mode dumps), or keys that are not
+    strictly increasing.
+    '''
+    high_water_mark, change_mark, n_rows = None, None, 0
+    with open(snapshot_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header != list(columns):
+            return None
+        for row in reader:
+            if row == header:
+                return None
+            try:
+                key = _parse(key_type, row[key_index])
+                change = _parse(change_type, row[change_index]) if change_index is not None else None
+            except (ValueError, IndexError):
+                return None
+            if key is None or (high_water_mark is not None and key <= high_water_mark):
+                return None
+            high_water_mark = key
+            n_rows += 1
+            if change is not None and (change_mark is None or change > change_mark):
+                change_mark = change
+    return {'high_water_mark': high_water_mark, 'change_mark': change_mark, 'rows': n_rows}
+
+
+def _server_keys(session, table_name, key_type, chunk_size):
+    # key-only pass over the table, for finding rows deleted on the server
+    key_column = list(_get_table(table_name).primary_key.columns)[0]
+    connection = session.connection().execution_options(stream_results=True, yield_per=chunk_size)
+    result = connection.execute(select(key_column))
+    keys = set()
+    for partition in result.partitions(chunk_size):
+        keys.update(_parse(key_type, row[0]) for row in partition)
+    return keys
+
+
+def sync_table(table_name, snapshot_path, change_column=None, chunk_size=DEFAULT_CHUNK_SIZE, session=None,
+               reconcile=False):
+    '''
+    Bring a csv snapshot written by export_table up to date without re-dumping the table.
+    Rows with a primary key above the stored high-water mark are added; if change_column names a
+    monotonically increasing column (e.g. a modified timestamp or rowversion), rows whose value
+    is above the stored change mark are pulled as well and replace their old copy. The merge is a
+    streaming sorted merge into a temporary file that replaces the snapshot atomically.
+    The marks only see inserts and updates: rows deleted on the server stay in the snapshot
+    until a sync with reconcile=True, which also reads every primary key (key column only) and
+    drops the snapshot rows the server no longer has. Run it now and then, or export in full.
+    Tables without a single-column primary key, snapshots without sync state, and files that are
+    not key-sorted single-header exports get a full export instead.
+    '''
+    start = time.perf_counter()
+    table = _get_table(table_name)
+    columns = table.columns.keys()
+    key_column, key_type = _key_type(table_name)
+    is_csv = snapshot_path.lower().endswith('.csv')
+    key_index = columns.index(key_column.name) if key_column is not None else None
+    change_index = columns.index(change_column) if change_column is not None else None
+    change_type = _column_type(table.c[change_column]) if change_column is not None else str
+
+    state = None
+    if key_column is not None and is_csv and os.path.exists(snapshot_path):
+        state = _read_sync_state(snapshot_path)
+        if state is not None and (state.get('key') != key_column.name or state.get('change_column') != change_column):
+            # marks were tracked for other columns: rescan, provided the file is still a clean export
+            marks = _scan_snapshot(snapshot_path, columns, key_index, key_type, change_index, change_type)
+            state = None if marks is None else dict(state, key=key_column.name, change_column=change_column, **marks)
+        elif state is not None:
+            try:
+                state['high_water_mark'] = _parse(key_type, state.get('high_water_mark'))
+                state['change_mark'] = _parse(change_type, state.get('change_mark'))
+            except ValueError:
+                state = None
+
+    if state is None:
+        stats = export_table(table_name, snapshot_path, chunk_size=chunk_size, session=session)
+        stats.update({'mode': 'full', 'added': stats['rows'], 'updated': 0, 'removed': 0})
+        if key_column is not None and is_csv:
+            marks = _scan_snapshot(snapshot_path, columns, key_index, key_type, change_index, change_type)
+            if marks is not None:
+                _write_sync_state(snapshot_path, {'table': table_name, 'key': key_column.name,
+                                                  'change_column': change_column, **marks})
+        stats['elapsed_s'] = time.perf_counter() - start
+        return stats
+
+    where = None
+    if state['high_water_mark'] is not None:
+        where = key_column > state['high_water_mark']
+        if change_column is not None and state['change_mark'] is not None:
+            where = or_(where, table.c[change_column] > state['change_mark'])
+
+    def pull(session):
+        delta = {}
+        for rows in iter_table_chunks(session, table_name, chunk_size, where=where):
+            delta.update((_parse(key_type, row[key_index]), row) for row in rows)
+        return delta, _server_keys(session, table_name, key_type, chunk_size) if reconcile else None
+
+    if session is None:
+        with ApexSession() as session:
+            delta, server_keys = pull(session)
+    else:
+        delta, server_keys = pull(session)
+
+    added, updated, removed = 0, 0, 0
+    if len(delta) > 0 or server_keys is not None:
+        delta_keys = sorted(delta)
+        tmp_path = f'{os.path.splitext(snapshot_path)[0]}.tmp.csv'
+        try:
+            with open(snapshot_path, newline='', encoding='utf-8') as old_file, \
+                    open(tmp_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as new_file:
+                reader = csv.reader(old_file)
+                writer = csv.writer(new_file)
+                writer.writerow(next(reader))
+                position = 0
+                for row in reader:
+                    key = _parse(key_type, row[key_index])
+                    while position < len(delta_keys) and delta_keys[position] < key:
+                        writer.writerow(delta[delta_keys[position]])
+                        added += 1
+                        position += 1
+                    if position < len(delta_keys) and delta_keys[position] == key:
+                        writer.writerow(delta[delta_keys[position]])
+                        updated += 1
+                        position += 1
+                    elif server_keys is not None and key not in server_keys:
+                        removed += 1
+                    else:
+                        writer.writerow(row)
+                for key in delta_keys[position:]:
+                    writer.writerow(delta[key])
+                    added += 1
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+    if len(delta) > 0:
+        state['high_water_mark'] = max([delta_keys[-1]] + ([state['high_water_mark']] if state['high_water_mark'] is not None else []))
+        if change_index is not None:
+            changes = [_parse(change_type, row[change_index]) for row in delta.values()]
+            changes = [change for change in changes if change is not None]
+            if state['change_mark'] is not None:
+                changes.append(state['change_mark'])
+            state['change_mark'] = max(changes) if len(changes) > 0 else None
+    state['rows'] = state.get('rows', 0) + added - removed
+    _write_sync_state(snapshot_path, state)
+    return {
+        'table': table_name,
+        'path': snapshot_path,
+        'mode': 'incremental',
+        'rows': state['rows'],
+        'added': added,
+        'updated': updated,
+        'removed': removed,
+        'elapsed_s': time.perf_counter() - start,
+    }
+
+
+def sync_tables(snapshots, change_columns=None, chunk_size=DEFAULT_CHUNK_SIZE, session=None, reconcile=False):
+    # snapshots: {table_name: snapshot_path}; without reconcile, rows deleted on the server are kept
+    change_columns = change_columns or {}
+    report = []
+    for table_name, snapshot_path in snapshots.items():
+        stats = sync_table(table_name, snapshot_path, change_column=change_columns.get(table_name),
+                           chunk_size=chunk_size, session=session, reconcile=reconcile)
+        removed = f"{stats['removed']} removed" if reconcile else 'deletions not checked (use reconcile)'
+        print(f"{table_name}: {stats['mode']} sync, {stats['added']} added, {stats['updated']} updated, {removed}, "
+              f"{stats['rows']} rows in {stats['elapsed_s']:.1f} s")
+        report.append(stats)
+    return report
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'sync':
+        reconcile = '--reconcile' in sys.argv[2:]
+        table_names = [arg for arg in sys.argv[2:] if arg != '--reconcile'] or ['ChemInfo', 'ConstValueData', 'BinCoeff']
+        sync_tables({name: f'apex_{name.lower()}.csv' for name in table_names}, reconcile=reconcile)
+        sys.exit(0)
+    table_name = sys.argv[1] if len(sys.argv) > 1 else 'ChemInfo'
+    out_path = sys.argv[2] if len(sys.argv) > 2 else f'apex_{table_name.lower()}.csv'
+    stats = export_table(table_name, out_path)
+    print(f"exported {stats['rows']} {table_name} rows to {out_path} in {stats['elapsed_s']:.1f} s ({stats['errors']} errors)")
@@ -1,8 +1,7 @@
-import csv
-from sqlalchemy import text
-
 from emnengr.apex.emnphysprop2 import ChemInfo, ApexSession
 
+from apex_export import export_table
+
 # ans = {}
 # for i in range()
 # with ApexSession() as session:
@@ -14,27 +13,9 @@ from emnengr.apex.emnphysprop2 import ChemInfo, ApexSession
 # apple = 1
 
 
-column_names = ChemInfo.__table__.columns.keys()
-
-with ApexSession() as session:
-    result = session.execute(text("SELECT * FROM ChemInfo"))
-    chem_info_list = [dict(row._mapping) for row in result]
-
-header_written = False
-
-output = []
-for i in range(len(chem_info_list)):
-    try:
-        with open('apex_cheminfo.csv', 'a', newline='') as csvfile:
-            writer = csv.DictWriter(f=csvfile, fieldnames=column_names)
-            if not header_written:
-                writer.writeheader()
-            header_written = True
-            output.append(chem_info_list[i])
-            writer.writerows(output)
-            output = []
-    except Exception as e:
-        print(f'*******\n\n\nidx: {i}\nrow: {chem_info_list[i]}\nexception: {e}\n\n\n')
+# one streamed pass through a single buffered writer; failed rows go to apex_cheminfo.csv.errors.jsonl
+stats = export_table('ChemInfo', 'apex_cheminfo.csv')
+print(f"exported {stats['rows']} ChemInfo rows in {stats['elapsed_s']:.1f} s ({stats['errors']} errors)")
 
 
 apple = 1
@@ -0,0 +1,262 @@
+'''
+Pool of warm Aspen Plus sessions (emnengr.aspen.com.App) that are launched and configured once,
+then handed out to jobs and reset to a baseline between uses instead of being relaunched.
+
+    pool = AspenSessionPool(size=2, configure=setup_wils_hoc_flash, baseline_paths=[FEED_T, FEED_P])
+    with pool:
+        with pool.session() as sim:
+            sim.getNode(FEED_T).value = 350
+            sim.run()
+
+Readiness is polled (wait_until_ready) instead of sleeping a fixed time after launch. Each
+instance is recycled after max_uses jobs, or discarded when its reset fails. app_factory can be
+any callable returning an App-like context manager. FakeApp is an in-process stand-in for tests
+and dry runs.
+
+COM objects belong to the thread that created them, so use a pool from the thread that
+created it (or give each worker process its own pool).
+'''
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from node_cache import NodeCache
+
+
+def _split_path(path):
+    return [part for part in str(path).split('\\') if part]
+
+
+def _default_app_factory(**app_kwargs):
+    from emnengr.aspen.com import App
+
+    app_kwargs.setdefault('visible', False)
+    return lambda: App(**app_kwargs)
+
+
+def wait_until_ready(sim, timeout=60.0, poll_s=0.1, probe_path=r'\Data'):
+    '''
+    Block until sim answers getNode(probe_path) with a node, instead of a blind sleep after launch.
+    Returns the seconds waited; raises TimeoutError if the instance never becomes ready.
+    '''
+    start = time.monotonic()
+    last_error = None
+    while True:
+        try:
+            if sim.getNode(probe_path) is not None:
+                return time.monotonic() - start
+        except Exception as e:
+            last_error = e
+        if time.monotonic() - start >= timeout:
+            raise TimeoutError(f'Aspen Plus was not ready after {timeout:.1f} s.  last error: {last_error}')
+        time.sleep(poll_s)
+
+
+class _PooledApp:
+
+    def __init__(self, context, sim, launch_s):
+        self.context = context
+        self.sim = sim
+        self.uses = 0
+        self.launch_s = launch_s
+        self.baseline = {}
+
+
+class AspenSessionPool:
+
+    def __init__(self, size=1, app_factory=None, configure=None, reset=None, baseline_paths=None, max_uses=50,
+                 ready_timeout=60.0, ready_poll_s=0.1, prelaunch=True, node_cache=False, **app_kwargs):
+        '''
+        size: number of instances kept warm. app_factory: zero-argument callable returning an
+        App-like context manager (default emnengr.aspen.com.App(**app_kwargs)). configure(sim)
+        runs once per launch. baseline_paths are node paths whose values are captured after
+        configure and written back after every job. reset(sim) then runs; the default calls
+        sim.reinitialize(). max_uses is the number of jobs before an instance is relaunched.
+        node_cache hands out each sim wrapped in a node_cache.NodeCache, so getNode handles are
+        kept across jobs; the structure is checked after each reset.
+        '''
+        self.size = size
+        self.app_factory = app_factory or _default_app_factory(**app_kwargs)
+        self.configure = configure
+        self.reset = reset
+        self.baseline_paths = list(baseline_paths or [])
+        self.max_uses = max_uses
+        self.ready_timeout = ready_timeout
+        self.ready_poll_s = ready_poll_s
+        self.node_cache = node_cache
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'launches': 0, 'recycles': 0, 'discards': 0, 'acquires': 0, 'launch_s': 0.0, 'wait_s': 0.0}
+        # None is an empty slot that is filled with a fresh instance when it is next acquired
+        for _ in range(size):
+            self._idle.put(self._launch() if prelaunch else None)
+
+    def _launch(self):
+        start = time.monotonic()
+        context = self.app_factory()
+        sim = context.__enter__()
+        try:
+            wait_until_ready(sim, timeout=self.ready_timeout, poll_s=self.ready_poll_s)
+            if self.configure is not None:
+                self.configure(sim)
+            if self.node_cache:
+                sim = NodeCache(sim)
+            pooled = _PooledApp(context, sim, time.monotonic() - start)
+            pooled.baseline = {path: sim.getNode(path).value for path in self.baseline_paths}
+        except BaseException:
+            context.__exit__(None, None, None)
+            raise
+        with self._lock:
+            self.stats['launches'] += 1
+            self.stats['launch_s'] += pooled.launch_s
+        return pooled
+
+    @staticmethod
+    def _close(pooled):
+        try:
+            pooled.context.__exit__(None, None, None)
+        except Exception as e:
+            print(f'error closing Aspen Plus instance.  error: {e}')
+
+    def _reset(self, pooled):
+        sim = pooled.sim
+        for path, value in pooled.baseline.items():
+            sim.getNode(path).value = value
+        if self.reset is not None:
+            self.reset(sim)
+        elif hasattr(sim, 'reinitialize'):
+            sim.reinitialize()
+        if isinstance(sim, NodeCache):
+            # a job that added or removed blocks or streams leaves stale handles behind
+            sim.check_structure()
+
+    def acquire(self, timeout=None):
+        '''Take an instance out of the pool, launching one if its slot was emptied.'''
+        if self._closed:
+            raise RuntimeError('session pool is closed')
+        start = time.monotonic()
+        pooled = self._idle.get(timeout=timeout)
+        try:
+            if pooled is None:
+                pooled = self._launch()
+        except BaseException:
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self.stats['acquires'] += 1
+            self.stats['wait_s'] += time.monotonic() - start
+        pooled.uses += 1
+        return pooled
+
+    def release(self, pooled, discard=False):
+        '''Return an instance after a job: reset it to baseline, or close it when it is spent or broken.'''
+        if not discard and not self._closed and pooled.uses < self.max_uses:
+            try:
+                self._reset(pooled)
+            except Exception as e:
+                print(f'could not reset Aspen Plus instance; discarding it.  error: {e}')
+                discard = True
+            else:
+                self._idle.put(pooled)
+                return
+        self._close(pooled)
+        with self._lock:
+            self.stats['discards' if discard else 'recycles'] += 1
+        self._idle.put(None)
+
+    @contextmanager
+    def session(self, timeout=None):
+        '''Context manager yielding a ready, configured sim; the instance goes back to the pool afterwards.'''
+        pooled = self.acquire(timeout=timeout)
+        try:
+            yield pooled.sim
+        finally:
+            self.release(pooled)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if pooled is not None:
+                self._close(pooled)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class _FakeNode:
+
+    def __init__(self, app, parts):
+        self._app = app
+        self._parts = parts
+        self.name = parts[-1] if parts else ''
+
+    @property
+    def value(self):
+        return self._app.values.get('\\'.join(self._parts))
+
+    @value.setter
+    def value(self, value):
+        self._app.values['\\'.join(self._parts)] = value
+
+    @property
+    def children(self):
+        depth = len(self._parts)
+        names = dict.fromkeys(key.split('\\')[depth] for key in self._app.values
+                              if key.split('\\')[:depth] == self._parts and key.count('\\') >= depth)
+        return [_FakeNode(self._app, self._parts + [name]) for name in names]
+
+    def __getitem__(self, path):
+        return _FakeNode(self._app, self._parts + _split_path(path))
+
+
+class FakeApp:
+    '''
+    In-process stand-in for emnengr.aspen.com.App. Node values live in a flat dict keyed by
+    backslash-joined path, so any path can be written and read back. run() calls
+    solver(values) and stores the returned {path: value} results. startup_s delays readiness
+    like a real launch.
+    '''
+
+    def __init__(self, path=None, visible=False, startup_s=0.0, solver=None, run_s=0.0):
+        self.path = path
+        self.values = {}
+        self.solver = solver
+        self.run_s = run_s
+        self.runs = 0
+        self.reinitializations = 0
+        self.closed = False
+        self._ready_at = time.monotonic() + startup_s
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.closed = True
+        return False
+
+    def getNode(self, path):
+        if self.closed:
+            raise RuntimeError('Aspen Plus instance is closed')
+        if time.monotonic() < self._ready_at:
+            raise RuntimeError('Aspen Plus is still starting')
+        return _FakeNode(self, _split_path(path))
+
+    def reinitialize(self):
+        self.reinitializations += 1
+
+    def run(self):
+        self.runs += 1
+        if self.run_s > 0.0:
+            time.sleep(self.run_s)
+        if self.solver is not None:
+            self.values.update({'\\'.join(_split_path(path)): value for path, value in self.solver(self.values).items()})
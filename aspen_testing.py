@@ -1,5 +1,9 @@
 from emnengr.aspen.com import App
 import numpy as np
+from sweep_runner import case_grid, run_sweep
+from warm_sweep import run_warm_sweep
+from result_cache import PARAMETER_SOURCE, ResultCache, result_key
+from node_cache import NodeCache
 
 mole_fractions = {
     "ACETIC": 0.3,
@@ -7,49 +11,112 @@ mole_fractions = {
     "WATER": 0.4
 }
 
-def get_wils_hoc_vp_curve_ternary():
+def setup_wils_hoc_flash(sim):
+    # Add components
+    comp_node = sim.getNode(r"\\Data\\Components\\Specifications\\Input")
+    comp_node[r"\\CASN\\0"].value = "64-19-7"   # Acetic Acid
+    comp_node[r"\\OUTNAME\\0"].value = "ACETIC"
+    comp_node[r"\\CASN\\1"].value = "79-09-4"   # Propionic Acid
+    comp_node[r"\\OUTNAME\\1"].value = "PROPIONIC"
+    comp_node[r"\\CASN\\2"].value = "7732-18-5" # Water
+    comp_node[r"\\OUTNAME\\2"].value = "WATER"
+
+    # Set WILS-HOC property method
+    sim.getNode(r"\\Data\\Properties\\Specifications\\Input\\GOPSETNAME").value = "MYPROPSET"
+    sim.getNode(r"\\Data\\Properties\\Property Methods\\MYPROPSET\\Input\\CPROP\\1").value = "GAMMA"
+    sim.getNode(r"\\Data\\Properties\\Property Methods\\MYPROPSET\\Input\\MODELNAME\\1").value = "WILS-HOC"
+
+    # Set up flash block and feed
+    sim.getNode(r"\\Data\\Blocks\\FLASH1\\Input\\Block Type").value = "FLASH2"
+    sim.getNode(r"\\Data\\Blocks\\FLASH1\\Input\\Connections\\Inlets\\0").value = "FEED"
+    sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Mole Flow").value = 100
+    sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Pressure").value = 1  # Initial guess
+
+    for comp, frac in mole_fractions.items():
+        sim.getNode(fr"\\Data\\Streams\\FEED\\Input\\Composition\\Mole Fractions\\{comp}").value = frac
+
+
+def run_vp_case(sim, case, reinitialize=True):
+    # one sweep point: case is {'temperature': T}, optionally with 'mole_fractions'
+    for comp, frac in case.get('mole_fractions', {}).items():
+        sim.getNode(fr"\\Data\\Streams\\FEED\\Input\\Composition\\Mole Fractions\\{comp}").value = frac
+    sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Temperature").value = case['temperature']
+    if reinitialize:
+        sim.reinitialize()
+    sim.run()
+    return sim.getNode(r"\\Data\\Results\\Blocks\\FLASH1\\Output\\Pressure").value
+
+
+def run_vp_case_warm(sim, case):
+    return run_vp_case(sim, case, reinitialize=False)
+
+
+def vp_case_key(case):
+    # everything that determines the flash result for one sweep point
+    feed = {
+        'mole_fractions': case.get('mole_fractions', mole_fractions),
+        'temperature': case['temperature'],
+        'mole_flow': 100,
+        'pressure_guess': 1,
+    }
+    return result_key(["64-19-7", "79-09-4", "7732-18-5"], "WILS-HOC", parameters={'source': PARAMETER_SOURCE},
+                      streams={'FEED': feed},
+                      blocks={'FLASH1': {'type': 'FLASH2', 'inlets': ['FEED']}})
+
+
+def get_wils_hoc_vp_curve_ternary(warm_start=False, result_cache=None):
     
     Tmin, Tmax, n_points = 300, 400, 10
     T_vals = np.linspace(Tmin, Tmax, n_points)
-    vp_curve = []
-
-    with App(visible=False) as sim:
-        # Add components
-        apple = 1
-        pressure_node = sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Pressure")
-        unit = pressure_node.unitOfMeasure # This gives the unit column index
-
-        comp_node = sim.getNode(r"\\Data\\Components\\Specifications\\Input")
-        comp_node[r"\\CASN\\0"].value = "64-19-7"   # Acetic Acid
-        comp_node[r"\\OUTNAME\\0"].value = "ACETIC"
-        comp_node[r"\\CASN\\1"].value = "79-09-4"   # Propionic Acid
-        comp_node[r"\\OUTNAME\\1"].value = "PROPIONIC"
-        comp_node[r"\\CASN\\2"].value = "7732-18-5" # Water
-        comp_node[r"\\OUTNAME\\2"].value = "WATER"
-
-        # Set WILS-HOC property method
-        sim.getNode(r"\\Data\\Properties\\Specifications\\Input\\GOPSETNAME").value = "MYPROPSET"
-        sim.getNode(r"\\Data\\Properties\\Property Methods\\MYPROPSET\\Input\\CPROP\\1").value = "GAMMA"
-        sim.getNode(r"\\Data\\Properties\\Property Methods\\MYPROPSET\\Input\\MODELNAME\\1").value = "WILS-HOC"
-
-        # Set up flash block and feed
-        sim.getNode(r"\\Data\\Blocks\\FLASH1\\Input\\Block Type").value = "FLASH2"
-        sim.getNode(r"\\Data\\Blocks\\FLASH1\\Input\\Connections\\Inlets\\0").value = "FEED"
-        sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Mole Flow").value = 100
-        sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Pressure").value = 1  # Initial guess
-
-        for comp, frac in mole_fractions.items():
-            sim.getNode(fr"\\Data\\Streams\\FEED\\Input\\Composition\\Mole Fractions\\{comp}").value = frac
-
-        for T in T_vals:
-            sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Temperature").value = T
-            sim.reinitialize()
-            sim.run()
-            P = sim.getNode(r"\\Data\\Results\\Blocks\\FLASH1\\Output\\Pressure").value
-            vp_curve.append((T, P))
-
-    return vp_curve
-
-vps = get_wils_hoc_vp_curve_ternary()
-
-apple = 1
+    cases = case_grid(temperature=T_vals)
+
+    # points already in the result cache never reach Aspen
+    pressures = {}
+    if result_cache is not None:
+        for i, case in enumerate(cases):
+            P = result_cache.get(vp_case_key(case))
+            if P is not None:
+                pressures[i] = P
+    todo = [i for i in range(len(cases)) if i not in pressures]
+
+    if len(todo) > 0:
+        with App(visible=False) as sim:
+            pressure_node = sim.getNode(r"\\Data\\Streams\\FEED\\Input\\Pressure")
+            unit = pressure_node.unitOfMeasure # This gives the unit column index
+
+            setup_wils_hoc_flash(sim)
+            # the feed and result paths are resolved once, not on every case
+            nodes = NodeCache(sim)
+
+            if warm_start:
+                # neighbouring temperatures start from the last converged flash instead of reinitializing
+                records, stats = run_warm_sweep(nodes, [cases[i] for i in todo], run_vp_case_warm)
+                print(f"{stats['reinitializations']} reinitializations, mean warm run {stats['mean_warm_run_s']} s, "
+                      f"mean cold run {stats['mean_cold_run_s']} s")
+                new_pressures = [record['result'] for record in records]
+            else:
+                new_pressures = [run_vp_case(nodes, cases[i]) for i in todo]
+            nodes.report()
+
+        for i, P in zip(todo, new_pressures):
+            pressures[i] = P
+            if result_cache is not None and P is not None:
+                result_cache.put(vp_case_key(cases[i]), P)
+
+    if result_cache is not None:
+        result_cache.report()
+    return [(case['temperature'], pressures[i]) for i, case in enumerate(cases)]
+
+
+def get_wils_hoc_vp_curve_ternary_parallel(workers=2, Tmin=300, Tmax=400, n_points=10):
+    # same curve with the temperatures spread over several Aspen processes
+    cases = case_grid(temperature=np.linspace(Tmin, Tmax, n_points))
+    records, stats = run_sweep(cases, run_vp_case, configure=setup_wils_hoc_flash, workers=workers)
+    return [(record['case']['temperature'], record['result']) for record in records if record['error'] is None]
+
+
+if __name__ == '__main__':
+    with ResultCache() as cache:
+        vps = get_wils_hoc_vp_curve_ternary(result_cache=cache)
+
+    apple = 1
@@ -11,74 +11,59 @@ import numpy as np
 import matplotlib.pyplot as plt
 import warnings
 from typing import Dict, Tuple, List
-import time
 
 # Import the Aspen COM interface
 
-from emnengr.aspen.com import App, AspenComError
+from emnengr.aspen.com import AspenComError
+from aspen_pool import AspenSessionPool
+from result_cache import PARAMETER_SOURCE, cached_bubble_point, plain_values
+from tree_crawler import crawl_tree
 
 # CAS Numbers for component identification
 
 CAS_ACETIC_ACID = '64-19-7'
 CAS_WATER = '7732-18-5'
 
-flattened_tree = []
-
-def recurse_that_node(curr_node, prefix = 'Data'):
-    global flattened_tree
-    for child in curr_node.children:
-        comp_status_value = ''
-        child_name = ''
-        try:
-            if hasattr(child, 'comp_status'):
-                comp_status = child.comp_status
-                if hasattr(comp_status, 'value'):
-                    comp_status_value = comp_status.value
-            if hasattr(child, 'name'):
-                child_name = child.name
-            row = f'{prefix}.{child_name} - comp status {comp_status_value}'
-            flattened_tree.append(row)
-            print(row)
-            if hasattr(child, 'children'):
-                recurse_that_node(child, prefix=f'{prefix}.{child_name}')
-        except:
-            pass
-        if prefix == 'Data':
-            apple = 1
-
 class AspenVLECalculator:
 # Use Aspen Plus with WILS-HOC property method for VLE calculations
 
-    def __init__(self):
+    def __init__(self, result_cache=None):
         self.component_mapping = {
             CAS_ACETIC_ACID: "ACETIC-ACID",
             CAS_WATER: "WATER"
         }
-
-    def setup_simulation(self):
-        """Create and setup Aspen Plus simulation with WILS-HOC method"""
-        print("Creating new Aspen Plus simulation with WILS-HOC...")
-
-        with App(visible=False) as sim:
-            print("✓ Aspen Plus instance created (invisible)")
-
-            # Allow Aspen Plus to initialize
-            time.sleep(2)
-            data = sim.getNode(r"\Data")
-            recurse_that_node(data)
-            # components = sim.getNode(r"\Data\Components")
-            # specs = sim.getNode(r"\Data\Components\Specifications")
-            # comp_specs = sim.getNode(r"\Data\Components\Specifications\Input")
-
-            # Setup the simulation components and property method
-
-            with open('aspen_data_tree.txt', 'w') as file:
-                for item in flattened_tree:
-                    file.write(f"{item}\n")
-            self._add_components(sim)
-            self._set_property_method(sim)
-            self._create_flash_block(sim)
-
+        self.property_method = "WILS-HOC"
+        # parameter sets behind the results (filled in by _extract_parameters); keys the result cache
+        self.parameters = {"source": PARAMETER_SOURCE}
+        # optional result_cache.ResultCache; cached bubble points skip the Aspen calls
+        self.result_cache = result_cache
+
+    def configure_simulation(self, sim):
+        """Add components, property method and flash block; runs once per Aspen Plus launch"""
+        crawl_tree(sim, 'aspen_data_tree.jsonl', legacy_text_path='aspen_data_tree.txt')
+        # components = sim.getNode(r"\Data\Components")
+        # specs = sim.getNode(r"\Data\Components\Specifications")
+        # comp_specs = sim.getNode(r"\Data\Components\Specifications\Input")
+
+        # Setup the simulation components and property method
+
+        self._add_components(sim)
+        self._set_property_method(sim)
+        self._create_flash_block(sim)
+
+    def setup_simulation(self, pool=None):
+        """
+        Create and setup Aspen Plus simulation with WILS-HOC method.
+        pool is an aspen_pool.AspenSessionPool built with configure=configure_simulation, so
+        several curves share warm instances; without one a one-instance pool is launched here.
+        """
+        if pool is None:
+            print("Creating new Aspen Plus simulation with WILS-HOC...")
+            with AspenSessionPool(size=1, configure=self.configure_simulation) as pool:
+                print("✓ Aspen Plus instance created (invisible)")
+                return self.setup_simulation(pool)
+
+        with pool.session() as sim:
             # Extract parameters for validation
             self._extract_parameters(sim)
 
@@ -172,7 +157,8 @@ class AspenVLECalculator:
             if plxant_sets and len(plxant_sets) > 0:
                 plxant_params = plxant_sets[0]
                 if hasattr(plxant_params, 'getParams'):
-                    params_data = plxant_params.getParams()
+                    params_data = plain_values(plxant_params.getParams())
+                    self.parameters["PLXANT"] = params_data
                     print(f"✓ Extracted PLXANT parameters for {len(params_data)} components")
                 else:
                     print("Warning: PLXANT parameter set found but no getParams method")
@@ -184,7 +170,8 @@ class AspenVLECalculator:
             if wilson_sets and len(wilson_sets) > 0:
                 wilson_params = wilson_sets[0]
                 if hasattr(wilson_params, 'getParams'):
-                    binary_data = wilson_params.getParams()
+                    binary_data = plain_values(wilson_params.getParams())
+                    self.parameters["WILSON"] = binary_data
                     print(f"✓ Extracted Wilson parameters")
                 else:
                     print("Warning: Wilson parameter set found but no getParams method")
@@ -218,8 +205,9 @@ class AspenVLECalculator:
         for temp_c in temp_range_c:
             try:
                 # Calculate bubble point using Aspen's built-in capabilities
-                pressure_mmhg, vapor_fractions = self._aspen_bubble_point(
-                    sim, liquid_fractions, temp_c
+                pressure_mmhg, vapor_fractions = cached_bubble_point(
+                    self.result_cache, list(self.component_mapping), self.property_method, self.parameters,
+                    liquid_fractions, temp_c, lambda: self._aspen_bubble_point(sim, liquid_fractions, temp_c)
                 )
 
                 if pressure_mmhg is not None and vapor_fractions is not None:
@@ -376,8 +364,8 @@ class AspenVLECalculator:
             return None
 
 
-def generate_vapor_pressure_curve():
-    #Generate vapor pressure curve using Aspen’s WILS-HOC method
+def generate_vapor_pressure_curve(pool=None):
+    #Generate vapor pressure curve using Aspen’s WILS-HOC method (on an instance from pool, if given)
 
     try:
         # Create and run the calculation
@@ -388,7 +376,7 @@ def generate_vapor_pressure_curve():
         print("=" * 60)
 
         calculator = AspenVLECalculator()
-        results = calculator.setup_simulation()
+        results = calculator.setup_simulation(pool)
 
         if results and len(results['temperature_c']) > 0:
             # Generate plots and save results
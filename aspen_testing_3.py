@@ -10,56 +10,101 @@ import numpy as np
 import matplotlib.pyplot as plt
 import warnings
 from typing import Dict, Tuple, List
-import time
 
 # Import the Aspen COM interface
 
 try:
-    from emnengr.aspen.com import App, AspenComError, CompStatus 
+    from emnengr.aspen.com import AspenComError, CompStatus
 except ImportError:
-    from emnengr.aspen.com import App, AspenComError
-CompStatus = None
+    from emnengr.aspen.com import AspenComError
+    CompStatus = None
+from aspen_pool import AspenSessionPool
+from comp_status import describe_status
+from result_cache import PARAMETER_SOURCE, cached_bubble_point, plain_values
+from tree_crawler import join_path, split_path
 
 # CAS Numbers for component identification
 
 CAS_ACETIC_ACID = '64-19-7'
 CAS_WATER = '7732-18-5'
 
+
+def _is_cas_node(name):
+    '''CAS number node below Components\\Specifications; used by both the index lookup and the live walk'''
+    return 'CASN' in str(name).upper()
+
+
+def _is_method_node(name):
+    '''Property method node below Properties\\Specifications'''
+    name = str(name).upper()
+    return 'METHOD' in name or 'PROP' in name
+
+
 class AspenVLECalculator:
 # Use Aspen Plus with WILS-HOC property method for VLE calculations
 
-    def __init__(self):
+    def __init__(self, result_cache=None, tree_index=None):
         self.component_mapping = {
             CAS_ACETIC_ACID: 'ACETIC-ACID',
             CAS_WATER: 'WATER'
         }
-
-    def setup_simulation(self):
-        '''Create and setup Aspen Plus simulation with WILS-HOC method'''
-        print('Creating new Aspen Plus simulation with WILS-HOC...')
-
-        with App(visible=False) as sim:
-            print('✓ Aspen Plus instance created (invisible)')
-
-            # Allow Aspen Plus to initialize
-            time.sleep(2)
-
-            # Setup the simulation components and property method
-            self._add_components(sim)
-            self._set_property_method(sim)
-            self._create_flash_block(sim)
-
+        self.property_method = 'WILS-HOC'
+        # parameter sets behind the results (filled in by _extract_parameters); keys the result cache
+        self.parameters = {'source': PARAMETER_SOURCE}
+        # optional result_cache.ResultCache; cached bubble points skip the Aspen calls
+        self.result_cache = result_cache
+        # optional tree_index.PathIndex over a snapshot of this flowsheet; node paths are
+        # looked up in it instead of walking children over COM
+        self.tree_index = tree_index
+
+    def configure_simulation(self, sim):
+        '''Add components, property method and flash block; runs once per Aspen Plus launch'''
+        # Setup the simulation components and property method
+        self._add_components(sim)
+        self._set_property_method(sim)
+        self._create_flash_block(sim)
+
+        # Explore tree structure for debugging
+        self._explore_tree_structure(sim)
+
+    def setup_simulation(self, pool=None):
+        '''
+        Create and setup Aspen Plus simulation with WILS-HOC method.
+        pool is an aspen_pool.AspenSessionPool built with configure=configure_simulation, so
+        several curves share warm instances; without one a one-instance pool is launched here.
+        '''
+        if pool is None:
+            print('Creating new Aspen Plus simulation with WILS-HOC...')
+            with AspenSessionPool(size=1, configure=self.configure_simulation) as pool:
+                print('✓ Aspen Plus instance created (invisible)')
+                return self.setup_simulation(pool)
+
+        with pool.session() as sim:
             # Extract parameters for validation
             self._extract_parameters(sim)
 
-            # Explore tree structure for debugging
-            self._explore_tree_structure(sim)
-
             print('✓ Simulation setup completed with WILS-HOC')
 
             # Generate vapor pressure curve using Aspen's calculations
             return self._calculate_vapor_pressure_curve(sim)
 
+    def _indexed_nodes(self, sim, parent_path, predicate):
+        '''
+        Nodes two levels below parent_path whose names pass predicate, found in the snapshot
+        index the same way the live walk finds them; None to fall back to walking the live tree
+        '''
+        if self.tree_index is None:
+            return None
+        nodes = []
+        for path in self.tree_index.glob(join_path(parent_path, r'*\*')):
+            if not predicate(split_path(path)[-1]):
+                continue
+            try:
+                nodes.append(sim.getNode(path))
+            except Exception as e:
+                print(f'    Indexed path {path} not found in this simulation: {e}')
+        return nodes if len(nodes) > 0 else None
+
     def _add_components(self, sim):
         '''Add acetic acid and water components using proper node navigation'''
         print('Adding components...')
@@ -71,34 +116,38 @@ class AspenVLECalculator:
             if comp_specs:
                 print(f'✓ Found components specifications node')
 
-                # Explore the structure to understand how to add components
-                if comp_specs.hasChildren():
-                    children = comp_specs.children
-                    print(f'Components.Specifications has {len(children)} children')
-
-                    # Look for Input or similar node
-                    for child in children:
-                        print(f'  Child: {child.name}')
-
-                        # Try to find ID or component list node
-                        if child.hasChildren():
-                            subchildren = child.children
-                            for subchild in subchildren:
-                                if 'CASN' in subchild.name.upper():
-                                    print(f'    Found potential ID node: {subchild.name}')
-
-                                    # Try to add components here
-                                    try:
-                                        if subchild.hasChildren() and len(subchild.children) >= 2:
-                                            subchild.children[0].value = CAS_ACETIC_ACID
-                                            subchild.children[1].value = CAS_WATER
-                                            print('✓ Components set in CAS Number node')
-                                        elif hasattr(subchild, 'value'):
-                                            # If it's a single value node, try setting it
-                                            subchild.value = f'{CAS_ACETIC_ACID},{CAS_WATER}'
-                                            print('✓ Components set as comma-separated string')
-                                    except Exception as e2:
-                                        print(f'    Could not set components in {subchild.name}: {e2}')
+                # Resolve the CAS number node from the snapshot index when there is one
+                candidates = self._indexed_nodes(sim, r'\Data\Components\Specifications', _is_cas_node)
+                if candidates is None:
+                    candidates = []
+                    # Explore the structure to understand how to add components
+                    if comp_specs.hasChildren():
+                        children = comp_specs.children
+                        print(f'Components.Specifications has {len(children)} children')
+
+                        # Look for Input or similar node
+                        for child in children:
+                            print(f'  Child: {child.name}')
+
+                            # Try to find ID or component list node
+                            if child.hasChildren():
+                                candidates.extend(subchild for subchild in child.children if _is_cas_node(subchild.name))
+
+                for subchild in candidates:
+                    print(f'    Found potential ID node: {subchild.name}')
+
+                    # Try to add components here
+                    try:
+                        if subchild.hasChildren() and len(subchild.children) >= 2:
+                            subchild.children[0].value = CAS_ACETIC_ACID
+                            subchild.children[1].value = CAS_WATER
+                            print('✓ Components set in CAS Number node')
+                        elif hasattr(subchild, 'value'):
+                            # If it's a single value node, try setting it
+                            subchild.value = f'{CAS_ACETIC_ACID},{CAS_WATER}'
+                            print('✓ Components set as comma-separated string')
+                    except Exception as e2:
+                        print(f'    Could not set components in {subchild.name}: {e2}')
 
             # Try alternative approach - use the App's component methods
             try:
@@ -122,31 +171,35 @@ class AspenVLECalculator:
             if prop_specs:
                 print(f'✓ Found properties specifications node')
 
-                # Explore the structure to understand how to set property methods
-                if prop_specs.hasChildren():
-                    children = prop_specs.children
-                    print(f'Properties.Specifications has {len(children)} children')
-
-                    # Look for Input or Methods node
-                    for child in children:
-                        print(f'  Child: {child.name}')
-
-                        if child.hasChildren():
-                            subchildren = child.children
-                            for subchild in subchildren:
-                                if 'METHOD' in subchild.name.upper() or 'PROP' in subchild.name.upper():
-                                    print(f'    Found potential method node: {subchild.name}')
-
-                                    # Try to set property method here
-                                    try:
-                                        if hasattr(subchild, 'value'):
-                                            subchild.value = 'WILS-HOC'
-                                            print('✓ Property method set to WILS-HOC')
-                                        elif subchild.hasChildren() and len(subchild.children) >= 1:
-                                            subchild.children[0].value = 'WILS-HOC'
-                                            print('✓ Property method set in child node')
-                                    except Exception as e2:
-                                        print(f'    Could not set property method in {subchild.name}: {e2}')
+                # Resolve the method nodes from the snapshot index when there is one
+                candidates = self._indexed_nodes(sim, r'\Data\Properties\Specifications', _is_method_node)
+                if candidates is None:
+                    candidates = []
+                    # Explore the structure to understand how to set property methods
+                    if prop_specs.hasChildren():
+                        children = prop_specs.children
+                        print(f'Properties.Specifications has {len(children)} children')
+
+                        # Look for Input or Methods node
+                        for child in children:
+                            print(f'  Child: {child.name}')
+
+                            if child.hasChildren():
+                                candidates.extend(subchild for subchild in child.children if _is_method_node(subchild.name))
+
+                for subchild in candidates:
+                    print(f'    Found potential method node: {subchild.name}')
+
+                    # Try to set property method here
+                    try:
+                        if hasattr(subchild, 'value'):
+                            subchild.value = 'WILS-HOC'
+                            print('✓ Property method set to WILS-HOC')
+                        elif subchild.hasChildren() and len(subchild.children) >= 1:
+                            subchild.children[0].value = 'WILS-HOC'
+                            print('✓ Property method set in child node')
+                    except Exception as e2:
+                        print(f'    Could not set property method in {subchild.name}: {e2}')
 
             # Try alternative approach using App methods
             try:
@@ -233,7 +286,8 @@ class AspenVLECalculator:
                 if plxant_sets and len(plxant_sets) > 0:
                     plxant_params = plxant_sets[0]
                     if hasattr(plxant_params, 'getParams'):
-                        params_data = plxant_params.getParams()
+                        params_data = plain_values(plxant_params.getParams())
+                        self.parameters['PLXANT'] = params_data
                         print(f'✓ Extracted PLXANT parameters for {len(params_data)} components')
                     else:
                         print('Warning: PLXANT parameter set found but no getParams method')
@@ -248,7 +302,8 @@ class AspenVLECalculator:
                 if wilson_sets and len(wilson_sets) > 0:
                     wilson_params = wilson_sets[0]
                     if hasattr(wilson_params, 'getParams'):
-                        binary_data = wilson_params.getParams()
+                        binary_data = plain_values(wilson_params.getParams())
+                        self.parameters['WILSON'] = binary_data
                         print(f'✓ Extracted Wilson parameters')
                     else:
                         print('Warning: Wilson parameter set found but no getParams method')
@@ -291,7 +346,7 @@ class AspenVLECalculator:
                                     status_info = status_obj.attributesAsList()
                                     print(f'  Completion status: {comp_status} ({status_info})')
                                 else:
-                                    print(f'  Completion status: {comp_status}')
+                                    print(f'  Completion status: {comp_status} ({describe_status(comp_status)})')
                         except Exception as status_e:
                             # Try alternative method
                             try:
@@ -339,8 +394,9 @@ class AspenVLECalculator:
         for temp_c in temp_range_c:
             try:
                 # Calculate bubble point using Aspen's built-in capabilities
-                pressure_mmhg, vapor_fractions = self._aspen_bubble_point(
-                    sim, liquid_fractions, temp_c
+                pressure_mmhg, vapor_fractions = cached_bubble_point(
+                    self.result_cache, list(self.component_mapping), self.property_method, self.parameters,
+                    liquid_fractions, temp_c, lambda: self._aspen_bubble_point(sim, liquid_fractions, temp_c)
                 )
 
                 if pressure_mmhg is not None and vapor_fractions is not None:
@@ -496,8 +552,8 @@ class AspenVLECalculator:
             print(f'Error getting HOC fugacity coefficients: {e}')
             return None
 
-def generate_vapor_pressure_curve():
-# Generate vapor pressure curve using Aspen’s WILS-HOC method
+def generate_vapor_pressure_curve(pool=None):
+# Generate vapor pressure curve using Aspen’s WILS-HOC method (on an instance from pool, if given)
 
     try:
         # Create and run the calculation
@@ -508,7 +564,7 @@ def generate_vapor_pressure_curve():
         print('=' * 60)
 
         calculator = AspenVLECalculator()
-        results = calculator.setup_simulation()
+        results = calculator.setup_simulation(pool)
 
         if results and len(results['temperature_c']) > 0:
             # Generate plots and save results
@@ -1,30 +1,5 @@
 from emnengr.aspen.com import App
 
-flattened_tree = []
-
-def recurse_that_node(curr_node, prefix = ''):
-    global flattened_tree
-    for child in curr_node.children:
-        comp_status_value = ''
-        child_name = ''
-        try:
-            if hasattr(child, 'comp_status'):
-                comp_status = child.comp_status
-                if hasattr(comp_status, 'value'):
-                    comp_status_value = comp_status.value
-            if hasattr(child, 'name'):
-                child_name = child.name
-            row = f'{prefix}.{child_name} - comp status {comp_status_value}'
-            flattened_tree.append(row)
-            print(row)
-            if hasattr(child, 'children'):
-                recurse_that_node(child, prefix=f'{prefix}.{child_name}')
-        except:
-            pass
-        if prefix == 'Data':
-            apple = 1
-
-
 def add_component(sim, component_id):
     """
     Adds a component to the Aspen Plus simulation if it's not already present.
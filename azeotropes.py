@@ -0,0 +1,240 @@
+'''
+Azeotrope location and pressure continuation on a gamma-phi model (vle_solver.GammaPhiModel).
+
+An azeotrope of the components S is a point with x = y, so K_i = 1 for every i in S:
+
+    ln gamma_i(T, x) + ln(phi_i^sat Psat_i(T)) - ln phi_i(T, P, x) - ln P = 0      i in S
+
+with the |S| - 1 free mole fractions and T as unknowns. find_azeotropes solves this from a grid of
+starting compositions for every binary and ternary subset of the model's components (each
+subset batched into one vectorized Newton), and trace_azeotropes follows each solution across a
+pressure range, starting every step from the previous solution extrapolated in ln P.
+'''
+import time
+from itertools import combinations
+
+import numpy as np
+
+from vle_solver import DEFAULT_T_BOUNDS, bubble_temperature
+
+X_MIN = 1e-7  # a solution closer than this to an edge of the simplex is not an azeotrope of S
+_MAX_DT = 10.0
+
+
+def _ln_k(model, components, x_sub, temp_k, pressure_pa):
+    '''ln K of the components in S for points in S-space, with x = y.'''
+    x = np.zeros((x_sub.shape[0], model.n_components))
+    x[:, components] = x_sub
+    psat = model.psat(temp_k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ln_k = (np.log(model.gammas(temp_k, x)) + np.log(psat * model.phi_sat(temp_k, psat))
+                - np.log(model.phi(temp_k, pressure_pa, x)) - np.log(pressure_pa)[:, np.newaxis])
+    return ln_k[:, components]
+
+
+def _expand(free):
+    # the last component of S closes the mole-fraction sum
+    return np.column_stack([free, 1.0 - free.sum(axis=1)])
+
+
+def solve_azeotropes(model, components, x0, t0, pressure_pa, tol=1e-10, max_iter=50):
+    '''
+    Newton on K_i = 1 (i in components) for a batch of starts: x0 is (m, |S|) in S-space, t0 and
+    pressure_pa are (m,). Returns (x, temp_k, converged, iterations); x is in S-space.
+    '''
+    components = list(components)
+    x0 = np.atleast_2d(np.asarray(x0, dtype=float))
+    m, k = x0.shape
+    free = x0[:, :-1].copy()
+    temp = np.broadcast_to(np.asarray(t0, dtype=float).ravel(), (m,)).copy()
+    pressure_pa = np.broadcast_to(np.asarray(pressure_pa, dtype=float).ravel(), (m,)).copy()
+    converged = np.zeros(m, dtype=bool)
+    finished = ~np.isfinite(temp)
+    iterations = np.zeros(m, dtype=int)
+    h_x, h_t = 1e-7, 1e-5
+    for iteration in range(1, max_iter + 1):
+        active = np.flatnonzero(~finished)
+        if active.size == 0:
+            break
+        f_a, t_a, p_a = free[active], temp[active], pressure_pa[active]
+        r = _ln_k(model, components, _expand(f_a), t_a, p_a)
+        # forward-difference Jacobian, one batched evaluation per unknown
+        jac = np.empty((active.size, k, k))
+        for j in range(k - 1):
+            f_j = f_a.copy()
+            f_j[:, j] += h_x
+            jac[:, :, j] = (_ln_k(model, components, _expand(f_j), t_a, p_a) - r) / h_x
+        jac[:, :, k - 1] = (_ln_k(model, components, _expand(f_a), t_a + h_t, p_a) - r) / h_t
+        ok = np.isfinite(r).all(axis=1) & np.isfinite(jac).all(axis=(1, 2))
+        # failed points get an identity system so one batched solve covers the rest
+        jac = np.where(ok[:, np.newaxis, np.newaxis], jac, np.eye(k))
+        ok &= np.linalg.det(jac) != 0.0
+        jac[~ok] = np.eye(k)
+        rhs = np.where(ok[:, np.newaxis], -r, 0.0)
+        step = np.linalg.solve(jac, rhs[:, :, np.newaxis])[:, :, 0]
+        # keep every mole fraction inside the simplex and limit the temperature step
+        dx = _expand(step[:, :-1]) - np.column_stack([np.zeros((active.size, k - 1)), np.ones(active.size)])
+        x_a = _expand(f_a)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_edge = np.where(dx < 0.0, 0.9 * x_a / -dx, np.inf).min(axis=1)
+        alpha = np.minimum(1.0, np.minimum(to_edge, _MAX_DT / np.maximum(np.abs(step[:, -1]), 1e-300)))
+        free[active] = f_a + alpha[:, np.newaxis] * step[:, :-1]
+        temp[active] = t_a + alpha * step[:, -1]
+
+        done = ok & (np.abs(r).max(axis=1) < tol) & (np.abs(step).max(axis=1) < 1e-6)
+        iterations[active] = iteration
+        converged[active] = done
+        finished[active] = done | ~ok
+    x = _expand(free)
+    converged &= (x > X_MIN).all(axis=1)
+    return x, temp, converged, iterations
+
+
+def _simplex_starts(k, n_starts):
+    '''Interior starting compositions for a k-component subset.'''
+    if k == 2:
+        s = np.linspace(0.0, 1.0, n_starts + 2)[1:-1]
+        return np.column_stack([s, 1.0 - s])
+    n = n_starts + 1
+    grid = [(i, j, n - i - j) for i in range(1, n) for j in range(1, n - i)]
+    return np.array(grid, dtype=float) / n
+
+
+def _classify(temp_k, pure_temps):
+    if temp_k < pure_temps.min():
+        return 'minimum-boiling'
+    if temp_k > pure_temps.max():
+        return 'maximum-boiling'
+    return 'saddle'
+
+
+def _pure_boiling_points(model, pressure_pa, t_bounds):
+    return bubble_temperature(model, pressure_pa, np.eye(model.n_components), t_bounds=t_bounds)['temperature_k']
+
+
+def find_azeotropes(model, pressure_pa, components=None, max_order=3, n_starts=9, tol=1e-10,
+                    t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    All binary (and, up to max_order, ternary) azeotropes among components (indices into the
+    model, default all) at pressure_pa. Returns a list of dicts with components, x (full
+    composition vector), temperature_k, pressure_pa and kind (minimum-boiling,
+    maximum-boiling or saddle relative to the pure-component boiling points).
+    '''
+    components = list(range(model.n_components)) if components is None else list(components)
+    pure_temps = _pure_boiling_points(model, pressure_pa, t_bounds)
+    found = []
+    for order in range(2, max_order + 1):
+        for subset in combinations(components, order):
+            subset = list(subset)
+            starts = _simplex_starts(order, n_starts)
+            x_full = np.zeros((starts.shape[0], model.n_components))
+            x_full[:, subset] = starts
+            t0 = bubble_temperature(model, pressure_pa, x_full, t_bounds=t_bounds)['temperature_k']
+            x, temp, converged, _ = solve_azeotropes(model, subset, starts, t0, pressure_pa, tol=tol)
+            solutions = []
+            for x_sub, t in zip(x[converged], temp[converged]):
+                if not any(np.abs(x_sub - other).max() < 1e-5 for other, _ in solutions):
+                    solutions.append((x_sub, t))
+            for x_sub, t in sorted(solutions, key=lambda solution: solution[1]):
+                x_point = np.zeros(model.n_components)
+                x_point[subset] = x_sub
+                found.append({
+                    'components': tuple(subset),
+                    'x': x_point,
+                    'temperature_k': float(t),
+                    'pressure_pa': float(pressure_pa),
+                    'kind': _classify(t, pure_temps[subset]),
+                })
+    return found
+
+
+def trace_azeotropes(model, pressures_pa, azeotropes=None, max_substeps=4, tol=1e-10, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Follow azeotropes across the ordered pressures_pa by natural-parameter continuation. Each
+    step starts Newton from the previous solutions extrapolated linearly in ln P; a branch whose
+    step fails is retried with up to max_substeps halvings, and a branch that reaches the edge of
+    the simplex (the azeotrope disappears) is ended. azeotropes defaults to
+    find_azeotropes at pressures_pa[0]. All branches on the same component subset are corrected
+    together. Returns {'pressure_pa', 'branches', 'stats'}; each branch has components, kind,
+    x (n_P, n), temperature_k (n_P,) and end_pressure_pa, with NaN past the end of the branch.
+    '''
+    start = time.perf_counter()
+    pressures_pa = np.asarray(pressures_pa, dtype=float).ravel()
+    if azeotropes is None:
+        azeotropes = find_azeotropes(model, pressures_pa[0], tol=tol, t_bounds=t_bounds)
+    n_p, n = pressures_pa.size, model.n_components
+    branches = []
+    for azeotrope in azeotropes:
+        branch = {
+            'components': azeotrope['components'],
+            'kind': azeotrope['kind'],
+            'x': np.full((n_p, n), np.nan),
+            'temperature_k': np.full(n_p, np.nan),
+            'end_pressure_pa': None,
+        }
+        branch['x'][0] = azeotrope['x']
+        branch['temperature_k'][0] = azeotrope['temperature_k']
+        branches.append(branch)
+    n_newton = n_substeps = 0
+
+    def predict(branch, step):
+        # linear extrapolation in ln P from the last two points, or the last point alone
+        comps = list(branch['components'])
+        x_prev, t_prev = branch['x'][step - 1, comps], branch['temperature_k'][step - 1]
+        if step < 2:
+            return x_prev, t_prev
+        ratio = np.log(pressures_pa[step] / pressures_pa[step - 1]) / np.log(pressures_pa[step - 1] / pressures_pa[step - 2])
+        x_guess = x_prev + ratio * (x_prev - branch['x'][step - 2, comps])
+        if (x_guess <= X_MIN).any():
+            return x_prev, t_prev
+        return x_guess / x_guess.sum(), t_prev + ratio * (t_prev - branch['temperature_k'][step - 2])
+
+    for step in range(1, n_p):
+        alive = [b for b in branches if b['end_pressure_pa'] is None]
+        by_subset = {}
+        for branch in alive:
+            by_subset.setdefault(branch['components'], []).append(branch)
+        for subset, group in by_subset.items():
+            guesses = [predict(branch, step) for branch in group]
+            x0 = np.array([guess[0] for guess in guesses])
+            t0 = np.array([guess[1] for guess in guesses])
+            x, temp, converged, iterations = solve_azeotropes(model, subset, x0, t0, pressures_pa[step], tol=tol)
+            n_newton += int(iterations.sum())
+            for branch, x_sub, t, ok in zip(group, x, temp, converged):
+                if not ok:
+                    # retry this branch with smaller pressure steps from the last good point
+                    x_sub, t, ok, used = _substep(model, list(subset), branch['x'][step - 1, list(subset)],
+                                                  branch['temperature_k'][step - 1], pressures_pa[step - 1],
+                                                  pressures_pa[step], max_substeps, tol)
+                    n_substeps += used
+                if ok:
+                    branch['x'][step, list(subset)] = x_sub
+                    branch['x'][step, [i for i in range(n) if i not in subset]] = 0.0
+                    branch['temperature_k'][step] = t
+                else:
+                    branch['end_pressure_pa'] = float(pressures_pa[step - 1])
+    stats = {
+        'n_branches': len(branches),
+        'n_newton_iterations': n_newton,
+        'n_substeps': n_substeps,
+        'elapsed_s': time.perf_counter() - start,
+    }
+    return {'pressure_pa': pressures_pa, 'branches': branches, 'stats': stats}
+
+
+def _substep(model, subset, x_start, t_start, p_start, p_end, max_substeps, tol):
+    '''March one branch from p_start to p_end in 2, 4, ... geometric substeps.'''
+    used = 0
+    for level in range(1, max_substeps + 1):
+        n_sub = 2 ** level
+        x_sub, t, ok = x_start, t_start, True
+        for p in np.geomspace(p_start, p_end, n_sub + 1)[1:]:
+            x_new, t_new, converged, _ = solve_azeotropes(model, subset, x_sub[np.newaxis, :], [t], p, tol=tol)
+            used += 1
+            if not converged[0]:
+                ok = False
+                break
+            x_sub, t = x_new[0], t_new[0]
+        if ok:
+            return x_sub, t, True, used
+    return x_start, t_start, False, used
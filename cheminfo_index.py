@@ -0,0 +1,207 @@
+'''
+Offline index over the ChemInfo snapshot written by apex_export.py (apex_cheminfo.csv).
+
+Hash indexes on CASN, Name, CNAM, INAM and CanonicalSMILES, plus a sorted name list for prefix
+search and a trigram index for substring search. The built index is pickled next to the CSV so
+later processes load it in milliseconds instead of re-parsing the snapshot.
+'''
+import bisect
+import csv
+import os
+import pickle
+
+CHEMINFO_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'apex_cheminfo.csv')
+CACHE_VERSION = 2
+
+HASH_COLUMNS = ('CASN', 'Name', 'CNAM', 'INAM', 'CanonicalSMILES')
+NAME_COLUMNS = ('Name', 'CNAM', 'INAM')
+
+
+def _normalize(value):
+    if value is None:
+        return ''
+    return str(value).strip().upper()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns)
+
+
+class ChemInfoIndex:
+
+    def __init__(self, columns, records):
+        self.columns = list(columns)
+        self.records = [tuple(record) for record in records]
+        self._col = {name: i for i, name in enumerate(self.columns)}
+        self._build()
+
+    def _build(self):
+        self.hash_indexes = {}
+        for column in HASH_COLUMNS:
+            if column not in self._col:
+                continue
+            col = self._col[column]
+            # SMILES are case sensitive, everything else is matched case-insensitively
+            key_fn = str.strip if column == 'CanonicalSMILES' else _normalize
+            index = {}
+            for row, record in enumerate(self.records):
+                key = key_fn(record[col] or '')
+                if key:
+                    index.setdefault(key, []).append(row)
+            self.hash_indexes[column] = index
+
+        names = set()
+        for column in NAME_COLUMNS:
+            if column not in self._col:
+                continue
+            col = self._col[column]
+            for row, record in enumerate(self.records):
+                name = _normalize(record[col])
+                if name:
+                    names.add((name, row))
+        self.sorted_names = sorted(names)
+        self.trigram_index = {}
+        for position, (name, _) in enumerate(self.sorted_names):
+            for gram in _trigrams(name):
+                self.trigram_index.setdefault(gram, []).append(position)
+
+    @classmethod
+    def from_csv(cls, csv_path=CHEMINFO_CSV):
+        with open(csv_path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            columns = next(reader)
+            chem_id_col = columns.index('ChemID')
+            records, seen = [], set()
+            for row in reader:
+                # older exports appended the table, header included, more than once; skip the repeated
+                # header lines and keep the first copy of each ChemID
+                if len(row) != len(columns) or row == columns or row[chem_id_col] in seen:
+                    continue
+                seen.add(row[chem_id_col])
+                records.append(row)
+        return cls(columns, records)
+
+    @classmethod
+    def load(cls, csv_path=CHEMINFO_CSV, cache_path=None):
+        '''Load from the binary cache if it matches the CSV, otherwise rebuild and rewrite it.'''
+        cache_path = cache_path or os.path.splitext(csv_path)[0] + '.idx'
+        signature = _source_signature(csv_path)
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                payload = pickle.load(cache_file)
+            if payload.get('version') == CACHE_VERSION and payload.get('source') == signature:
+                index = cls.__new__(cls)
+                index.__dict__.update(payload['state'])
+                return index
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError):
+            pass
+        index = cls.from_csv(csv_path)
+        try:
+            index.save_cache(cache_path, signature)
+        except OSError as e:
+            print(f'could not write cheminfo cache {cache_path}.  error: {e}')
+        return index
+
+    def save_cache(self, cache_path, signature=None):
+        payload = {'version': CACHE_VERSION, 'source': signature, 'state': self.__dict__}
+        tmp_path = f'{cache_path}.tmp'
+        with open(tmp_path, 'wb') as cache_file:
+            pickle.dump(payload, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+
+    def __len__(self):
+        return len(self.records)
+
+    def as_dict(self, row):
+        return dict(zip(self.columns, self.records[row]))
+
+    def chem_id(self, row):
+        value = self.records[row][self._col['ChemID']]
+        return int(value) if value.isdigit() else value
+
+    def find(self, column, value):
+        '''Rows whose column exactly matches value (case-insensitive except for SMILES).'''
+        key = str(value).strip() if column == 'CanonicalSMILES' else _normalize(value)
+        return list(self.hash_indexes[column].get(key, []))
+
+    def chem_id_from_cas(self, cas_number):
+        rows = self.find('CASN', cas_number)
+        if len(rows) == 0:
+            return None
+        return self.chem_id(rows[0])
+
+    def chem_ids_from_cas(self, cas_numbers):
+        chem_ids = {}
+        for cas_number in cas_numbers:
+            chem_id = self.chem_id_from_cas(cas_number)
+            if chem_id is not None:
+                chem_ids[cas_number] = chem_id
+        return chem_ids
+
+    def search_prefix(self, prefix, limit=None):
+        '''Rows with a Name/CNAM/INAM starting with prefix, in name order.'''
+        prefix = _normalize(prefix)
+        start = bisect.bisect_left(self.sorted_names, (prefix, -1))
+        rows, seen = [], set()
+        for name, row in self.sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            if row not in seen:
+                seen.add(row)
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+    def search_substring(self, text, limit=None):
+        '''Rows with a Name/CNAM/INAM containing text, in name order.'''
+        text = _normalize(text)
+        if len(text) < 3:
+            positions = range(len(self.sorted_names))
+        else:
+            grams = sorted(_trigrams(text), key=lambda gram: len(self.trigram_index.get(gram, [])))
+            candidates = set(self.trigram_index.get(grams[0], []))
+            for gram in grams[1:]:
+                candidates.intersection_update(self.trigram_index.get(gram, []))
+                if len(candidates) == 0:
+                    break
+            positions = sorted(candidates)
+        rows, seen = [], set()
+        for position in positions:
+            name, row = self.sorted_names[position]
+            if text in name and row not in seen:
+                seen.add(row)
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+
+_indexes = {}
+
+
+def get_local_cheminfo_index(csv_path=CHEMINFO_CSV):
+    '''Shared index over a snapshot (one per resolved path), or None when the snapshot does not exist.'''
+    csv_path = os.path.abspath(csv_path)
+    index = _indexes.get(csv_path)
+    if index is None:
+        if not os.path.exists(csv_path):
+            return None
+        index = _indexes[csv_path] = ChemInfoIndex.load(csv_path)
+    return index
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    index = get_local_cheminfo_index()
+    print(f'loaded {len(index)} ChemInfo rows in {1000 * (time.perf_counter() - start):.1f} ms')
+    print(index.chem_id_from_cas('64-19-7'), index.chem_id_from_cas('7732-18-5'))
+    print([index.as_dict(row)['Name'] for row in index.search_prefix('ACETIC', limit=5)])
+    print([index.as_dict(row)['Name'] for row in index.search_substring('PROPION', limit=5)])
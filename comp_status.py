@@ -0,0 +1,147 @@
+'''
+Vectorized decoding of Aspen Plus completion-status (HAP_COMPSTATUS) bitfields.
+
+The tree snapshots store the raw status integers (2097282, 2097666, ...). decode_status turns a
+whole array of them into boolean flag columns with one broadcast AND against the flag masks.
+status_rollup then counts the flags per subtree and lists the incomplete inputs, so a snapshot
+of a large flowsheet can be checked for readiness without touching COM.
+
+The results bits follow the HAP_COMPSTATUS documentation. The input bits are read off the
+snapshots:
+- 0x40 marks required input that is missing: Components, Properties and Flowsheet in a blank
+  simulation;
+- 0x80 marks complete input;
+- 0x200 marks optional folders with nothing entered.
+
+Bits with no name here (0x2000, and 0x200000, which every node carries) decode as bit_<n>
+columns.
+'''
+import time
+
+import numpy as np
+
+from tree_crawler import load_records, split_path
+
+FLAGS = {
+    'results_success': 0x1,
+    'no_results': 0x2,
+    'results_warnings': 0x4,
+    'results_errors': 0x8,
+    'results_inaccessible': 0x10,
+    'results_incompatible': 0x20,
+    'input_incomplete': 0x40,
+    'input_complete': 0x80,
+    'input_empty': 0x200,
+}
+_KNOWN_MASK = sum(FLAGS.values())
+
+
+def status_array(values):
+    '''Status values as an int64 array, with -1 wherever the status is missing or not an integer.'''
+    return np.fromiter((value if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else -1
+                        for value in values), dtype=np.int64)
+
+
+def decode_status(codes, unknown_bits=True):
+    '''
+    Boolean flag columns for an array of status codes: a dict of flag name -> bool array, plus
+    'known' (False where the status was missing). With unknown_bits, every other bit set in any
+    code gets a bit_<n> column too.
+    '''
+    codes = np.asarray(codes, dtype=np.int64)
+    known = codes >= 0
+    codes = np.where(known, codes, 0)
+    masks = dict(FLAGS)
+    if unknown_bits:
+        extra = int(np.bitwise_or.reduce(codes, initial=0)) & ~_KNOWN_MASK
+        masks.update({f'bit_{bit}': 1 << bit for bit in range(extra.bit_length()) if extra >> bit & 1})
+    names = list(masks)
+    table = (codes[:, None] & np.array([masks[name] for name in names], dtype=np.int64)) != 0
+    columns = {name: table[:, i] for i, name in enumerate(names)}
+    columns['known'] = known
+    return columns
+
+
+def describe_status(code):
+    '''Names of the flags set in one status code, like CompStatus(code).attributesAsList().'''
+    columns = decode_status([code])
+    return [name for name, column in columns.items() if name != 'known' and column[0]]
+
+
+def _normal(path):
+    # snapshot paths are already '\\A\\B'; only rebuild the odd ones
+    if path.startswith('\\') and '\\\\' not in path and not path.endswith('\\'):
+        return path
+    return '\\' + '\\'.join(split_path(path))
+
+
+def _prefix(path, depth):
+    return '\\'.join(path.split('\\', depth + 1)[:depth + 1])
+
+
+def _parent(path):
+    return path.rpartition('\\')[0] or '\\'
+
+
+def status_rollup(paths, codes, depth=2, max_missing=20):
+    '''
+    Per-subtree completion summary of nodes given by paths and their status codes. Subtrees are
+    the path prefixes of depth segments (\\Data\\Properties at the default of 2). Each subtree gets
+    node counts per flag and its missing inputs: the incomplete nodes with no incomplete node
+    below them (at most max_missing listed). Returns a dict with ready (no incomplete input
+    anywhere), totals, subtrees and elapsed_s.
+    '''
+    start = time.perf_counter()
+    paths = [_normal(str(path)) for path in paths]
+    columns = decode_status(codes)
+    group_index = {}
+    group_of = np.fromiter((group_index.setdefault(_prefix(path, depth), len(group_index)) for path in paths),
+                           dtype=np.int64, count=len(paths))
+    groups = list(group_index)
+    counted = ['input_incomplete', 'input_complete', 'input_empty', 'no_results', 'results_warnings', 'results_errors']
+    counts = {name: np.bincount(group_of, weights=columns[name], minlength=len(groups)).astype(int) for name in counted}
+    nodes = np.bincount(group_of, minlength=len(groups))
+    unknown = np.bincount(group_of, weights=~columns['known'], minlength=len(groups)).astype(int)
+
+    incomplete = np.flatnonzero(columns['input_incomplete'])
+    incomplete_parents = {_parent(paths[i]).upper() for i in incomplete}
+    subtrees = {group: {'nodes': int(nodes[g]), 'unknown': int(unknown[g]), 'missing': [],
+                        **{name: int(counts[name][g]) for name in counted}}
+                for g, group in enumerate(groups)}
+    for i in incomplete:
+        if paths[i].upper() not in incomplete_parents:
+            missing = subtrees[groups[group_of[i]]]['missing']
+            if len(missing) < max_missing:
+                missing.append(paths[i])
+    totals = {'nodes': len(paths), 'unknown': int((~columns['known']).sum()),
+              **{name: int(columns[name].sum()) for name in counted}}
+    return {'ready': totals['input_incomplete'] == 0, 'totals': totals, 'subtrees': subtrees,
+            'elapsed_s': time.perf_counter() - start}
+
+
+def snapshot_rollup(snapshot_path, depth=2, max_missing=20):
+    '''status_rollup over every readable record of a tree snapshot (either tree_crawler format).'''
+    paths, codes = [], []
+    for record in load_records(snapshot_path):
+        if 'error' not in record:
+            paths.append(record['path'])
+            codes.append(record.get('comp_status'))
+    return status_rollup(paths, status_array(codes), depth=depth, max_missing=max_missing)
+
+
+def print_rollup(rollup):
+    totals = rollup['totals']
+    print(f'{totals["nodes"]} nodes: {totals["input_incomplete"]} incomplete, {totals["input_complete"]} complete, '
+          f'{totals["input_empty"]} empty, {totals["results_errors"]} with errors -> '
+          f'{"ready" if rollup["ready"] else "NOT ready"} ({1000 * rollup["elapsed_s"]:.1f} ms)')
+    for subtree, summary in sorted(rollup['subtrees'].items()):
+        if summary['input_incomplete'] or summary['results_errors']:
+            print(f'  {subtree}: {summary["input_incomplete"]}/{summary["nodes"]} incomplete, {summary["results_errors"]} errors')
+            for path in summary['missing']:
+                print(f'    missing input: {path}')
+
+
+if __name__ == '__main__':
+    for snapshot in ('aspen_data_tree.txt', 'hoac_h2o_aspen_data_tree.txt'):
+        print(snapshot)
+        print_rollup(snapshot_rollup(snapshot))
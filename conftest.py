@@ -0,0 +1,71 @@
+'''
+Shared pytest fixtures. apex_session is an in-memory sqlite database built from the emnengr ORM
+tables, so the Apex lookups can be checked without SQL Server (skipped when emnengr is missing).
+'''
+import datetime
+import itertools
+
+import pytest
+
+CHEM_IDS = {'64-19-7': 11, '7732-18-5': 12, '79-09-4': 13}
+PROPERTY_IDS = {'MW': 1, 'TC': 2}
+CONSTANTS = [(11, 1, 60.052), (12, 1, 18.015), (11, 2, 591.95), (12, 2, 647.096), (13, 2, 600.81)]
+
+
+def _filled(table, values, counter):
+    # fill required columns the lookups never read so the inserts pass NOT NULL constraints
+    row = dict(values)
+    for column in table.columns:
+        if column.name in row or column.nullable or column.default is not None or column.server_default is not None:
+            continue
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = str
+        if python_type is int:
+            if column.primary_key and len(table.primary_key.columns) == 1:
+                continue
+            row[column.name] = next(counter)
+        elif python_type is float:
+            row[column.name] = 0.0
+        elif python_type is bool:
+            row[column.name] = False
+        elif python_type in (datetime.datetime, datetime.date):
+            row[column.name] = datetime.datetime(2000, 1, 1)
+        elif python_type is bytes:
+            row[column.name] = b''
+        else:
+            row[column.name] = f'x{next(counter)}'
+    return row
+
+
+@pytest.fixture
+def apex_engine():
+    physprop = pytest.importorskip('emnengr.apex.emnphysprop2')
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+
+    tables = [physprop.ChemInfo.__table__, physprop.Property.__table__, physprop.ConstValueData.__table__]
+    schemas = {table.schema: None for table in tables if table.schema is not None}
+    engine = sqlalchemy.create_engine('sqlite://').execution_options(schema_translate_map=schemas)
+    tables[0].metadata.create_all(engine, tables=tables)
+    counter = itertools.count(1000)
+    with engine.begin() as connection:
+        connection.execute(tables[0].insert(), [_filled(tables[0], {'ChemID': chem_id, 'CASN': cas}, counter)
+                                                for cas, chem_id in CHEM_IDS.items()])
+        connection.execute(tables[1].insert(), [_filled(tables[1], {'Abbr': abbr, 'TypeID': type_id}, counter)
+                                                for abbr, type_id in PROPERTY_IDS.items()])
+        connection.execute(tables[2].insert(), [_filled(tables[2], {'ChemID': c, 'PropertyID': p, 'Value': v}, counter)
+                                                for c, p, v in CONSTANTS])
+    return engine
+
+
+@pytest.fixture
+def apex_session(apex_engine):
+    from sqlalchemy.orm import Session
+
+    import emnengr_utils
+
+    emnengr_utils.property_id_cache.invalidate()
+    with Session(apex_engine) as session:
+        yield session
+    emnengr_utils.property_id_cache.invalidate()
@@ -1,65 +1,183 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
 from property_abbrev import PropertyAbbrev
+from cheminfo_index import get_local_cheminfo_index
 
 from sqlalchemy import text, or_, and_
 from emnengr.apex.emnphysprop2 import Databank, ApexSession, BinCoeffSet, BinCoeff, ChemInfo, ConstValueData, Property
 
+# keeps IN (...) lists under the SQL Server 2100 parameter limit
+MAX_IN_PARAMS = 1000
 
-def get_chem_id_from_cas(cas_number: str):
-    with ApexSession() as session:
+# resolve CAS numbers from the local apex_cheminfo.csv snapshot before asking the server
+USE_LOCAL_CHEMINFO = True
+
+def _local_cheminfo(session=None, use_local=None):
+    # an injected session (e.g. a sqlite stand-in) is the source of truth unless use_local says otherwise
+    if use_local is None:
+        use_local = USE_LOCAL_CHEMINFO and session is None
+    if not use_local:
+        return None
+    try:
+        return get_local_cheminfo_index()
+    except Exception as e:
+        print(f'could not load local cheminfo index.  error: {e}')
+        return None
+
+@contextmanager
+def _session_scope(session=None):
+    # reuse a caller's session (e.g. a sqlite stand-in) or open a fresh ApexSession
+    if session is not None:
+        yield session
+        return
+    with ApexSession() as new_session:
+        yield new_session
+
+def _chunks(values, size=MAX_IN_PARAMS):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def get_chem_id_from_cas(cas_number: str, session=None, use_local=None):
+    local_index = _local_cheminfo(session, use_local)
+    if local_index is not None:
+        chem_id = local_index.chem_id_from_cas(cas_number)
+        if chem_id is not None:
+            return chem_id
+    with _session_scope(session) as session:
         query = text("SELECT ChemID FROM ChemInfo WHERE CASN = :cas_number")
         result = session.execute(query, {"cas_number": cas_number}).fetchone()
     if result is None:
         return None
     return result.ChemID  # or result[0]
 
-def get_property_id(property_abbrev):
-    with ApexSession() as session:
-        property_data = session.query(Property).filter(Property.Abbr == property_abbrev).all()
-        if property_data is None:
-            return None
-        if not isinstance(property_data, list):
-            return None
-        if len(property_data) != 1:
-            return None
-        prop = property_data[0]
-        ans = None
-        try:
-            ans = prop.TypeID
-        except Exception as e:
-            print(f'could not get property id for {property_abbrev}.  error: {e}')
-        return ans
-
-def get_constant_values(chem_id_list, prop_id):
-    with ApexSession() as session:
-        const_values = (
-            session.query(ConstValueData)
-            .filter(
-                ConstValueData.ChemID.in_(chem_id_list),
-                ConstValueData.PropertyID == prop_id
+class PropertyIdCache:
+    """
+    Process-wide Property.Abbr -> TypeID map. The Property table is small and static, so the first
+    lookup loads every PropertyAbbrev entry in one query and later lookups are dict hits.
+    Abbreviations outside PropertyAbbrev are fetched on demand and remembered (including misses).
+    """
+
+    def __init__(self):
+        self._ids = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _load(self, session):
+        ids = {abbrev: None for abbrev in PropertyAbbrev.values()}
+        self._store(ids, session.query(Property.Abbr, Property.TypeID).filter(Property.Abbr.in_(list(ids))).all())
+        self._ids = ids
+        self.loads += 1
+
+    @staticmethod
+    def _store(ids, rows):
+        counts = {}
+        for abbrev, type_id in rows:
+            counts[abbrev] = counts.get(abbrev, 0) + 1
+            # an abbreviation that is not unique in the Property table is treated as unknown
+            ids[abbrev] = type_id if counts[abbrev] == 1 else None
+
+    def get_many(self, property_abbrevs, session=None):
+        property_abbrevs = list(dict.fromkeys(property_abbrevs))
+        with self._lock:
+            missing = [abbrev for abbrev in property_abbrevs if self._ids is None or abbrev not in self._ids]
+            self.hits += len(property_abbrevs) - len(missing)
+            self.misses += len(missing)
+            if len(missing) > 0:
+                with _session_scope(session) as session:
+                    if self._ids is None:
+                        self._load(session)
+                    extra = [abbrev for abbrev in missing if abbrev not in self._ids]
+                    if len(extra) > 0:
+                        for abbrev in extra:
+                            self._ids[abbrev] = None
+                        self._store(self._ids, session.query(Property.Abbr, Property.TypeID).filter(Property.Abbr.in_(extra)).all())
+            return {abbrev: self._ids[abbrev] for abbrev in property_abbrevs}
+
+    def get(self, property_abbrev, session=None):
+        return self.get_many([property_abbrev], session=session)[property_abbrev]
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+        }
+
+property_id_cache = PropertyIdCache()
+
+def get_property_id(property_abbrev, session=None):
+    return property_id_cache.get(property_abbrev, session=session)
+
+def align_values(keys, key_value_pairs):
+    """
+    Join unordered (key, value) rows back onto keys in input order.
+    Returns (values, found, duplicate): values is a float array with NaN where a key has no row,
+    found marks keys with at least one row and duplicate marks keys with more than one
+    (e.g. the same constant stored in several databanks; the first row is kept).
+    """
+    values = np.full(len(keys), np.nan)
+    found = np.zeros(len(keys), dtype=bool)
+    duplicate = np.zeros(len(keys), dtype=bool)
+    positions = {}
+    for i, key in enumerate(keys):
+        positions.setdefault(key, []).append(i)
+    for key, value in key_value_pairs:
+        idx = positions.get(key)
+        if idx is None or value is None:
+            continue
+        if found[idx[0]]:
+            duplicate[idx] = True
+            continue
+        values[idx] = value
+        found[idx] = True
+    return values, found, duplicate
+
+def get_constant_values(chem_id_list, prop_id, session=None, return_mask=False):
+    if chem_id_list is None or len(chem_id_list) == 0:
+        return None
+    rows = []
+    with _session_scope(session) as session:
+        for chunk in _chunks(list(dict.fromkeys(chem_id_list))):
+            rows.extend(
+                session.query(ConstValueData.ChemID, ConstValueData.Value)
+                .filter(
+                    ConstValueData.ChemID.in_(chunk),
+                    ConstValueData.PropertyID == prop_id
+                )
+                .all()
             )
-            .all()
-        )
-        if const_values is None:
-            return None
-        if not isinstance(const_values, list):
-            return None
-        if len(const_values) != len(chem_id_list):
-            return None
-        ans_out = []
-        for const, chem_id in zip(const_values, chem_id_list):
-            if const.ChemID == chem_id:
-                ans_out.append(const.Value)
-        return ans_out
-        
-def get_mws(chem_id_list):
-    mw_id = get_property_id(property_abbrev=PropertyAbbrev.MW)
+    values, found, duplicate = align_values(chem_id_list, rows)
+    if return_mask:
+        return values, found, duplicate
+    return [value if is_found else None for value, is_found in zip(values.tolist(), found)]
+
+def get_mws(chem_id_list, session=None):
+    # molecular weights in input order, or None when any of them is missing
+    mw_id = get_property_id(PropertyAbbrev.MW, session=session)
     if mw_id is None:
         return None
-    mws = get_constant_values(chem_id_list, mw_id)
-    return mws
+    result = get_constant_values(chem_id_list, mw_id, session=session, return_mask=True)
+    if result is None:
+        return None
+    values, found, _ = result
+    if not found.all():
+        return None
+    return values.tolist()
 
-def get_databanks(databank_name_list = None, description_contains = None):
-    with ApexSession() as session:
+def get_databanks(databank_name_list = None, description_contains = None, session=None):
+    with _session_scope(session) as session:
         # Query all rows from the Databank table
         if databank_name_list is None:
             return session.query(Databank).all()
@@ -85,13 +203,87 @@ def get_coeff_sets_info(chem_ids, databanks):
     
     return filtered_bin_coeff_sets
 
-def get_coeff_set_dict(coeff_sets_info):
+def get_mixture_coeff_sets_info(chem_ids, databanks, session=None):
+    # every binary pair of an N-component mixture in one query
+    databank_ids = [bank.ID for bank in databanks]
+    chem_ids = list(dict.fromkeys(chem_ids))
+    with _session_scope(session) as session:
+        return session.query(BinCoeffSet).filter(
+            BinCoeffSet.DatabankID.in_(databank_ids),
+            BinCoeffSet.ChemID_i.in_(chem_ids),
+            BinCoeffSet.ChemID_j.in_(chem_ids),
+            BinCoeffSet.ChemID_i != BinCoeffSet.ChemID_j
+        ).all()
+
+def get_coeff_set_dict(coeff_sets_info, session=None):
     coeff_set_ids = [coeff_set_info.ID for coeff_set_info in coeff_sets_info]
-    with ApexSession() as session:
+    with _session_scope(session) as session:
         coeff_sets = session.query(BinCoeff).filter(
             BinCoeff.CoeffSetID.in_(coeff_set_ids)
         ).all()
     coeff_set_dict = {}
     for coeff_set in coeff_sets:
         coeff_set_dict[coeff_set.CoeffSetID] = coeff_set
-    return coeff_set_dict
\ No newline at end of file
+    return coeff_set_dict
+
+def get_chem_ids_from_cas(cas_numbers, session=None, use_local=None):
+    unique_cas = list(dict.fromkeys(cas_numbers))
+    chem_ids = {}
+    local_index = _local_cheminfo(session, use_local)
+    if local_index is not None:
+        chem_ids.update(local_index.chem_ids_from_cas(unique_cas))
+        unique_cas = [cas_number for cas_number in unique_cas if cas_number not in chem_ids]
+    if len(unique_cas) == 0:
+        return chem_ids
+    with _session_scope(session) as session:
+        for chunk in _chunks(unique_cas):
+            rows = session.query(ChemInfo.CASN, ChemInfo.ChemID).filter(ChemInfo.CASN.in_(chunk)).all()
+            for cas_number, chem_id in rows:
+                chem_ids.setdefault(cas_number, chem_id)
+    return chem_ids
+
+def get_property_ids(property_abbrevs, session=None):
+    prop_ids = property_id_cache.get_many(property_abbrevs, session=session)
+    return {abbrev: prop_id for abbrev, prop_id in prop_ids.items() if prop_id is not None}
+
+def get_property_matrix(cas_numbers, property_abbrevs, session=None, use_local=None):
+    """
+    Resolve CAS numbers and PropertyAbbrev constants to a dense chemical x property matrix.
+    Everything runs in one session with one query per table (chunked for very long lists); the
+    Property lookup is served from property_id_cache once it is warm.
+    Returns (matrix, chem_index, prop_index): matrix[chem_index[cas], prop_index[abbrev]],
+    with NaN wherever the CAS number, property or constant value is unknown.
+    CAS numbers are resolved from the local apex_cheminfo.csv index only when no session is
+    passed, unless use_local says otherwise.
+    """
+    chem_index = {cas_number: i for i, cas_number in enumerate(dict.fromkeys(cas_numbers))}
+    prop_index = {abbrev: j for j, abbrev in enumerate(dict.fromkeys(property_abbrevs))}
+    matrix = np.full((len(chem_index), len(prop_index)), np.nan)
+    if len(chem_index) == 0 or len(prop_index) == 0:
+        return matrix, chem_index, prop_index
+
+    with _session_scope(session) as session:
+        chem_ids = get_chem_ids_from_cas(list(chem_index), session=session, use_local=use_local)
+        prop_ids = get_property_ids(list(prop_index), session=session)
+        if len(chem_ids) == 0 or len(prop_ids) == 0:
+            return matrix, chem_index, prop_index
+
+        # two CAS numbers (e.g. a retired and a current one) can resolve to the same ChemID
+        rows_of_chem_id = {}
+        for cas_number, chem_id in chem_ids.items():
+            rows_of_chem_id.setdefault(chem_id, []).append(chem_index[cas_number])
+        col_of_prop_id = {prop_id: prop_index[abbrev] for abbrev, prop_id in prop_ids.items()}
+        prop_id_list = list(col_of_prop_id)
+        rows = []
+        for chunk in _chunks(list(rows_of_chem_id)):
+            rows.extend(
+                session.query(ConstValueData.ChemID, ConstValueData.PropertyID, ConstValueData.Value).filter(
+                    ConstValueData.ChemID.in_(chunk),
+                    ConstValueData.PropertyID.in_(prop_id_list)
+                ).all()
+            )
+    cells = [(row * len(prop_index) + col_of_prop_id[prop_id], value)
+             for chem_id, prop_id, value in rows for row in rows_of_chem_id[chem_id]]
+    values, _, _ = align_values(range(matrix.size), cells)
+    matrix = values.reshape(matrix.shape)
+    return matrix, chem_index, prop_index
@@ -1,5 +1,7 @@
 import numpy as np
 
+from property_abbrev import PropertyAbbrev
+
 def mole_fracts_from_mass_fracts(mass_fracts, mws):
     mol_fracts = None
     if not isinstance(mws, list) and not isinstance(mws, np.ndarray):
@@ -42,6 +44,132 @@ def mass_fracts_from_mole_fracts(mole_fracts, mws):
         print(f'Could not calculate mass fractions.  Error: {e}')
     return mass_fracts.tolist()
 
+def _convert_fracts_batch(fracts, mws, out, multiply):
+    fracts = np.asarray(fracts, dtype=float)
+    mw_np = np.asarray(mws, dtype=float)
+    if fracts.ndim == 1:
+        fracts = fracts[np.newaxis, :]
+    if fracts.ndim != 2 or mw_np.ndim != 1 or fracts.shape[1] != mw_np.shape[0]:
+        raise ValueError(f'expected (n_samples, {mw_np.shape[0] if mw_np.ndim == 1 else "n"}) compositions, got {fracts.shape}')
+    if out is None:
+        out = np.empty(fracts.shape)
+    elif out.ndim == 1 and out.shape == fracts.shape[1:]:
+        # a single composition with a 1-D buffer: write through a (1, n) view of it
+        out = out.reshape(fracts.shape)
+    if out.shape != fracts.shape:
+        raise ValueError(f'output buffer has shape {out.shape}, expected {fracts.shape}')
+    non_negative = (fracts >= 0).all(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if multiply:
+            np.multiply(fracts, mw_np, out=out)
+        else:
+            np.divide(fracts, mw_np, out=out)
+        totals = out.sum(axis=1)
+        valid = np.isfinite(out).all(axis=1) & (totals > 0) & non_negative
+        np.divide(out, totals[:, np.newaxis], out=out, where=valid[:, np.newaxis])
+    out[~valid] = np.nan
+    return out, valid
+
+def mole_fracts_from_mass_fracts_batch(mass_fracts, mws, out=None):
+    """
+    Vectorized mole_fracts_from_mass_fracts for an (n_samples x n_components) array.
+    Returns (mole_fracts, valid); rows with negative/non-finite input or a zero total are NaN and
+    flagged False in valid. Pass out to write into a preallocated array (may be mass_fracts itself);
+    a single 1-D composition is treated as one row and may use a 1-D out of the same length.
+    """
+    return _convert_fracts_batch(mass_fracts, mws, out, multiply=False)
+
+def mass_fracts_from_mole_fracts_batch(mole_fracts, mws, out=None):
+    """
+    Vectorized mass_fracts_from_mole_fracts for an (n_samples x n_components) array.
+    Returns (mass_fracts, valid) with the same conventions as mole_fracts_from_mass_fracts_batch.
+    """
+    return _convert_fracts_batch(mole_fracts, mws, out, multiply=True)
+
+# composition bases: <quantity>_<form>, quantity in mole / mass / lvol (standard liquid volume),
+# form in frac / ppm (normalized per stream) or flow (absolute amount per stream)
+COMPOSITION_QUANTITIES = ('mole', 'mass', 'lvol')
+COMPOSITION_FORMS = ('frac', 'ppm', 'flow')
+
+def _parse_basis(basis):
+    quantity, _, form = basis.partition('_')
+    if quantity not in COMPOSITION_QUANTITIES or form not in COMPOSITION_FORMS:
+        raise ValueError(f'unknown composition basis {basis}.  expected <{"|".join(COMPOSITION_QUANTITIES)}>_<{"|".join(COMPOSITION_FORMS)}>')
+    return quantity, form
+
+def _moles_per_unit(quantity, mws, lvols, n_components):
+    # multiplier taking one unit of the quantity to moles, per component
+    if quantity == 'mole':
+        return np.ones(n_components)
+    props = mws if quantity == 'mass' else lvols
+    if props is None:
+        raise ValueError(f'{quantity} basis needs {"mws" if quantity == "mass" else "lvols"}')
+    props = np.asarray(props, dtype=float)
+    if props.shape != (n_components,):
+        raise ValueError(f'expected {n_components} {quantity} properties, got shape {props.shape}')
+    with np.errstate(divide='ignore'):
+        return 1.0 / props
+
+def convert_composition(values, from_basis, to_basis, mws=None, lvols=None, total=None, out=None):
+    """
+    Convert a batch of stream compositions between mole/mass/lvol fractions, ppm and flows.
+    values is (n_streams x n_components); mws and lvols (standard liquid molar volume, LVOL) are
+    per-component vectors and only needed for the bases that use them (not at all when only the
+    form changes, e.g. mass_frac -> mass_ppm). total gives the stream flow (scalar or per stream,
+    in the from-basis quantity) when going from frac/ppm to a flow, and defaults to 1. A single
+    1-D composition may use a 1-D out. Returns (converted, valid); invalid streams are NaN and
+    flagged False.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[np.newaxis, :]
+    if values.ndim != 2:
+        raise ValueError(f'expected (n_streams, n_components) compositions, got {values.shape}')
+    from_quantity, from_form = _parse_basis(from_basis)
+    to_quantity, to_form = _parse_basis(to_basis)
+    n_components = values.shape[1]
+    if out is None:
+        out = np.empty(values.shape)
+    elif out.ndim == 1 and out.shape == values.shape[1:]:
+        out = out.reshape(values.shape)
+    if out.shape != values.shape:
+        raise ValueError(f'output buffer has shape {out.shape}, expected {values.shape}')
+
+    if from_quantity == to_quantity:
+        # frac <-> ppm <-> flow on one quantity is pure scaling
+        factor = np.ones(n_components)
+    else:
+        factor = _moles_per_unit(from_quantity, mws, lvols, n_components) / _moles_per_unit(to_quantity, mws, lvols, n_components)
+    non_negative = (values >= 0).all(axis=1)
+    from_totals = values.sum(axis=1) * (1e-6 if from_form == 'ppm' else 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.multiply(values, factor, out=out)
+        if from_form == 'ppm':
+            out *= 1e-6
+        if from_form != 'flow' and to_form == 'flow':
+            # fractions describe one unit of the from-quantity; rescale to the requested stream total
+            scale = np.ones(values.shape[0]) if total is None else np.broadcast_to(np.asarray(total, dtype=float), (values.shape[0],))
+            out *= (scale / from_totals)[:, np.newaxis]
+        elif to_form != 'flow':
+            out /= out.sum(axis=1)[:, np.newaxis]
+            if to_form == 'ppm':
+                out *= 1e6
+        valid = non_negative & np.isfinite(out).all(axis=1)
+    out[~valid] = np.nan
+    return out, valid
+
+def convert_composition_from_props(values, from_basis, to_basis, prop_matrix, prop_index, total=None, out=None):
+    """
+    convert_composition with MW and LVOL taken from a (n_components x n_props) property matrix,
+    e.g. the one returned by emnengr_utils.get_property_matrix (prop_index maps abbrev -> column).
+    """
+    prop_matrix = np.asarray(prop_matrix, dtype=float)
+    mws = prop_matrix[:, prop_index[PropertyAbbrev.MW]] if PropertyAbbrev.MW in prop_index else None
+    lvols = prop_matrix[:, prop_index[PropertyAbbrev.LVOL]] if PropertyAbbrev.LVOL in prop_index else None
+    return convert_composition(values, from_basis, to_basis, mws=mws, lvols=lvols, total=total, out=out)
+
 if __name__ == '__main__':
     print(mole_fracts_from_mass_fracts([0.23724519090467566, 0.7627548090953243], [18.01528, 28.96]))
-    print(mass_fracts_from_mole_fracts([0.4456031768306043,  0.5543968231693956], [18.01528, 28.96]))
\ No newline at end of file
+    print(mass_fracts_from_mole_fracts([0.4456031768306043,  0.5543968231693956], [18.01528, 28.96]))
+    print(mole_fracts_from_mass_fracts_batch([[0.23724519090467566, 0.7627548090953243], [0.5, 0.5], [-1.0, 2.0]], [18.01528, 28.96]))
+    print(convert_composition([[0.7, 0.3]], 'mass_frac', 'mole_flow', mws=[60.05, 18.01528], total=100.0))
@@ -0,0 +1,264 @@
+'''
+Hayden-O'Connell (HOC) vapor fugacity coefficients with chemical-theory dimerization, evaluated with NumPy.
+
+The second virial coefficient of every pair is split into a free (physical) part B_F and a
+dimerization part B_D = B_metastable + B_bound + B_chemical (Hayden and O'Connell, 1975).
+Dimers are handled with chemical theory, K_ij = -(2 - delta_ij) B_D,ij / RT, so strongly
+associating components such as acetic acid get the large fugacity-coefficient drop that a plain
+virial correction misses.
+
+Inputs per component: TC (K), PC (Pa), radius of gyration RD (Angstrom), dipole moment (debye)
+and the association parameter matrix eta (Aspen's HOCETA, e.g. 4.5 for carboxylic acids,
+1.7 for water, 2.5 for acid-water). Composition-independent terms (B_F, B_D) are cached per
+temperature, so repeated calls at the same T only redo the composition-dependent solve.
+'''
+from collections import OrderedDict
+
+import numpy as np
+
+from property_abbrev import PropertyAbbrev
+
+R_GAS = 8.314462618  # J/(mol K)
+PA_PER_ATM = 101325.0
+CM3_TO_M3 = 1e-6
+
+# Apex stores constants in SI: PC in Pa, RG in m, DM in (J m3)^0.5
+ANGSTROM_PER_M = 1e10
+DEBYE_PER_SI_DIPOLE = 1.0 / 3.16227766e-25
+
+_CACHE_SIZE = 4096
+
+
+def _nonpolar_acentric(rd):
+    return 0.006026 * rd + 0.02087 * rd ** 2 - 0.001366 * rd ** 3
+
+
+def _rd_from_acentric(omega):
+    # invert the omega' cubic so components without RG can fall back on ACEN
+    rd = np.zeros_like(omega)
+    for i, target in enumerate(omega):
+        roots = np.roots([-0.001366, 0.02087, 0.006026, -target])
+        real = roots[np.isreal(roots)].real
+        real = real[real > 0]
+        rd[i] = real.min() if real.size > 0 else np.nan
+    return rd
+
+
+class HOCModel:
+
+    def __init__(self, tc, pc, rd, dipole, eta=None, component_ids=None):
+        tc = np.asarray(tc, dtype=float)
+        pc_atm = np.asarray(pc, dtype=float) / PA_PER_ATM
+        rd = np.asarray(rd, dtype=float)
+        mu = np.asarray(dipole, dtype=float)
+        n = tc.size
+        self.n_components = n
+        self.component_ids = list(component_ids) if component_ids is not None else list(range(n))
+        eta = np.zeros((n, n)) if eta is None else np.asarray(eta, dtype=float)
+        if eta.shape != (n, n):
+            raise ValueError(f'eta must be ({n}, {n}), got {eta.shape}')
+        self.eta = eta
+
+        # pure-component parameters
+        w = _nonpolar_acentric(rd)
+        eta_ii = np.diag(eta)
+        eps_np = tc * (0.748 + 0.91 * w - 0.4 * eta_ii / (2.0 + 20.0 * w))
+        sig_np = (2.44 - w) * (1.0133 * tc / pc_atm) ** (1.0 / 3.0)
+        xi = np.where(
+            mu >= 1.45,
+            1.7941e7 * mu ** 4 / ((2.882 - 1.882 * w / (0.03 + w)) * tc * sig_np ** 6 * eps_np),
+            0.0,
+        )
+        c1 = (16.0 + 400.0 * w) / (10.0 + 400.0 * w)
+        c2 = 3.0 / (10.0 + 400.0 * w)
+        eps = eps_np * (1.0 - xi * c1 * (1.0 - xi * (1.0 + c1) / 2.0))
+        sig = sig_np * (1.0 + xi * c2) ** (1.0 / 3.0)
+
+        # cross parameters; the diagonal is overwritten with the pure values below
+        w_ij = 0.5 * (w[:, None] + w[None, :])
+        eps_ij_np = 0.7 * np.sqrt(eps[:, None] * eps[None, :]) + 0.6 / (1.0 / eps[:, None] + 1.0 / eps[None, :])
+        sig_ij_np = np.sqrt(sig[:, None] * sig[None, :])
+        polar_i = (mu[:, None] >= 2.0) & (mu[None, :] == 0.0)
+        polar_j = (mu[None, :] >= 2.0) & (mu[:, None] == 0.0)
+        xi_ij = np.zeros((n, n))
+        denom = eps_ij_np * sig_ij_np ** 6
+        xi_ij = np.where(polar_i, mu[:, None] ** 2 * eps[None, :] ** (2.0 / 3.0) * sig[None, :] ** 4 / denom, xi_ij)
+        xi_ij = np.where(polar_j, mu[None, :] ** 2 * eps[:, None] ** (2.0 / 3.0) * sig[:, None] ** 4 / denom, xi_ij)
+        c1_ij = (16.0 + 400.0 * w_ij) / (10.0 + 400.0 * w_ij)
+        c2_ij = 3.0 / (10.0 + 400.0 * w_ij)
+        self.eps = eps_ij_np * (1.0 + xi_ij * c1_ij)
+        self.sigma = sig_ij_np * (1.0 - xi_ij * c2_ij) ** (1.0 / 3.0)
+        self.omega = w_ij
+        np.fill_diagonal(self.eps, eps)
+        np.fill_diagonal(self.sigma, sig)
+        np.fill_diagonal(self.omega, w)
+
+        self.b0 = 1.26184 * self.sigma ** 3  # cm3/mol
+        mu_star = 7243.8 * mu[:, None] * mu[None, :] / (self.eps * self.sigma ** 3)
+        self.mu_star = mu_star
+        self.mu_star_eff = np.where(mu_star < 0.04, mu_star, np.where(mu_star < 0.25, 0.0, mu_star - 0.25))
+        self._bound_a = -0.3 - 0.05 * mu_star
+        self._bound_dh = 1.99 + 0.2 * mu_star ** 2
+        strong = eta >= 4.5
+        self._chem_e = np.exp(eta * (np.where(strong, 42800.0 / (self.eps + 22400.0), 650.0 / (self.eps + 300.0)) - 4.27))
+        self._cache = OrderedDict()
+
+    @classmethod
+    def from_property_matrix(cls, prop_matrix, prop_index, eta=None, component_ids=None):
+        '''
+        Build from a property matrix in Apex SI units (get_property_matrix with TC, PC, RG, DM and,
+        as a fallback for a missing RG, ACEN). A missing dipole moment is taken as zero.
+        '''
+        prop_matrix = np.asarray(prop_matrix, dtype=float)
+
+        def column(abbrev):
+            if abbrev not in prop_index:
+                return np.full(prop_matrix.shape[0], np.nan)
+            return prop_matrix[:, prop_index[abbrev]]
+
+        rd = column(PropertyAbbrev.RG) * ANGSTROM_PER_M
+        missing_rd = np.isnan(rd)
+        if missing_rd.any():
+            rd[missing_rd] = _rd_from_acentric(column(PropertyAbbrev.ACEN)[missing_rd])
+        dipole = np.nan_to_num(column(PropertyAbbrev.DM)) * DEBYE_PER_SI_DIPOLE
+        return cls(column(PropertyAbbrev.TC), column(PropertyAbbrev.PC), rd, dipole, eta=eta, component_ids=component_ids)
+
+    def _virials_at(self, temp_k):
+        # temp_k: (n_T,) -> B_free, B_dimer of shape (n_T, n, n)
+        temp_k = np.asarray(temp_k, dtype=float).reshape(-1, 1, 1)
+        t_star = temp_k / self.eps
+        inv_t = 1.0 / t_star - 1.6 * self.omega
+        b_free = self.b0 * (0.94 - 1.47 * inv_t - 0.85 * inv_t ** 2 + 1.015 * inv_t ** 3)
+        b_free -= self.b0 * self.mu_star_eff * (0.74 - 3.0 * inv_t + 2.1 * inv_t ** 2 + 2.1 * inv_t ** 3)
+        b_bound = self.b0 * self._bound_a * np.exp(self._bound_dh / t_star)
+        b_chem = self.b0 * self._chem_e * (1.0 - np.exp(1500.0 * self.eta / temp_k))
+        return b_free, b_bound + b_chem
+
+    def second_virial(self, temp_k):
+        '''(B_free, B_dimer) in cm3/mol for each temperature: two arrays of shape (n_T, n, n).'''
+        temp_k = np.asarray(temp_k, dtype=float).ravel()
+        unique_t, inverse = np.unique(temp_k, return_inverse=True)
+        if unique_t.size > _CACHE_SIZE // 4:
+            # a sweep over many distinct temperatures would only thrash the cache
+            b_free, b_dimer = self._virials_at(unique_t)
+            return b_free[inverse], b_dimer[inverse]
+        b_free = np.empty((unique_t.size, self.n_components, self.n_components))
+        b_dimer = np.empty_like(b_free)
+        missing = []
+        for k, t in enumerate(unique_t.tolist()):
+            cached = self._cache.get(t)
+            if cached is None:
+                missing.append(k)
+            else:
+                self._cache.move_to_end(t)
+                b_free[k], b_dimer[k] = cached
+        if len(missing) > 0:
+            b_free[missing], b_dimer[missing] = self._virials_at(unique_t[missing])
+            for k in missing:
+                self._cache[float(unique_t[k])] = (b_free[k], b_dimer[k])
+            while len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return b_free[inverse], b_dimer[inverse]
+
+    def _pressure_g(self, b_dimer, temp_k, pressure_pa):
+        # P G with G = -2 B_D / RT, shape (n_points, n, n)
+        return -2.0 * b_dimer * CM3_TO_M3 / (R_GAS * temp_k[:, None, None]) * pressure_pa[:, None, None]
+
+    @staticmethod
+    def _solve_monomers(pg, y, tol, max_iter):
+        z = y.copy()
+        eye = np.eye(y.shape[1])
+        active = np.arange(y.shape[0])
+        for _ in range(max_iter):
+            z_a, y_a, pg_a = z[active], y[active], pg[active]
+            pgz = np.einsum('pij,pj->pi', pg_a, z_a)
+            resid = z_a * (1.0 + pgz) - y_a * (2.0 - z_a.sum(axis=1, keepdims=True))
+            still = np.abs(resid).max(axis=1) >= tol
+            if not still.any():
+                break
+            active, z_a, y_a, pg_a, pgz, resid = active[still], z_a[still], y_a[still], pg_a[still], pgz[still], resid[still]
+            jac = eye * (1.0 + pgz)[:, :, None] + z_a[:, :, None] * pg_a + y_a[:, :, None]
+            z_new = z_a - np.linalg.solve(jac, resid[:, :, None])[:, :, 0]
+            # keep monomer fractions positive: fall back to halving toward zero
+            z[active] = np.where(z_new > 0.0, z_new, 0.5 * z_a)
+        return z
+
+    def _points(self, temp_k, pressure_pa, y):
+        y = np.atleast_2d(np.asarray(y, dtype=float))
+        n_points = y.shape[0]
+        temp_k = np.broadcast_to(np.asarray(temp_k, dtype=float).ravel(), (n_points,))
+        pressure_pa = np.broadcast_to(np.asarray(pressure_pa, dtype=float).ravel(), (n_points,))
+        return temp_k, pressure_pa, y
+
+    def monomer_fractions(self, temp_k, pressure_pa, y, tol=1e-12, max_iter=50):
+        '''
+        True monomer mole fractions z (n_points, n) from chemical equilibrium of all i-j dimers.
+        Solves z_i (1 + P (G z)_i) = y_i (2 - sum z) with G = -2 B_D / RT by damped Newton.
+        '''
+        temp_k, pressure_pa, y = self._points(temp_k, pressure_pa, y)
+        _, b_dimer = self.second_virial(temp_k)
+        return self._solve_monomers(self._pressure_g(b_dimer, temp_k, pressure_pa), y, tol, max_iter)
+
+    def phi(self, temp_k, pressure_pa, y, tol=1e-12, max_iter=50):
+        '''
+        Apparent fugacity coefficients (n_points, n) for vapor compositions y at (T, P).
+        temp_k and pressure_pa are scalars or per-point arrays.
+        '''
+        temp_k, pressure_pa, y = self._points(temp_k, pressure_pa, y)
+        b_free, b_dimer = self.second_virial(temp_k)
+        pg = self._pressure_g(b_dimer, temp_k, pressure_pa)
+        z = self._solve_monomers(pg, y, tol, max_iter)
+        # z_i / y_i written so that it stays finite at y_i = 0
+        phi_dimer = (2.0 - z.sum(axis=1, keepdims=True)) / (1.0 + np.einsum('pij,pj->pi', pg, z))
+        by = np.einsum('pij,pj->pi', b_free, y)
+        b_mix = np.einsum('pi,pi->p', y, by)
+        ln_phi_free = (2.0 * by - b_mix[:, None]) * CM3_TO_M3 * pressure_pa[:, None] / (R_GAS * temp_k[:, None])
+        return phi_dimer * np.exp(ln_phi_free)
+
+    def phi_pure(self, temp_k, pressure_pa):
+        '''
+        Pure-component fugacity coefficients: temp_k (n_points,), pressure_pa (n_points, n) gives
+        phi of component i alone at pressure_pa[:, i] (e.g. phi at saturation for gamma-phi VLE).
+        '''
+        temp_k = np.asarray(temp_k, dtype=float).ravel()
+        pressure_pa = np.atleast_2d(np.asarray(pressure_pa, dtype=float))
+        b_free, b_dimer = self.second_virial(temp_k)
+        rt = R_GAS * temp_k[:, None]
+        b_free_ii = np.diagonal(b_free, axis1=1, axis2=2) * CM3_TO_M3
+        k_p = -np.diagonal(b_dimer, axis1=1, axis2=2) * CM3_TO_M3 / rt * pressure_pa
+        # z + K P z^2 = 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(np.abs(k_p) > 1e-12, (np.sqrt(1.0 + 4.0 * k_p) - 1.0) / (2.0 * k_p), 1.0 - k_p)
+        return z * np.exp(b_free_ii * pressure_pa / rt)
+
+
+def load_hoc_eta(chem_ids, databank_name_list=None, field='ETA', session=None):
+    '''
+    Association parameters (HOCETA) for chem_ids from Apex, including the i-i self-association
+    sets. field is the BinCoeff attribute holding eta; pairs with no set are left at zero.
+    '''
+    from emnengr_utils import _session_scope, get_databanks, get_coeff_set_dict
+    from emnengr.apex.emnphysprop2 import BinCoeffSet
+
+    chem_ids = list(chem_ids)
+    position = {chem_id: i for i, chem_id in enumerate(chem_ids)}
+    eta = np.zeros((len(chem_ids), len(chem_ids)))
+    with _session_scope(session) as session:
+        if databank_name_list is None:
+            banks = [bank for bank in get_databanks(session=session) if 'HOCETA' in (bank.Description or '').upper()]
+        else:
+            banks = get_databanks(databank_name_list=databank_name_list, description_contains='HOCETA', session=session)
+        coeff_sets_info = session.query(BinCoeffSet).filter(
+            BinCoeffSet.DatabankID.in_([bank.ID for bank in banks]),
+            BinCoeffSet.ChemID_i.in_(chem_ids),
+            BinCoeffSet.ChemID_j.in_(chem_ids)
+        ).all()
+        coeff_set_dict = get_coeff_set_dict(coeff_sets_info, session=session)
+    for coeff_set in coeff_sets_info:
+        coeff_row = coeff_set_dict.get(coeff_set.ID)
+        value = getattr(coeff_row, field, None) if coeff_row is not None else None
+        if value is None:
+            continue
+        i, j = position[coeff_set.ChemID_i], position[coeff_set.ChemID_j]
+        eta[i, j] = eta[j, i] = float(value)
+    return eta
@@ -0,0 +1,109 @@
+'''
+Path -> node-handle cache around App.getNode.
+
+Every sim.getNode(path) is a chain of COM calls, one per path segment. Sweeps resolve the same
+feed and result paths on every case, so NodeCache keeps the handles. It wraps the App, so it can
+be passed anywhere a sim is expected:
+
+    nodes = NodeCache(sim)
+    run_vp_case(nodes, case)   # getNode is cached; run(), reinitialize() etc. pass through
+    nodes.report()
+
+A cached handle stays valid while the node exists. Handles therefore only go stale when the
+flowsheet structure changes: a block or stream added, removed or renamed. check_structure()
+compares the child names under the watched folders (\\Data\\Blocks and \\Data\\Streams by default)
+with the last check and drops every cached handle if they differ. invalidate() does the same
+explicitly, for one subtree or everything.
+'''
+import time
+
+from tree_crawler import split_path
+
+DEFAULT_WATCH = (r'\Data\Blocks', r'\Data\Streams')
+
+
+def _key(path):
+    return '\\'.join(split_path(path))
+
+
+class NodeCache:
+
+    def __init__(self, sim, watch=DEFAULT_WATCH):
+        self.sim = sim
+        self.watch = tuple(watch)
+        self._nodes = {}
+        self._structure = None
+        self.stats = {'hits': 0, 'misses': 0, 'dropped_handles': 0, 'structure_checks': 0, 'resolve_s': 0.0}
+
+    def getNode(self, path):
+        key = _key(path)
+        node = self._nodes.get(key)
+        if node is not None:
+            self.stats['hits'] += 1
+            return node
+        if self._structure is None:
+            # baseline for the first check_structure
+            self._structure = self.structure()
+        start = time.perf_counter()
+        node = self.sim.getNode(path)
+        self.stats['resolve_s'] += time.perf_counter() - start
+        self.stats['misses'] += 1
+        if node is not None:
+            self._nodes[key] = node
+        return node
+
+    def __getattr__(self, name):
+        # everything but getNode goes straight to the wrapped App
+        if name == 'sim':
+            raise AttributeError(name)
+        return getattr(self.sim, name)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def invalidate(self, prefix=None):
+        '''Drop the cached handles under prefix (every handle when prefix is None).'''
+        if prefix is None:
+            dropped = len(self._nodes)
+            self._nodes.clear()
+        else:
+            prefix = _key(prefix)
+            doomed = [key for key in self._nodes if key == prefix or key.startswith(prefix + '\\')]
+            for key in doomed:
+                del self._nodes[key]
+            dropped = len(doomed)
+        self.stats['dropped_handles'] += dropped
+        return dropped
+
+    def structure(self):
+        '''Child names under each watched folder, read through the uncached sim.'''
+        signature = []
+        for path in self.watch:
+            try:
+                node = self.sim.getNode(path)
+                children = getattr(node, 'children', None) if node is not None else None
+                signature.append(tuple(child.name for child in children) if children is not None else ())
+            except Exception:
+                signature.append(None)
+        return tuple(signature)
+
+    def check_structure(self):
+        '''Invalidate every handle if blocks or streams were added or removed since the last check. Returns True if so.'''
+        self.stats['structure_checks'] += 1
+        structure = self.structure()
+        changed = self._structure is not None and structure != self._structure
+        if changed:
+            self.invalidate()
+        self._structure = structure
+        return changed
+
+    def saved_s(self):
+        '''Estimated resolution time saved: hits times the mean cost of a miss.'''
+        if self.stats['misses'] == 0:
+            return 0.0
+        return self.stats['hits'] * self.stats['resolve_s'] / self.stats['misses']
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        print(f'node cache: {self.stats["hits"]} of {lookups} getNode calls served from cache, '
+              f'{len(self._nodes)} handles, {self.stats["dropped_handles"]} dropped, ~{self.saved_s():.3f} s saved')
@@ -0,0 +1,171 @@
+'''
+Txy, Pxy and xy diagrams (binary, or straight-line slices through a ternary) from the gamma-phi
+solvers in vle_solver, with adaptive point placement.
+
+Every diagram is a path x(s) = x_start + s (x_end - x_start), 0 <= s <= 1, through composition
+space. A coarse uniform pass is refined by bisecting only the intervals whose midpoint is poorly
+predicted by linear interpolation of T (or P) and y, or where y - x changes sign along the path
+(an azeotrope). All midpoints of one refinement pass are solved in a single batched call, with
+temperatures warm-started from the interpolated values.
+'''
+import time
+
+import numpy as np
+
+from vle_solver import DEFAULT_T_BOUNDS, bubble_pressure, bubble_temperature
+
+
+def _bubble_t_solver(model, pressure_pa, t_bounds):
+    def solve(x, guess):
+        result = bubble_temperature(model, pressure_pa, x, t_guess=guess, t_bounds=t_bounds)
+        return result['temperature_k'], result['y'], result['converged'], result['iterations']
+    return solve
+
+
+def _bubble_p_solver(model, temp_k):
+    def solve(x, guess):
+        result = bubble_pressure(model, temp_k, x)
+        return result['pressure_pa'], result['y'], result['converged'], result['iterations']
+    return solve
+
+
+def _adaptive_path(solve, x_start, x_end, n_initial, tol, max_points, min_step, max_passes):
+    '''
+    Refine s on [0, 1] until every interval is resolved to tol (relative to the value range for
+    T/P, absolute for y) or no longer than min_step. Returns (s, x, value, y, converged, stats).
+    '''
+    start = time.perf_counter()
+    x_start = np.asarray(x_start, dtype=float)
+    direction = np.asarray(x_end, dtype=float) - x_start
+
+    s = np.linspace(0.0, 1.0, max(n_initial, 2))
+    value, y, converged, iterations = solve(x_start + s[:, np.newaxis] * direction, None)
+    n_evaluations = s.size
+    n_solver_iterations = int(iterations.sum())
+    refine = np.ones(s.size - 1, dtype=bool)
+    n_passes = 1
+
+    while n_passes < max_passes and s.size < max_points:
+        width = np.diff(s)
+        # y - x projected on the path direction changes sign across an azeotrope
+        split = (y - (x_start + s[:, np.newaxis] * direction)) @ direction
+        crosses = split[:-1] * split[1:] < 0.0
+        candidates = np.flatnonzero((refine | crosses) & (width > min_step))
+        if candidates.size == 0:
+            break
+        budget = max_points - s.size
+        if candidates.size > budget:
+            # spend the remaining points on the widest intervals
+            candidates = np.sort(candidates[np.argsort(-width[candidates])[:budget]])
+
+        s_mid = 0.5 * (s[candidates] + s[candidates + 1])
+        value_lin = 0.5 * (value[candidates] + value[candidates + 1])
+        y_lin = 0.5 * (y[candidates] + y[candidates + 1])
+        guess = np.where(np.isfinite(value_lin), value_lin, np.nan)
+        v_mid, y_mid, c_mid, it_mid = solve(x_start + s_mid[:, np.newaxis] * direction,
+                                            guess if np.isfinite(guess).all() else None)
+        n_evaluations += s_mid.size
+        n_solver_iterations += int(it_mid.sum())
+        n_passes += 1
+
+        scale = np.nanmax(value) - np.nanmin(value)
+        scale = scale if scale > 0.0 else 1.0
+        with np.errstate(invalid='ignore'):
+            error = np.maximum(np.abs(v_mid - value_lin) / scale, np.abs(y_mid - y_lin).max(axis=1))
+        bad = c_mid & (error > tol)
+
+        # splice the midpoints in after their left neighbours
+        insert_at = candidates + 1
+        s = np.insert(s, insert_at, s_mid)
+        value = np.insert(value, insert_at, v_mid)
+        y = np.insert(y, insert_at, y_mid, axis=0)
+        converged = np.insert(converged, insert_at, c_mid)
+        # both halves of a badly predicted interval are refined again, everything else is done
+        refine = np.zeros(s.size - 1, dtype=bool)
+        left_half = insert_at + np.arange(insert_at.size) - 1
+        refine[left_half[bad]] = True
+        refine[left_half[bad] + 1] = True
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'n_points': int(s.size),
+        'n_evaluations': int(n_evaluations),
+        'n_solver_iterations': n_solver_iterations,
+        'n_passes': n_passes,
+        'n_failed': int((~converged).sum()),
+        'min_step': float(np.diff(s).min()) if s.size > 1 else 0.0,
+        'elapsed_s': elapsed,
+        'evaluations_per_s': n_evaluations / elapsed if elapsed > 0.0 else float('inf'),
+    }
+    return s, x_start + s[:, np.newaxis] * direction, value, y, converged, stats
+
+
+def _binary_path(model):
+    if model.n_components != 2:
+        raise ValueError(f'binary diagrams need a 2-component model, got {model.n_components}')
+    return np.array([0.0, 1.0]), np.array([1.0, 0.0])
+
+
+def txy_diagram(model, pressure_pa, n_initial=11, tol=1e-3, max_points=201, min_step=1e-4,
+                max_passes=30, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Binary Txy diagram at pressure_pa. Each point is one bubble solve: (x, T) is the bubble line
+    and (y, T) the dew line. s is the mole fraction of the first component.
+    '''
+    x_start, x_end = _binary_path(model)
+    s, x, temp, y, converged, stats = _adaptive_path(_bubble_t_solver(model, pressure_pa, t_bounds),
+                                                     x_start, x_end, n_initial, tol, max_points,
+                                                     min_step, max_passes)
+    return {'s': s, 'x': x, 'y': y, 'temperature_k': temp, 'pressure_pa': float(pressure_pa),
+            'converged': converged, 'stats': stats}
+
+
+def pxy_diagram(model, temp_k, n_initial=11, tol=1e-3, max_points=201, min_step=1e-4, max_passes=30):
+    '''Binary Pxy diagram at temp_k; (x, P) is the bubble line and (y, P) the dew line.'''
+    x_start, x_end = _binary_path(model)
+    s, x, pressure, y, converged, stats = _adaptive_path(_bubble_p_solver(model, temp_k),
+                                                         x_start, x_end, n_initial, tol, max_points,
+                                                         min_step, max_passes)
+    return {'s': s, 'x': x, 'y': y, 'pressure_pa': pressure, 'temperature_k': float(temp_k),
+            'converged': converged, 'stats': stats}
+
+
+def xy_diagram(model, pressure_pa=None, temp_k=None, **kwargs):
+    '''Binary y-x diagram at constant P (from txy_diagram) or constant T (from pxy_diagram).'''
+    if (pressure_pa is None) == (temp_k is None):
+        raise ValueError('give exactly one of pressure_pa or temp_k')
+    if pressure_pa is not None:
+        return txy_diagram(model, pressure_pa, **kwargs)
+    return pxy_diagram(model, temp_k, **kwargs)
+
+
+def ternary_slice(model, fixed_component, fixed_fraction, pressure_pa=None, temp_k=None, n_initial=11,
+                  tol=1e-3, max_points=201, min_step=1e-4, max_passes=30, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Bubble surface of a ternary along the line x[fixed_component] = fixed_fraction. The other two
+    components split the remainder; s is the share of the first of them (in component order).
+    Give pressure_pa for a T-x slice or temp_k for a P-x slice.
+    '''
+    if model.n_components != 3:
+        raise ValueError(f'ternary slices need a 3-component model, got {model.n_components}')
+    if (pressure_pa is None) == (temp_k is None):
+        raise ValueError('give exactly one of pressure_pa or temp_k')
+    first, second = [i for i in range(3) if i != fixed_component]
+    x_start = np.zeros(3)
+    x_start[fixed_component] = fixed_fraction
+    x_end = x_start.copy()
+    x_start[second] = 1.0 - fixed_fraction
+    x_end[first] = 1.0 - fixed_fraction
+    if pressure_pa is not None:
+        solve = _bubble_t_solver(model, pressure_pa, t_bounds)
+    else:
+        solve = _bubble_p_solver(model, temp_k)
+    s, x, value, y, converged, stats = _adaptive_path(solve, x_start, x_end, n_initial, tol,
+                                                      max_points, min_step, max_passes)
+    result = {'s': s, 'x': x, 'y': y, 'converged': converged, 'stats': stats,
+              'fixed_component': fixed_component, 'fixed_fraction': fixed_fraction}
+    if pressure_pa is not None:
+        result.update(temperature_k=value, pressure_pa=float(pressure_pa))
+    else:
+        result.update(pressure_pa=value, temperature_k=float(temp_k))
+    return result
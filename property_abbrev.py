@@ -53,4 +53,8 @@ class PropertyAbbrev:
     UQI = "UQI"
     ACCW = "ACCW"
     HLC = "HLC"
-    SOLW = "SOLW"
\ No newline at end of file
+    SOLW = "SOLW"
+
+    @classmethod
+    def values(cls):
+        return [value for name, value in vars(cls).items() if name.isupper() and isinstance(value, str)]
@@ -0,0 +1,342 @@
+'''
+Residue-curve maps for a gamma-phi model (vle_solver.GammaPhiModel) at constant pressure.
+
+A residue curve is a solution of dx/dxi = x - y(x), where y is the bubble-point vapor. Trajectories
+for every starting composition are integrated together by RK4 with per-trajectory step control,
+with one batched bubble solve per stage. A trajectory stops at a node (x ~ y). Singular points are
+the pure components plus the azeotropes from azeotropes.find_azeotropes. Each is classified from
+the eigenvalues of the Jacobian of x - y. Distillation boundaries are the separatrices integrated
+out of each saddle along its eigenvectors.
+
+residue_curve_map ties this together. It can split the starts over a process pool, and it can
+cache the map as .npz keyed by components, property method, model parameters, pressure and grid
+settings.
+'''
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from azeotropes import find_azeotropes
+from vle_solver import DEFAULT_T_BOUNDS, bubble_temperature
+
+RESIDUE_CACHE_VERSION = 2
+NODE_TOL = 1e-6  # |x - y| below this is taken as a singular point
+EDGE_TOL = 1e-12
+
+
+def _rhs(model, pressure_pa, x, temp_guess, t_bounds):
+    # clip the small negative fractions RK4 stages can produce before calling the model
+    x = np.clip(x, 0.0, None)
+    x = x / x.sum(axis=1, keepdims=True)
+    result = bubble_temperature(model, pressure_pa, x, t_guess=temp_guess, t_bounds=t_bounds)
+    return x - result['y'], result['temperature_k'], result['converged']
+
+
+def integrate_residue_curves(model, pressure_pa, x0, step=0.05, max_steps=400, sign=1.0, max_dx=0.02,
+                             max_step=2.0, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    RK4 on dx/dxi = sign (x - y) for every row of x0, all trajectories together.
+    sign=1 runs toward the heavy end (stable node), sign=-1 toward the light end. Each
+    trajectory has its own step: halved when a step would move x by more than max_dx or leave
+    the simplex (the map is stiff next to some vertices), and grown up to max_step while the
+    trajectory slows into a node. Returns (x (m, max_steps + 1, n), temp_k (m, max_steps + 1),
+    lengths); rows are NaN after their length.
+    '''
+    x0 = np.atleast_2d(np.asarray(x0, dtype=float))
+    m, n = x0.shape
+    path = np.full((m, max_steps + 1, n), np.nan)
+    temps = np.full((m, max_steps + 1), np.nan)
+    lengths = np.ones(m, dtype=int)
+    path[:, 0] = x0
+    f, temp, ok = _rhs(model, pressure_pa, x0, None, t_bounds)
+    temps[:, 0] = temp
+    x = x0.copy()
+    h = np.full(m, float(step))
+    running = ok & (np.abs(f).max(axis=1) > NODE_TOL)
+    for _ in range(4 * max_steps):
+        active = np.flatnonzero(running)
+        if active.size == 0:
+            break
+        x_a, t_a, h_a = x[active], temp[active], h[active, np.newaxis] * sign
+        # the derivative at the current point is carried over from the previous accepted step
+        k1 = f[active]
+        k2, _, c2 = _rhs(model, pressure_pa, x_a + 0.5 * h_a * k1, t_a, t_bounds)
+        k3, _, c3 = _rhs(model, pressure_pa, x_a + 0.5 * h_a * k2, t_a, t_bounds)
+        k4, _, c4 = _rhs(model, pressure_pa, x_a + h_a * k3, t_a, t_bounds)
+        x_new = x_a + h_a * (k1 + 2.0 * k2 + 2.0 * k3 + k4) / 6.0
+        reject = ~(c2 & c3 & c4) | (x_new < -EDGE_TOL).any(axis=1) | (np.abs(x_new - x_a).max(axis=1) > max_dx)
+        x_new = np.clip(x_new, 0.0, None)
+        x_new /= x_new.sum(axis=1, keepdims=True)
+        f_new, t_new, c_new = _rhs(model, pressure_pa, x_new, t_a, t_bounds)
+        reject |= ~c_new
+
+        rejected = active[reject]
+        h[rejected] *= 0.5
+        running[rejected[h[rejected] < 1e-10]] = False
+        accept = ~reject
+        done = active[accept]
+        x[done], f[done], temp[done] = x_new[accept], f_new[accept], t_new[accept]
+        path[done, lengths[done]], temps[done, lengths[done]] = x_new[accept], t_new[accept]
+        lengths[done] += 1
+        h[done] = np.minimum(1.5 * h[done], max_step)
+        at_node = np.abs(f_new[accept]).max(axis=1) <= NODE_TOL
+        running[done] = ~at_node & (lengths[done] <= max_steps)
+    return path, temps, lengths
+
+
+def _join(backward, forward):
+    '''Stitch backward and forward runs from the same starts into one light-to-heavy curve each.'''
+    (xb, tb, lb), (xf, tf, lf) = backward, forward
+    m, _, n = xf.shape
+    lengths = lb + lf - 1
+    curves = np.full((m, lengths.max(), n), np.nan)
+    temps = np.full((m, lengths.max()), np.nan)
+    for i in range(m):
+        curves[i, :lb[i]] = xb[i, :lb[i]][::-1]
+        temps[i, :lb[i]] = tb[i, :lb[i]][::-1]
+        curves[i, lb[i]:lengths[i]] = xf[i, 1:lf[i]]
+        temps[i, lb[i]:lengths[i]] = tf[i, 1:lf[i]]
+    return curves, temps, lengths
+
+
+def residue_curves(model, pressure_pa, x0, step=0.05, max_steps=400, t_bounds=DEFAULT_T_BOUNDS):
+    '''Full residue curves through each row of x0, ordered from the light end to the heavy end.'''
+    backward = integrate_residue_curves(model, pressure_pa, x0, step, max_steps, -1.0, t_bounds=t_bounds)
+    forward = integrate_residue_curves(model, pressure_pa, x0, step, max_steps, 1.0, t_bounds=t_bounds)
+    return _join(backward, forward)
+
+
+def _tangent_jacobian(model, pressure_pa, x_point, t_bounds, h=1e-6):
+    '''
+    Jacobian of x - y at x_point in the basis d_j = e_j - e_c (c the largest component).
+    Forward differences along d_j stay inside the simplex even on an edge or at a vertex.
+    '''
+    n = x_point.size
+    c = int(np.argmax(x_point))
+    others = [j for j in range(n) if j != c]
+    points = np.tile(x_point, (len(others) + 1, 1))
+    for row, j in enumerate(others, start=1):
+        points[row, j] += h
+        points[row, c] -= h
+    result = bubble_temperature(model, pressure_pa, points, t_bounds=t_bounds)
+    f = (points - result['y'])[:, others]
+    return (f[1:] - f[0]).T / h, result['temperature_k'][0]
+
+
+def singular_points(model, pressure_pa, azeotropes=None, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Pure components and azeotropes at pressure_pa, each classified as 'stable node',
+    'unstable node' or 'saddle' from the eigenvalues of the Jacobian of x - y. Returns a list of
+    dicts with x, temperature_k, kind, eigenvalues and eigenvectors (full-composition directions).
+    '''
+    n = model.n_components
+    if azeotropes is None:
+        azeotropes = find_azeotropes(model, pressure_pa, t_bounds=t_bounds)
+    candidates = [np.eye(n)[i] for i in range(n)] + [azeotrope['x'] for azeotrope in azeotropes]
+    points = []
+    for x_point in candidates:
+        jac, temp = _tangent_jacobian(model, pressure_pa, x_point, t_bounds)
+        eigenvalues, vectors = np.linalg.eig(jac)
+        eigenvalues, vectors = eigenvalues.real, vectors.real
+        c = int(np.argmax(x_point))
+        others = [j for j in range(n) if j != c]
+        directions = np.zeros((len(others), n))
+        for k in range(len(others)):
+            directions[k, others] = vectors[:, k]
+            directions[k, c] = -vectors[:, k].sum()
+        if (eigenvalues < 0.0).all():
+            kind = 'stable node'
+        elif (eigenvalues > 0.0).all():
+            kind = 'unstable node'
+        else:
+            kind = 'saddle'
+        points.append({'x': x_point, 'temperature_k': float(temp), 'kind': kind,
+                       'eigenvalues': eigenvalues, 'eigenvectors': directions})
+    return points
+
+
+def distillation_boundaries(model, pressure_pa, points, step=0.05, max_steps=400, offset=1e-4,
+                            t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Separatrices out of every saddle in points: each eigen-direction is followed both ways,
+    forward in xi for positive (repelling) eigenvalues and backward for negative ones.
+    Starts that would leave the simplex are skipped. Returns a list of (x, temp_k) arrays.
+    '''
+    starts, signs = [], []
+    for point in points:
+        if point['kind'] != 'saddle':
+            continue
+        for eigenvalue, direction in zip(point['eigenvalues'], point['eigenvectors']):
+            direction = direction / np.abs(direction).max()
+            for side in (1.0, -1.0):
+                x_start = point['x'] + side * offset * direction
+                if (x_start >= 0.0).all():
+                    starts.append(x_start)
+                    signs.append(1.0 if eigenvalue > 0.0 else -1.0)
+    boundaries = []
+    for sign in (1.0, -1.0):
+        group = [x_start for x_start, s in zip(starts, signs) if s == sign]
+        if len(group) == 0:
+            continue
+        x, temps, lengths = integrate_residue_curves(model, pressure_pa, np.array(group), step, max_steps, sign,
+                                                       t_bounds=t_bounds)
+        for i, length in enumerate(lengths):
+            curve, curve_t = x[i, :length], temps[i, :length]
+            # store every boundary light-to-heavy like the residue curves
+            boundaries.append((curve, curve_t) if sign > 0 else (curve[::-1], curve_t[::-1]))
+    return boundaries
+
+
+def simplex_grid(n_components, n_divisions):
+    '''Interior compositions on a regular simplex grid with n_divisions per edge.'''
+    def compositions(n_left, total):
+        if n_left == 1:
+            yield (total,)
+            return
+        for first in range(1, total - n_left + 2):
+            for rest in compositions(n_left - 1, total - first):
+                yield (first,) + rest
+    return np.array(list(compositions(n_components, n_divisions)), dtype=float) / n_divisions
+
+
+def _integrate_chunk(args):
+    model, pressure_pa, x0, step, max_steps, t_bounds = args
+    return residue_curves(model, pressure_pa, x0, step, max_steps, t_bounds)
+
+
+def _pad_and_stack(parts):
+    width = max(curves.shape[1] for curves, _, _ in parts)
+    n = parts[0][0].shape[2]
+    curves = np.concatenate([np.pad(c, ((0, 0), (0, width - c.shape[1]), (0, 0)), constant_values=np.nan)
+                             for c, _, _ in parts])
+    temps = np.concatenate([np.pad(t, ((0, 0), (0, width - t.shape[1])), constant_values=np.nan)
+                            for _, t, _ in parts])
+    lengths = np.concatenate([lengths for _, _, lengths in parts])
+    return curves.reshape(-1, width, n), temps, lengths
+
+
+def _parameter_hash(model):
+    # the numbers behind the model: every public array of each part (Wilson terms and T limits,
+    # vapor-pressure coefficients, HOC eta and the pure/cross parameters derived from tc, pc, rd, dipole)
+    digest = hashlib.sha1()
+    for role in ('vapor_pressure', 'activity', 'fugacity'):
+        part = getattr(model, role, None)
+        digest.update(f'{role}={type(part).__name__};'.encode())
+        if part is None:
+            continue
+        arrays = {}
+        for name, value in vars(part).items():
+            if name.startswith('_'):
+                continue
+            if isinstance(value, dict):
+                arrays.update({f'{name}.{k}': v for k, v in value.items() if isinstance(v, np.ndarray)})
+            elif isinstance(value, np.ndarray):
+                arrays[name] = value
+        for name in sorted(arrays):
+            values = np.ascontiguousarray(arrays[name], dtype=float)
+            digest.update(f'{name}{values.shape};'.encode())
+            digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, component_ids, property_method, parameter_hash, pressure_pa, n_divisions, step, max_steps, t_bounds):
+    key = json.dumps({
+        'version': RESIDUE_CACHE_VERSION,
+        'components': [str(component_id) for component_id in component_ids],
+        'property_method': property_method,
+        'parameters': parameter_hash,
+        't_bounds': [float(bound) for bound in t_bounds],
+        'pressure_pa': float(pressure_pa),
+        'n_divisions': n_divisions,
+        'step': step,
+        'max_steps': max_steps,
+    }, sort_keys=True)
+    return os.path.join(cache_dir, f'residue_map_{hashlib.sha1(key.encode()).hexdigest()}.npz')
+
+
+def _save_map(path, result):
+    points = result['singular_points']
+    boundary_lengths = np.array([len(curve) for curve, _ in result['boundaries']], dtype=int)
+    n = result['curves'].shape[2]
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(
+        tmp_path,
+        curves=result['curves'], temperatures=result['temperatures'], lengths=result['lengths'],
+        point_x=np.array([p['x'] for p in points]).reshape(-1, n),
+        point_t=np.array([p['temperature_k'] for p in points]),
+        point_kind=np.array([p['kind'] for p in points]),
+        boundary_lengths=boundary_lengths,
+        boundary_x=np.concatenate([curve for curve, _ in result['boundaries']]) if len(boundary_lengths) else np.zeros((0, n)),
+        boundary_t=np.concatenate([t for _, t in result['boundaries']]) if len(boundary_lengths) else np.zeros(0),
+    )
+    os.replace(tmp_path, path)
+
+
+def _load_map(path):
+    with np.load(path, allow_pickle=False) as data:
+        points = [{'x': x, 'temperature_k': float(t), 'kind': str(kind)}
+                  for x, t, kind in zip(data['point_x'], data['point_t'], data['point_kind'])]
+        splits = np.cumsum(data['boundary_lengths'])[:-1]
+        boundaries = list(zip(np.split(data['boundary_x'], splits), np.split(data['boundary_t'], splits)))
+        if len(data['boundary_lengths']) == 0:
+            boundaries = []
+        return {'curves': data['curves'], 'temperatures': data['temperatures'], 'lengths': data['lengths'],
+                'singular_points': points, 'boundaries': boundaries}
+
+
+def residue_curve_map(model, pressure_pa, n_divisions=8, step=0.05, max_steps=400, processes=None,
+                      cache_dir=None, component_ids=None, property_method=None, t_bounds=DEFAULT_T_BOUNDS):
+    '''
+    Residue curves from every interior point of a simplex_grid(n, n_divisions), plus singular
+    points and distillation boundaries at pressure_pa. processes > 1 splits the starts over a
+    process pool; otherwise all trajectories are integrated together in this process.
+    With cache_dir the map is stored as .npz keyed by component_ids (default: the vapor-pressure
+    engine's), property_method (default: the model classes), a hash of the model parameters,
+    pressure and grid settings, and is
+    loaded from there on later calls (cached singular points keep only x, temperature_k and kind).
+    Returns curves, temperatures, lengths, singular_points, boundaries and stats.
+    '''
+    start = time.perf_counter()
+    if component_ids is None:
+        component_ids = getattr(model.vapor_pressure, 'component_ids', range(model.n_components))
+    if property_method is None:
+        property_method = '-'.join(type(part).__name__ for part in (model.activity, model.fugacity) if part is not None) or 'IDEAL'
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, component_ids, property_method, _parameter_hash(model), pressure_pa, n_divisions,
+                           step, max_steps, t_bounds)
+        if os.path.exists(path):
+            try:
+                result = _load_map(path)
+                result['stats'] = {'cached': True, 'cache_path': path, 'elapsed_s': time.perf_counter() - start}
+                return result
+            except Exception as e:
+                print(f'could not read residue map cache {path}; recomputing.  error: {e}')
+
+    x0 = simplex_grid(model.n_components, n_divisions)
+    if processes is not None and processes > 1 and x0.shape[0] > processes:
+        chunks = np.array_split(x0, processes)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_integrate_chunk, [(model, pressure_pa, chunk, step, max_steps, t_bounds) for chunk in chunks]))
+        curves, temps, lengths = _pad_and_stack(parts)
+    else:
+        curves, temps, lengths = residue_curves(model, pressure_pa, x0, step, max_steps, t_bounds)
+    points = singular_points(model, pressure_pa, t_bounds=t_bounds)
+    boundaries = distillation_boundaries(model, pressure_pa, points, step, max_steps, t_bounds=t_bounds)
+    result = {'curves': curves, 'temperatures': temps, 'lengths': lengths,
+              'singular_points': points, 'boundaries': boundaries}
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save_map(path, result)
+    result['stats'] = {
+        'cached': False,
+        'cache_path': path,
+        'n_trajectories': int(x0.shape[0]),
+        'n_points': int(lengths.sum()),
+        'elapsed_s': time.perf_counter() - start,
+    }
+    return result
@@ -0,0 +1,202 @@
+'''
+Content-addressed on-disk cache for Aspen Plus results.
+
+result_key hashes everything that determines a run into one key:
+- the components (CAS list, in order);
+- the property method;
+- parameter values;
+- stream specs and block specs.
+
+The inputs are canonicalized first: dict keys are sorted, numbers are rounded to 12
+significant digits, and numpy values become plain Python. Equal inputs therefore always give
+the same key. ResultCache stores pickled outputs in SQLite under that key. It evicts the
+least recently used entries past max_entries or max_bytes, and counts hits and misses so a
+study can report its hit rate. The database runs in WAL mode, so parallel sweep workers can
+share one file.
+'''
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = 'aspen_results.sqlite'
+KEY_VERSION = 1
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in (value.tolist() if isinstance(value, np.ndarray) else value)]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        # 1, 1.0 and 1.0000000000001 all hash alike
+        return format(float(value) + 0.0, '.12g')
+    return str(value).strip()
+
+
+def plain_values(value):
+    '''
+    Parameter data (e.g. Aspen getParams() output) as plain dicts, lists and scalars, so it keys
+    by its numbers: node-like objects give their .value, mappings and other objects their public
+    attributes as a dict, iterables a list. Anything else is kept as str.
+    '''
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'items'):
+        return {str(k): plain_values(v) for k, v in value.items()}
+    if hasattr(value, 'value'):
+        return plain_values(value.value)
+    if isinstance(value, (list, tuple, set, frozenset)) or hasattr(value, '__iter__'):
+        return [plain_values(v) for v in value]
+    if hasattr(value, '__dict__'):
+        return {k: plain_values(v) for k, v in vars(value).items() if not k.startswith('_')}
+    return str(value)
+
+
+# where the WILS-HOC parameters come from (Aspen's own databanks); part of every result-cache key,
+# so bump the version when the Aspen release or databanks change
+PARAMETER_SOURCE = {'databanks': 'aspen-builtin', 'version': 1}
+
+
+def result_key(components, property_method, parameters=None, streams=None, blocks=None, **extra):
+    '''Hex SHA-256 of the canonical JSON of every input that determines a run.'''
+    payload = {
+        'version': KEY_VERSION,
+        'components': [str(component).strip() for component in components],
+        'property_method': str(property_method).strip().upper(),
+        'parameters': _canonical(parameters or {}),
+        'streams': _canonical(streams or {}),
+        'blocks': _canonical(blocks or {}),
+        'extra': _canonical(extra),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def cached_bubble_point(cache, components, property_method, parameters, liquid_fractions, temp_c, compute):
+    '''
+    compute() -> (pressure, vapor fractions) behind cache (a ResultCache, or None for no cache),
+    keyed on the components, property method, parameters, liquid composition and temperature.
+    Failed points (pressure None) are not cached.
+    '''
+    if cache is None:
+        return compute()
+    key = result_key(components, property_method, parameters=parameters,
+                     streams={'liquid_fractions': liquid_fractions, 'temperature_c': temp_c},
+                     blocks={'calculation': 'bubble_point'})
+    return cache.get_or_compute(key, compute, should_store=lambda result: result[0] is not None)
+
+
+class ResultCache:
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=None, max_bytes=None, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, timeout=timeout)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)')
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        with self._conn:
+            self._conn.execute('UPDATE results SET last_access = ?, hits = hits + 1 WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def __contains__(self, key):
+        return self._conn.execute('SELECT 1 FROM results WHERE key = ?', (key,)).fetchone() is not None
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO results (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)',
+                               (key, blob, len(blob), now, now))
+            self._evict()
+
+    def get_or_compute(self, key, compute, should_store=None):
+        '''Cached value for key, or compute() stored under it (only if should_store(value) when given).'''
+        row = self._conn.execute('SELECT 1 FROM results WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            return self.get(key)
+        self.misses += 1
+        value = compute()
+        if should_store is None or should_store(value):
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        if self.max_entries is not None:
+            cursor = self._conn.execute('''
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)''', (self.max_entries,))
+            self.evictions += max(cursor.rowcount, 0)
+        if self.max_bytes is not None:
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                doomed = []
+                for key, size in self._conn.execute('SELECT key, size FROM results ORDER BY last_access ASC'):
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((key,))
+                    total -= size
+                self._conn.executemany('DELETE FROM results WHERE key = ?', doomed)
+                self.evictions += len(doomed)
+
+    def stats(self):
+        entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f'result cache {self.path}: {stats["hits"]} hits / {stats["misses"]} misses '
+              f'({100 * stats["hit_rate"]:.1f}% hit rate), {stats["entries"]} entries, {stats["bytes"] / 1024:.1f} KiB')
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute('DELETE FROM results')
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
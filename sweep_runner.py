@@ -0,0 +1,124 @@
+'''
+Parallel case sweeps over independent Aspen Plus processes.
+
+Each worker process keeps its own one-instance AspenSessionPool, so every licensed seat runs
+cases at once. Results stream back in completion order. A failed case is retried on a freshly
+launched instance. Throughput is reported per worker and overall.
+
+    cases = case_grid(temperature=np.linspace(300, 400, 10), pressure=[1.0, 2.0])
+    records, stats = run_sweep(cases, run_flash_case, configure=setup_flash, workers=4)
+
+run_case(sim, case) -> result, configure(sim) and app_factory are sent to the worker
+processes, so they must be importable top-level functions (or functools.partial of one).
+functools.partial(aspen_pool.FakeApp, solver=...) runs a sweep without Aspen.
+'''
+import atexit
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from aspen_pool import AspenSessionPool
+
+_worker_pool = None
+
+
+def case_grid(**axes):
+    '''Every combination of the given axes as a list of dicts, the last axis varying fastest.'''
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def _init_worker(app_factory, configure, pool_kwargs):
+    global _worker_pool
+    _worker_pool = AspenSessionPool(size=1, app_factory=app_factory, configure=configure, prelaunch=False, **pool_kwargs)
+    atexit.register(_worker_pool.close)
+
+
+def _run_case(run_case, index, case, fresh):
+    pooled = _worker_pool.acquire()
+    if fresh and pooled.uses > 1:
+        # a retry gets an instance that has not run anything yet
+        _worker_pool.release(pooled, discard=True)
+        pooled = _worker_pool.acquire()
+    start = time.perf_counter()
+    try:
+        result, error = run_case(pooled.sim, case), None
+    except Exception as e:
+        result, error = None, f'{type(e).__name__}: {e}'
+    elapsed = time.perf_counter() - start
+    _worker_pool.release(pooled, discard=error is not None)
+    return {'index': index, 'case': case, 'result': result, 'error': error, 'worker': os.getpid(), 'elapsed_s': elapsed}
+
+
+def _new_stats(workers):
+    return {'cases': 0, 'failed': 0, 'retries': 0, 'workers_requested': workers, 'elapsed_s': 0.0,
+            'cases_per_min': 0.0, 'workers': {}}
+
+
+def _record_stats(stats, record, start):
+    worker = stats['workers'].setdefault(record['worker'], {'cases': 0, 'failed': 0, 'busy_s': 0.0, 'cases_per_min': 0.0})
+    worker['cases'] += 1
+    worker['failed'] += record['error'] is not None
+    worker['busy_s'] += record['elapsed_s']
+    worker['cases_per_min'] = 60.0 * worker['cases'] / worker['busy_s'] if worker['busy_s'] > 0.0 else 0.0
+    stats['cases'] += 1
+    stats['failed'] += record['error'] is not None
+    stats['elapsed_s'] = time.perf_counter() - start
+    stats['cases_per_min'] = 60.0 * stats['cases'] / stats['elapsed_s'] if stats['elapsed_s'] > 0.0 else 0.0
+
+
+def iter_sweep(cases, run_case, configure=None, app_factory=None, workers=2, max_retries=1, pool_kwargs=None, stats=None):
+    '''
+    Run run_case(sim, case) for every case across workers processes and yield one record per
+    case as it finishes: index, case, result, error (None on success), worker (pid), elapsed_s
+    and attempt. A failed case is resubmitted up to max_retries times on a fresh instance before
+    its failure is yielded. Pass a dict as stats to have it filled with running totals and
+    per-worker throughput.
+    '''
+    cases = list(cases)
+    stats = _new_stats(workers) if stats is None else stats
+    stats.update({key: value for key, value in _new_stats(workers).items() if key not in stats})
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(app_factory, configure, pool_kwargs or {})) as executor:
+        pending = {executor.submit(_run_case, run_case, index, case, False): (index, 0) for index, case in enumerate(cases)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, attempt = pending.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # the worker process itself died
+                    record = {'index': index, 'case': cases[index], 'result': None, 'error': f'{type(e).__name__}: {e}',
+                              'worker': None, 'elapsed_s': 0.0}
+                record['attempt'] = attempt
+                if record['error'] is not None and attempt < max_retries:
+                    stats['retries'] += 1
+                    pending[executor.submit(_run_case, run_case, index, cases[index], True)] = (index, attempt + 1)
+                    continue
+                _record_stats(stats, record, start)
+                yield record
+
+
+def run_sweep(cases, run_case, configure=None, app_factory=None, workers=2, max_retries=1, pool_kwargs=None,
+              on_result=None, verbose=True):
+    '''
+    iter_sweep collected into (records in case order, stats). on_result(record) is called as each
+    case finishes, e.g. to write results out incrementally.
+    '''
+    stats = _new_stats(workers)
+    records = []
+    for record in iter_sweep(cases, run_case, configure=configure, app_factory=app_factory, workers=workers,
+                             max_retries=max_retries, pool_kwargs=pool_kwargs, stats=stats):
+        records.append(record)
+        if on_result is not None:
+            on_result(record)
+    records.sort(key=lambda record: record['index'])
+    if verbose:
+        print(f'{stats["cases"]} cases ({stats["failed"]} failed, {stats["retries"]} retries) in {stats["elapsed_s"]:.1f} s: '
+              f'{stats["cases_per_min"]:.1f} cases/min')
+        for worker, worker_stats in stats['workers'].items():
+            print(f'  worker {worker}: {worker_stats["cases"]} cases, {worker_stats["cases_per_min"]:.1f} cases/min')
+    return records, stats
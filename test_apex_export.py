@@ -0,0 +1,120 @@
+import csv
+import itertools
+import os
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+pytest.importorskip('emnengr.apex.emnphysprop2')
+
+import apex_export  # noqa: E402
+from apex_export import _CsvSink, _ErrorLog, _NpzSink, export_table  # noqa: E402
+from conftest import CHEM_IDS, _filled  # noqa: E402
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_sink(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    errors = _ErrorLog(str(tmp_path / 'out.errors.jsonl'))
+    sink = _CsvSink(path, ['ID', 'Name'])
+    sink.write([(1, 'A'), (2, None)], 0, errors)
+    sink.close()
+    errors.close()
+    assert _read_csv(path) == [['ID', 'Name'], ['1', 'A'], ['2', '']]
+    assert errors.count == 0 and not os.path.exists(errors.path)
+
+
+def test_npz_sink_types_and_errors(tmp_path):
+    path = str(tmp_path / 'out.npz')
+    errors = _ErrorLog(str(tmp_path / 'out.errors.jsonl'))
+    sink = _NpzSink(path, ['ID', 'Value', 'Name'])
+    sink.write([(1, 1.5, 'A'), (2, None, None), (3, 2.5)], 10, errors)
+    sink.close()
+    errors.close()
+    with np.load(path) as data:
+        assert data['ID'].dtype == np.int64 and data['ID'].tolist() == [1, 2]
+        np.testing.assert_allclose(data['Value'], [1.5, np.nan])
+        assert data['Name'].tolist() == ['A', '']
+    assert errors.count == 1
+    with open(errors.path, encoding='utf-8') as f:
+        assert '"row": 12' in f.read()
+
+
+def test_error_log_from_earlier_run_is_removed(tmp_path):
+    path = tmp_path / 'out.errors.jsonl'
+    path.write_text('{"row": 1}\n')
+    _ErrorLog(str(path)).close()
+    assert not path.exists()
+
+
+def test_export_table_csv(apex_engine, tmp_path):
+    out_path = str(tmp_path / 'cheminfo.csv')
+    (tmp_path / 'cheminfo.csv.errors.jsonl').write_text('stale\n')
+    with Session(apex_engine) as session:
+        stats = export_table('ChemInfo', out_path, chunk_size=2, session=session)
+    rows = _read_csv(out_path)
+    chem_id_col = rows[0].index('ChemID')
+    assert stats['rows'] == len(CHEM_IDS) and stats['errors'] == 0
+    assert [int(row[chem_id_col]) for row in rows[1:]] == sorted(CHEM_IDS.values())
+    assert not os.path.exists(out_path + '.errors.jsonl')
+    assert not os.path.exists(str(tmp_path / 'cheminfo.tmp.csv'))
+
+
+def test_export_table_failure_keeps_old_snapshot(apex_engine, tmp_path, monkeypatch):
+    out_path = tmp_path / 'cheminfo.csv'
+    out_path.write_text('previous\n')
+
+    def failing_chunks(session, table_name, chunk_size, where=None):
+        yield [tuple(range(len(apex_export._get_table(table_name).columns)))]
+        raise ConnectionError('server went away')
+
+    monkeypatch.setattr(apex_export, 'iter_table_chunks', failing_chunks)
+    with Session(apex_engine) as session, pytest.raises(ConnectionError):
+        export_table('ChemInfo', str(out_path), session=session)
+    assert out_path.read_text() == 'previous\n'
+    assert not (tmp_path / 'cheminfo.tmp.csv').exists()
+
+
+def _chem_ids_in(path):
+    rows = _read_csv(path)
+    col = rows[0].index('ChemID')
+    return [int(row[col]) for row in rows[1:]]
+
+
+def test_sync_table_adds_and_reconciles(apex_engine, tmp_path):
+    table = apex_export._get_table('ChemInfo')
+    path = str(tmp_path / 'cheminfo.csv')
+    with Session(apex_engine) as session:
+        first = apex_export.sync_table('ChemInfo', path, session=session)
+        assert first['mode'] == 'full' and os.path.exists(path + '.sync.json')
+
+        session.execute(table.insert(), [_filled(table, {'ChemID': 20, 'CASN': '67-56-1'}, itertools.count(5000))])
+        session.execute(table.delete().where(table.c.ChemID == 12))
+        stats = apex_export.sync_table('ChemInfo', path, session=session)
+        assert (stats['mode'], stats['added'], stats['removed']) == ('incremental', 1, 0)
+        # a deletion is invisible to the high-water mark
+        assert _chem_ids_in(path) == [11, 12, 13, 20]
+
+        stats = apex_export.sync_table('ChemInfo', path, session=session, reconcile=True)
+        assert (stats['added'], stats['removed'], stats['rows']) == (0, 1, 3)
+        assert _chem_ids_in(path) == [11, 13, 20]
+
+
+def test_sync_table_exports_unclean_snapshot_in_full(apex_engine, tmp_path):
+    path = str(tmp_path / 'cheminfo.csv')
+    with Session(apex_engine) as session:
+        apex_export.sync_table('ChemInfo', path, session=session)
+        # an old append-mode dump: the table twice, header included
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + text)
+        os.remove(path + '.sync.json')
+        stats = apex_export.sync_table('ChemInfo', path, session=session)
+    assert stats['mode'] == 'full'
+    assert _chem_ids_in(path) == sorted(CHEM_IDS.values())
@@ -0,0 +1,96 @@
+import functools
+
+import pytest
+
+from aspen_pool import AspenSessionPool, FakeApp, wait_until_ready
+from node_cache import NodeCache
+
+FEED_T = r'\Data\Streams\FEED\Input\TEMP\MIXED'
+RESULT = r'\Data\Blocks\FLASH\Output\B_PRES'
+
+
+def _configure(sim):
+    sim.getNode(FEED_T).value = 300.0
+    sim.getNode(r'\Data\Blocks\FLASH\Input\TEMP').value = 350.0
+
+
+def _solver(values):
+    return {RESULT: 2.0 * values['Data\\Streams\\FEED\\Input\\TEMP\\MIXED']}
+
+
+def test_wait_until_ready():
+    assert wait_until_ready(FakeApp(startup_s=0.05), timeout=2.0, poll_s=0.01) >= 0.05
+    with pytest.raises(TimeoutError):
+        wait_until_ready(FakeApp(startup_s=5.0), timeout=0.05, poll_s=0.01)
+
+
+def test_session_restores_baseline_between_jobs():
+    apps = []
+
+    def factory():
+        apps.append(FakeApp(solver=_solver))
+        return apps[-1]
+
+    with AspenSessionPool(size=1, app_factory=factory, configure=_configure, baseline_paths=[FEED_T]) as pool:
+        with pool.session() as sim:
+            sim.getNode(FEED_T).value = 400.0
+            sim.run()
+            assert sim.getNode(RESULT).value == 800.0
+        with pool.session() as sim:
+            # configured once, then put back to baseline and reinitialized after the first job
+            assert sim.getNode(FEED_T).value == 300.0
+            assert sim is apps[0] and sim.reinitializations == 1
+    assert len(apps) == 1 and apps[0].closed
+    assert pool.stats['launches'] == 1 and pool.stats['acquires'] == 2
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_instances_are_recycled_and_discarded():
+    pool = AspenSessionPool(size=1, app_factory=FakeApp, configure=_configure, max_uses=2, prelaunch=False)
+    assert pool.stats['launches'] == 0
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)
+    # spent after max_uses jobs: closed, and its slot relaunched on the next acquire
+    assert first.sim.closed and pool.stats['recycles'] == 1
+    second = pool.acquire()
+    assert second is not first and pool.stats['launches'] == 2
+    pool.release(second, discard=True)
+    assert second.sim.closed and pool.stats['discards'] == 1
+
+    def broken_reset(sim):
+        raise RuntimeError('reinitialize failed')
+
+    pool.reset = broken_reset
+    third = pool.acquire()
+    pool.release(third)
+    assert third.sim.closed and pool.stats['discards'] == 2
+    pool.close()
+
+
+def test_failed_launch_frees_its_slot():
+    def configure(sim):
+        raise RuntimeError('no license')
+
+    pool = AspenSessionPool(size=1, app_factory=FakeApp, configure=configure, prelaunch=False)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.configure = _configure
+    with pool.session() as sim:
+        assert sim.getNode(FEED_T).value == 300.0
+    pool.close()
+
+
+def test_node_cache_survives_reset():
+    factory = functools.partial(FakeApp, solver=_solver)
+    with AspenSessionPool(size=1, app_factory=factory, configure=_configure, node_cache=True) as pool:
+        with pool.session() as sim:
+            assert isinstance(sim, NodeCache)
+            sim.getNode(FEED_T).value = 320.0
+            sim.run()
+        with pool.session() as sim:
+            node = sim.getNode(FEED_T)
+            assert sim.stats['hits'] == 1 and sim.stats['structure_checks'] == 1
+            assert sim.sim.runs == 1 and node.value == 320.0
@@ -0,0 +1,54 @@
+import numpy as np
+
+from azeotropes import _ln_k, find_azeotropes, solve_azeotropes, trace_azeotropes
+from test_phase_diagrams import ETHANOL, ETHANOL_WATER, METHANOL, P_ATM, WATER
+from vapor_pressure import VaporPressureEngine
+from vle_solver import GammaPhiModel
+from wilson import WilsonModel
+
+
+def test_finds_the_ethanol_water_azeotrope():
+    (azeotrope,) = find_azeotropes(ETHANOL_WATER, P_ATM)
+    assert azeotrope['components'] == (0, 1) and azeotrope['kind'] == 'minimum-boiling'
+    np.testing.assert_allclose(azeotrope['x'], [0.8953, 0.1047], atol=1e-3)
+    np.testing.assert_allclose(azeotrope['temperature_k'], 351.29, atol=0.05)
+    ln_k = _ln_k(ETHANOL_WATER, [0, 1], azeotrope['x'][np.newaxis, :], np.array([azeotrope['temperature_k']]),
+                 np.array([P_ATM]))
+    assert np.abs(ln_k).max() < 1e-9
+
+
+def test_subsets_and_kinds():
+    # only the ethanol/water pair of this ternary is non-ideal
+    lam = np.zeros((3, 3))
+    lam[1, 2], lam[2, 1] = np.log(0.17), np.log(0.87)
+    ternary = GammaPhiModel(VaporPressureEngine([METHANOL, ETHANOL, WATER]), WilsonModel(lam))
+    (azeotrope,) = find_azeotropes(ternary, P_ATM)
+    assert azeotrope['components'] == (1, 2) and azeotrope['x'][0] == 0.0
+    assert find_azeotropes(ternary, P_ATM, components=[0, 1]) == []
+
+    negative = GammaPhiModel(VaporPressureEngine([ETHANOL, WATER]), WilsonModel(np.log([[1.0, 2.0], [2.0, 1.0]])))
+    (azeotrope,) = find_azeotropes(negative, P_ATM)
+    assert azeotrope['kind'] == 'maximum-boiling' and azeotrope['temperature_k'] > 373.15
+
+
+def test_solve_rejects_edge_solutions():
+    # an ideal pair has no azeotrope: Newton runs to the edge of the simplex
+    ideal = GammaPhiModel(VaporPressureEngine([METHANOL, WATER]))
+    _, _, converged, _ = solve_azeotropes(ideal, [0, 1], [[0.5, 0.5]], [350.0], [P_ATM])
+    assert not converged[0]
+
+
+def test_trace_follows_and_ends_the_branch():
+    pressures = np.geomspace(P_ATM, 50.0, 12)
+    trace = trace_azeotropes(ETHANOL_WATER, pressures)
+    (branch,) = trace['branches']
+    alive = np.isfinite(branch['temperature_k'])
+    # the azeotrope shifts toward pure ethanol as the pressure drops, then disappears
+    assert alive[:8].all() and not alive[8:].any()
+    assert np.all(np.diff(branch['x'][alive, 0]) > 0.0) and np.all(np.diff(branch['temperature_k'][alive]) < 0.0)
+    assert branch['end_pressure_pa'] == pressures[7]
+    assert trace['stats']['n_branches'] == 1 and trace['stats']['n_substeps'] > 0
+
+    # every traced point is an azeotrope at its own pressure
+    (check,) = find_azeotropes(ETHANOL_WATER, pressures[4])
+    np.testing.assert_allclose(check['x'], branch['x'][4], atol=1e-6)
@@ -0,0 +1,60 @@
+import os
+
+import cheminfo_index
+from cheminfo_index import CHEMINFO_CSV, ChemInfoIndex, get_local_cheminfo_index
+
+COLUMNS = ['ChemID', 'Name', 'CASN', 'CNAM', 'INAM', 'CanonicalSMILES']
+ROWS = [
+    ['1', 'ACETIC ACID', '64-19-7', 'ACETIC ACID', 'ETHANOIC ACID', 'CC(=O)O'],
+    ['2', 'WATER', '7732-18-5', 'WATER', 'OXIDANE', 'O'],
+    ['3', 'PROPIONIC ACID', '79-09-4', 'PROPIONIC ACID', 'PROPANOIC ACID', 'CCC(=O)O'],
+]
+
+
+def _write_csv(path, blocks):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for block in blocks:
+            f.writelines(','.join(row) + '\n' for row in block)
+
+
+def test_from_csv_skips_repeated_headers_and_copies(tmp_path):
+    path = tmp_path / 'ci.csv'
+    # an older export appended twice, header included
+    _write_csv(path, [[COLUMNS] + ROWS, [COLUMNS] + ROWS[:2]])
+    index = ChemInfoIndex.from_csv(str(path))
+    assert len(index) == 3
+    assert index.find('CASN', 'CASN') == []
+    assert index.chem_id_from_cas('64-19-7') == 1
+    assert index.chem_ids_from_cas(['7732-18-5', '0-00-0']) == {'7732-18-5': 2}
+
+
+def test_find_and_search(tmp_path):
+    path = tmp_path / 'ci.csv'
+    _write_csv(path, [[COLUMNS] + ROWS])
+    index = ChemInfoIndex.from_csv(str(path))
+    assert index.find('Name', ' water ') == [1]
+    assert index.find('CanonicalSMILES', 'o') == []
+    assert [index.as_dict(row)['Name'] for row in index.search_prefix('prop')] == ['PROPIONIC ACID']
+    assert sorted(index.as_dict(row)['Name'] for row in index.search_substring('IC AC')) == ['ACETIC ACID', 'PROPIONIC ACID']
+
+
+def test_load_uses_and_invalidates_cache(tmp_path):
+    path = tmp_path / 'ci.csv'
+    _write_csv(path, [[COLUMNS] + ROWS])
+    first = ChemInfoIndex.load(str(path))
+    assert os.path.exists(tmp_path / 'ci.idx')
+    assert ChemInfoIndex.load(str(path)).records == first.records
+    _write_csv(path, [[COLUMNS] + ROWS[:1]])
+    os.utime(path, ns=(1, 1))
+    assert len(ChemInfoIndex.load(str(path))) == 1
+
+
+def test_get_local_cheminfo_index_per_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(cheminfo_index, '_indexes', {})
+    small = tmp_path / 'ci.csv'
+    _write_csv(small, [[COLUMNS] + ROWS[:1]])
+    assert len(get_local_cheminfo_index(str(small))) == 1
+    assert get_local_cheminfo_index(str(small)) is get_local_cheminfo_index(str(small))
+    assert get_local_cheminfo_index(str(tmp_path / 'missing.csv')) is None
+    if os.path.exists(CHEMINFO_CSV):
+        assert len(get_local_cheminfo_index()) > 1
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from comp_status import FLAGS, decode_status, describe_status, print_rollup, snapshot_rollup, status_array, status_rollup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_TREE = os.path.join(HERE, 'aspen_data_tree.txt')
+HOAC_TREE = os.path.join(HERE, 'hoac_h2o_aspen_data_tree.txt')
+
+
+def test_decode_status():
+    assert describe_status(2097218) == ['no_results', 'input_incomplete', 'bit_21']
+    assert describe_status(2105474) == ['no_results', 'input_complete', 'bit_13', 'bit_21']
+    codes = status_array([2097282, None, '2097666', True, np.int64(0x9)])
+    np.testing.assert_array_equal(codes, [2097282, -1, -1, -1, 9])
+    columns = decode_status(codes)
+    np.testing.assert_array_equal(columns['known'], [True, False, False, False, True])
+    np.testing.assert_array_equal(columns['results_errors'], [False, False, False, False, True])
+    np.testing.assert_array_equal(columns['bit_21'], [True, False, False, False, False])
+    assert set(decode_status(codes, unknown_bits=False)) == set(FLAGS) | {'known'}
+
+
+def test_status_rollup_lists_the_deepest_missing_input():
+    paths = [r'\Data\Flowsheet', r'\Data\Flowsheet\Section', r'\Data\Flowsheet\Section\GLOBAL', 'Data\\Setup\\Main\\']
+    rollup = status_rollup(paths, status_array([2097218, 2097218, 2097218, None]))
+    assert not rollup['ready'] and rollup['totals']['unknown'] == 1
+    assert rollup['subtrees'][r'\Data\Flowsheet']['missing'] == [r'\Data\Flowsheet\Section\GLOBAL']
+    assert rollup['subtrees'][r'\Data\Setup'] == {'nodes': 1, 'unknown': 1, 'missing': [], 'input_incomplete': 0,
+                                                  'input_complete': 0, 'input_empty': 0, 'no_results': 0,
+                                                  'results_warnings': 0, 'results_errors': 0}
+
+
+def test_blank_snapshot_is_not_ready(capsys):
+    rollup = snapshot_rollup(DATA_TREE)
+    totals = rollup['totals']
+    assert not rollup['ready']
+    assert (totals['nodes'], totals['input_incomplete'], totals['input_complete'], totals['input_empty']) == (171, 9, 82, 78)
+    subtrees = rollup['subtrees']
+    assert subtrees[r'\Data\Components']['input_incomplete'] == 4
+    assert subtrees[r'\Data\Components']['missing'] == [r'\Data\Components\Specifications', r'\Data\Components\Comp-Lists\GLOBAL']
+    assert subtrees[r'\Data\Properties']['missing'] == [r'\Data\Properties\Specifications']
+    assert subtrees[r'\Data\Flowsheet']['missing'] == [r'\Data\Flowsheet\Section\GLOBAL']
+    assert sum(summary['nodes'] for summary in subtrees.values()) == 171
+    assert snapshot_rollup(DATA_TREE, max_missing=1)['subtrees'][r'\Data\Components']['missing'] == [r'\Data\Components\Specifications']
+    assert list(snapshot_rollup(DATA_TREE, depth=1)['subtrees']) == [r'\Data']
+
+    print_rollup(rollup)
+    out = capsys.readouterr().out
+    assert '171 nodes: 9 incomplete' in out and 'NOT ready' in out
+    assert r'missing input: \Data\Properties\Specifications' in out
+
+
+def test_hoac_snapshot_is_ready(capsys):
+    rollup = snapshot_rollup(HOAC_TREE)
+    totals = rollup['totals']
+    assert rollup['ready'] and totals['input_incomplete'] == 0 and totals['unknown'] == 0
+    assert (totals['nodes'], totals['input_complete'], totals['input_empty']) == (92, 65, 25)
+    assert all(summary['missing'] == [] for summary in rollup['subtrees'].values())
+    print_rollup(rollup)
+    out = capsys.readouterr().out
+    assert '-> ready' in out and 'missing input' not in out
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('emnengr.apex.emnphysprop2')
+
+import emnengr_utils  # noqa: E402
+
+
+def test_get_property_matrix(apex_session):
+    cas_numbers = ['7732-18-5', '79-09-4', '0-00-0', '64-19-7']
+    matrix, chem_index, prop_index = emnengr_utils.get_property_matrix(cas_numbers, ['TC', 'MW', 'NOSUCH'], session=apex_session)
+    assert matrix.shape == (4, 3)
+    assert list(chem_index) == cas_numbers and list(prop_index) == ['TC', 'MW', 'NOSUCH']
+    expected = np.array([[647.096, 18.015, np.nan],
+                         [600.81, np.nan, np.nan],
+                         [np.nan, np.nan, np.nan],
+                         [591.95, 60.052, np.nan]])
+    np.testing.assert_allclose(matrix, expected)
+
+
+def test_get_property_matrix_shared_chem_id(apex_session, monkeypatch):
+    # a retired CAS number resolving to the same ChemID as the current one fills both rows
+    monkeypatch.setattr(emnengr_utils, 'get_chem_ids_from_cas',
+                        lambda cas_numbers, session=None, use_local=None: {'64-19-7': 11, '64-19-7-OLD': 11})
+    matrix, chem_index, _ = emnengr_utils.get_property_matrix(['64-19-7', '64-19-7-OLD'], ['MW'], session=apex_session)
+    np.testing.assert_allclose(matrix[:, 0], [60.052, 60.052])
+
+
+def test_get_property_matrix_empty(apex_session):
+    matrix, chem_index, prop_index = emnengr_utils.get_property_matrix([], ['MW'], session=apex_session)
+    assert matrix.shape == (0, 1) and chem_index == {}
+
+
+def test_align_values_keeps_input_order_and_first_duplicate():
+    values, found, duplicate = emnengr_utils.align_values([3, 1, 2, 3], [(1, 10.0), (3, 30.0), (3, 31.0), (2, None)])
+    np.testing.assert_allclose(values, [30.0, 10.0, np.nan, 30.0])
+    assert found.tolist() == [True, True, False, True]
+    assert duplicate.tolist() == [True, False, False, True]
+
+
+def test_get_constant_values(apex_session):
+    assert emnengr_utils.get_constant_values([12, 11, 13], 1, session=apex_session) == pytest.approx([18.015, 60.052, None])
+    values, found, duplicate = emnengr_utils.get_constant_values([12, 11, 13, 12], 1, session=apex_session, return_mask=True)
+    assert found.tolist() == [True, True, False, True]
+    assert not duplicate.any()
+    assert np.isnan(values[2])
+    assert emnengr_utils.get_constant_values([], 1, session=apex_session) is None
+
+
+def test_get_mws(apex_session):
+    assert emnengr_utils.get_mws([11, 12], session=apex_session) == pytest.approx([60.052, 18.015])
+    assert emnengr_utils.get_mws([11, 13], session=apex_session) is None
+
+
+def test_property_id_cache(apex_session):
+    cache = emnengr_utils.PropertyIdCache()
+    assert cache.get_many(['MW', 'TC', 'NOSUCH'], session=apex_session) == {'MW': 1, 'TC': 2, 'NOSUCH': None}
+    assert cache.get('TC', session=apex_session) == 2
+    stats = cache.stats()
+    assert stats['loads'] == 1 and stats['hits'] == 1 and stats['misses'] == 3
+
+
+def test_chem_ids_skip_local_index(apex_session):
+    # the sqlite ChemIDs differ from apex_cheminfo.csv, so these only pass if the session is used
+    assert emnengr_utils.get_chem_ids_from_cas(['64-19-7', '7732-18-5', '0-00-0'], session=apex_session) == {'64-19-7': 11, '7732-18-5': 12}
+    assert emnengr_utils.get_chem_id_from_cas('79-09-4', session=apex_session) == 13
+    assert emnengr_utils.get_chem_id_from_cas('0-00-0', session=apex_session) is None
+
+
+def test_chem_ids_use_local_index(apex_session):
+    if emnengr_utils._local_cheminfo(use_local=True) is None:
+        pytest.skip('no apex_cheminfo.csv snapshot')
+    chem_ids = emnengr_utils.get_chem_ids_from_cas(['64-19-7'], session=apex_session, use_local=True)
+    assert chem_ids['64-19-7'] != 11
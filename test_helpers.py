@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from helpers import (convert_composition, mass_fracts_from_mole_fracts, mass_fracts_from_mole_fracts_batch,
+                     mole_fracts_from_mass_fracts, mole_fracts_from_mass_fracts_batch)
+
+MWS = [60.052, 18.015, 74.079]
+
+
+def test_batch_matches_scalar_converters():
+    mass = np.array([[0.5, 0.2, 0.3], [0.1, 0.8, 0.1]])
+    moles, valid = mole_fracts_from_mass_fracts_batch(mass, MWS)
+    assert valid.all()
+    for row_mass, row_moles in zip(mass, moles):
+        np.testing.assert_allclose(row_moles, mole_fracts_from_mass_fracts(row_mass.tolist(), MWS))
+    back, _ = mass_fracts_from_mole_fracts_batch(moles, MWS)
+    np.testing.assert_allclose(back, mass)
+    np.testing.assert_allclose(mass_fracts_from_mole_fracts(moles[0].tolist(), MWS), mass[0])
+
+
+def test_batch_invalid_rows_are_nan():
+    moles, valid = mole_fracts_from_mass_fracts_batch([[0.5, 0.5, 0.0], [-0.1, 0.6, 0.5], [0.0, 0.0, 0.0]], MWS)
+    assert valid.tolist() == [True, False, False]
+    assert np.isnan(moles[1:]).all()
+
+
+def test_batch_in_place_and_1d_out():
+    mass = np.array([[0.5, 0.2, 0.3]])
+    expected, _ = mole_fracts_from_mass_fracts_batch(mass, MWS)
+    result, _ = mole_fracts_from_mass_fracts_batch(mass, MWS, out=mass)
+    assert result is mass
+    np.testing.assert_allclose(mass, expected)
+
+    out = np.empty(3)
+    mass_fracts_from_mole_fracts_batch(np.array([1.0, 1.0, 1.0]) / 3.0, MWS, out=out)
+    np.testing.assert_allclose(out, np.array(MWS) / sum(MWS))
+
+
+def test_batch_rejects_bad_shapes():
+    with pytest.raises(ValueError):
+        mole_fracts_from_mass_fracts_batch([[0.5, 0.5]], MWS)
+    with pytest.raises(ValueError):
+        mole_fracts_from_mass_fracts_batch([0.5, 0.2, 0.3], MWS, out=np.empty(4))
+
+
+def test_convert_composition_round_trips():
+    mass = np.array([[0.7, 0.2, 0.1], [0.2, 0.3, 0.5]])
+    lvols = [0.0576, 0.0181, 0.0750]
+    for basis in ('mole_frac', 'mole_ppm', 'lvol_frac', 'mass_ppm', 'mole_flow', 'lvol_flow'):
+        there, valid = convert_composition(mass, 'mass_frac', basis, mws=MWS, lvols=lvols, total=50.0)
+        assert valid.all()
+        back, valid = convert_composition(there, basis, 'mass_frac', mws=MWS, lvols=lvols)
+        np.testing.assert_allclose(back, mass, err_msg=basis)
+
+    moles, _ = convert_composition(mass, 'mass_frac', 'mole_frac', mws=MWS)
+    np.testing.assert_allclose(moles, mole_fracts_from_mass_fracts_batch(mass, MWS)[0])
+
+
+def test_convert_composition_flows():
+    # 100 kg of 70/30 acetic acid/water is 1.1657 + 1.6653 kmol
+    flows, _ = convert_composition([0.7, 0.3], 'mass_frac', 'mole_flow', mws=MWS[:2], total=100.0)
+    np.testing.assert_allclose(flows, [[70.0 / 60.052, 30.0 / 18.015]])
+    fracts, _ = convert_composition(flows, 'mole_flow', 'mole_frac')
+    np.testing.assert_allclose(fracts.sum(), 1.0)
+
+
+def test_convert_composition_same_quantity_needs_no_properties():
+    ppm, valid = convert_composition([[0.7, 0.3]], 'mass_frac', 'mass_ppm')
+    np.testing.assert_allclose(ppm, [[7e5, 3e5]])
+    flows, _ = convert_composition([[0.7, 0.3]], 'lvol_frac', 'lvol_flow', total=[10.0])
+    np.testing.assert_allclose(flows, [[7.0, 3.0]])
+    with pytest.raises(ValueError, match='needs mws'):
+        convert_composition([[0.7, 0.3]], 'mass_frac', 'mole_frac')
+
+
+def test_convert_composition_1d_out_and_invalid_rows():
+    out = np.empty(2)
+    result, valid = convert_composition(np.array([0.25, 0.75]), 'mole_frac', 'mole_ppm', out=out)
+    np.testing.assert_allclose(out, [2.5e5, 7.5e5])
+    assert valid.tolist() == [True]
+    _, valid = convert_composition([[0.5, -0.5], [0.0, 0.0]], 'mole_frac', 'mole_ppm')
+    assert valid.tolist() == [False, False]
+    with pytest.raises(ValueError):
+        convert_composition([[0.5, 0.5]], 'mole_frac', 'weight_frac')
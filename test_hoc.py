@@ -0,0 +1,69 @@
+import numpy as np
+
+import hoc
+from hoc import DEBYE_PER_SI_DIPOLE, HOCModel
+
+# acetic acid, water
+TC = [591.95, 647.096]
+PC = [57.86e5, 220.64e5]
+RD = [2.595, 0.615]
+DIPOLE = [1.74, 1.85]
+ETA = [[4.5, 2.5], [2.5, 1.7]]
+
+
+def test_pure_acetic_acid_is_strongly_dimerized():
+    model = HOCModel(TC[:1], PC[:1], RD[:1], DIPOLE[:1], eta=[[4.5]])
+    # saturated vapor at the normal boiling point: most of the acid is dimerized
+    phi = model.phi_pure([391.05], [[101325.0]])[0, 0]
+    assert 0.3 < phi < 0.6
+    # the same species without association is close to ideal
+    plain = HOCModel(TC[:1], PC[:1], RD[:1], DIPOLE[:1]).phi_pure([391.05], [[101325.0]])[0, 0]
+    assert 0.9 < plain < 1.0
+    # dimers dissociate as the pressure drops
+    low = model.phi_pure([391.05, 391.05], [[1000.0], [1.0]])[:, 0]
+    assert phi < low[0] < low[1] < 1.0
+    np.testing.assert_allclose(low[1], 1.0, atol=1e-4)
+
+
+def test_mixture_reduces_to_pure_component():
+    model = HOCModel(TC, PC, RD, DIPOLE, eta=ETA)
+    phi = model.phi(380.0, 101325.0, [[1.0, 0.0], [0.0, 1.0]])
+    pure = model.phi_pure([380.0], [[101325.0, 101325.0]])[0]
+    np.testing.assert_allclose([phi[0, 0], phi[1, 1]], pure, rtol=1e-10)
+    # water at infinite dilution in acid vapor is carried off as the cross dimer
+    assert phi[1, 0] < pure[1]
+
+
+def test_monomer_fractions_satisfy_chemical_equilibrium():
+    model = HOCModel(TC, PC, RD, DIPOLE, eta=ETA)
+    temps = np.array([360.0, 380.0, 400.0])
+    pressures = np.array([5e4, 101325.0, 2e5])
+    y = np.array([[0.9, 0.1], [0.5, 0.5], [0.2, 0.8]])
+    z = model.monomer_fractions(temps, pressures, y)
+    _, b_dimer = model.second_virial(temps)
+    pg = model._pressure_g(b_dimer, temps, pressures)
+    resid = z * (1.0 + np.einsum('pij,pj->pi', pg, z)) - y * (2.0 - z.sum(axis=1, keepdims=True))
+    assert np.abs(resid).max() < 1e-10
+    # the rest of the true species are dimers
+    assert (z > 0.0).all() and (z.sum(axis=1) < 1.0).all()
+
+
+def test_second_virial_cache():
+    model = HOCModel(TC, PC, RD, DIPOLE, eta=ETA)
+    b_free, b_dimer = model.second_virial([350.0, 360.0, 350.0])
+    assert b_free.shape == (3, 2, 2) and len(model._cache) == 2
+    np.testing.assert_allclose(b_free[0], b_free[2])
+    np.testing.assert_allclose(b_free, np.transpose(b_free, (0, 2, 1)))
+    direct = model._virials_at([360.0])
+    np.testing.assert_allclose(b_dimer[1], direct[1][0])
+    model.second_virial(np.linspace(300.0, 500.0, hoc._CACHE_SIZE))
+    assert len(model._cache) == 2
+
+
+def test_from_property_matrix_converts_apex_units():
+    prop_index = {'TC': 0, 'PC': 1, 'RG': 2, 'DM': 3}
+    matrix = np.array([[TC[0], PC[0], RD[0] / hoc.ANGSTROM_PER_M, DIPOLE[0] / DEBYE_PER_SI_DIPOLE],
+                       [TC[1], PC[1], RD[1] / hoc.ANGSTROM_PER_M, np.nan]])
+    model = HOCModel.from_property_matrix(matrix, prop_index, eta=ETA, component_ids=['64-19-7', '7732-18-5'])
+    direct = HOCModel(TC, PC, RD, [DIPOLE[0], 0.0], eta=ETA)
+    np.testing.assert_allclose(model.phi(380.0, 101325.0, [[0.4, 0.6]]), direct.phi(380.0, 101325.0, [[0.4, 0.6]]))
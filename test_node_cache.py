@@ -0,0 +1,49 @@
+from aspen_pool import FakeApp
+from node_cache import NodeCache
+
+FEED_T = r'\Data\Streams\FEED\Input\TEMP\MIXED'
+FLASH_P = r'\Data\Blocks\FLASH\Input\PRES'
+
+
+def _sim():
+    sim = FakeApp()
+    sim.getNode(FEED_T).value = 300.0
+    sim.getNode(FLASH_P).value = 1.0
+    return sim
+
+
+def test_handles_are_reused():
+    nodes = NodeCache(_sim())
+    first = nodes.getNode(FEED_T)
+    assert nodes.getNode('Data\\Streams\\FEED\\Input\\TEMP\\MIXED\\') is first
+    assert (nodes.stats['hits'], nodes.stats['misses'], len(nodes)) == (1, 1, 1)
+    first.value = 320.0
+    nodes.run()
+    # everything but getNode reaches the wrapped App
+    assert nodes.sim.runs == 1 and nodes.sim.values['Data\\Streams\\FEED\\Input\\TEMP\\MIXED'] == 320.0
+    assert nodes.saved_s() >= 0.0 and NodeCache(_sim()).saved_s() == 0.0
+
+
+def test_invalidate_counts_dropped_handles():
+    nodes = NodeCache(_sim())
+    for path in (FEED_T, r'\Data\Streams\FEED', r'\Data\Streams\FEED2', FLASH_P):
+        nodes.getNode(path)
+    assert nodes.invalidate(r'\Data\Streams\FEED') == 2
+    assert nodes.invalidate(r'\Data\Streams\FEED') == 0
+    assert nodes.invalidate() == 2 and len(nodes) == 0
+    assert nodes.stats['dropped_handles'] == 4
+    assert nodes.getNode(FLASH_P) is not None and nodes.stats['misses'] == 5
+
+
+def test_structure_change_drops_every_handle(capsys):
+    sim = _sim()
+    nodes = NodeCache(sim)
+    nodes.getNode(FEED_T)
+    nodes.getNode(FLASH_P)
+    assert not nodes.check_structure()
+    sim.getNode(r'\Data\Blocks\MIXER\Input\PRES').value = 1.0
+    assert nodes.check_structure() and len(nodes) == 0
+    assert nodes.stats['dropped_handles'] == 2 and nodes.stats['structure_checks'] == 2
+    assert not nodes.check_structure()
+    nodes.report()
+    assert '0 of 2 getNode calls served from cache, 0 handles, 2 dropped' in capsys.readouterr().out
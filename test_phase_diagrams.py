@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from phase_diagrams import pxy_diagram, ternary_slice, txy_diagram, xy_diagram
+from vapor_pressure import VaporPressureEngine, antoine_mmhg_celsius_coeffs
+from vle_solver import GammaPhiModel, bubble_temperature
+from wilson import WilsonModel
+
+P_ATM = 101325.0
+ETHANOL = antoine_mmhg_celsius_coeffs(8.20417, 1642.89, 230.3)
+WATER = antoine_mmhg_celsius_coeffs(8.07131, 1730.63, 233.426)
+METHANOL = antoine_mmhg_celsius_coeffs(8.08097, 1582.271, 239.726)
+# ethanol / water: minimum-boiling azeotrope near x_EtOH = 0.89, 351.3 K
+ETHANOL_WATER = GammaPhiModel(VaporPressureEngine([ETHANOL, WATER]),
+                              WilsonModel([[0.0, np.log(0.17)], [np.log(0.87), 0.0]]))
+
+
+def _azeotrope_intervals(diagram):
+    split = diagram['y'][:, 0] - diagram['x'][:, 0]
+    return np.flatnonzero(split[:-1] * split[1:] < 0.0)
+
+
+def test_txy_diagram_is_resolved():
+    diagram = txy_diagram(ETHANOL_WATER, P_ATM)
+    stats = diagram['stats']
+    assert diagram['converged'].all() and stats['n_failed'] == 0
+    assert np.all(np.diff(diagram['s']) > 0.0) and stats['n_points'] == diagram['s'].size <= 201
+    np.testing.assert_allclose(diagram['x'][:, 0], diagram['s'])
+    np.testing.assert_allclose(diagram['temperature_k'][[0, -1]], [373.15, 351.44], atol=0.1)
+
+    # linear interpolation between the placed points reproduces a dense direct solve
+    x1 = np.linspace(0.0, 1.0, 401)
+    dense = bubble_temperature(ETHANOL_WATER, P_ATM, np.column_stack([x1, 1.0 - x1]))['temperature_k']
+    t_range = np.ptp(diagram['temperature_k'])
+    assert np.abs(np.interp(x1, diagram['s'], diagram['temperature_k']) - dense).max() < 5e-3 * t_range
+
+
+def test_txy_diagram_refines_the_azeotrope():
+    diagram = txy_diagram(ETHANOL_WATER, P_ATM, min_step=1e-4)
+    crossing = _azeotrope_intervals(diagram)
+    assert crossing.size == 1
+    s = diagram['s']
+    assert 0.85 < s[crossing[0]] < 0.93 and s[crossing[0] + 1] - s[crossing[0]] <= 1e-4
+    # the pure-component ends are not spent on
+    assert np.diff(s)[:5].min() > 1e-3
+
+
+def test_pxy_ideal_bubble_line_is_straight():
+    model = GammaPhiModel(VaporPressureEngine([METHANOL, WATER]))
+    diagram = pxy_diagram(model, 340.0)
+    psat = model.psat([340.0])[0]
+    np.testing.assert_allclose(diagram['pressure_pa'], diagram['x'] @ psat)
+    assert _azeotrope_intervals(diagram).size == 0
+    assert xy_diagram(model, temp_k=340.0)['stats']['n_points'] == diagram['stats']['n_points']
+    with pytest.raises(ValueError):
+        xy_diagram(model)
+    with pytest.raises(ValueError):
+        txy_diagram(GammaPhiModel(VaporPressureEngine([METHANOL, ETHANOL, WATER])), P_ATM)
+
+
+def test_ternary_slice():
+    model = GammaPhiModel(VaporPressureEngine([METHANOL, ETHANOL, WATER]))
+    diagram = ternary_slice(model, 2, 0.2, pressure_pa=P_ATM, n_initial=5)
+    assert diagram['converged'].all()
+    np.testing.assert_allclose(diagram['x'][:, 2], 0.2)
+    np.testing.assert_allclose(diagram['x'][:, 0], 0.8 * diagram['s'])
+    # more methanol boils lower
+    assert np.all(np.diff(diagram['temperature_k']) < 0.0)
+    with pytest.raises(ValueError):
+        ternary_slice(model, 2, 0.2)
+    with pytest.raises(ValueError):
+        ternary_slice(ETHANOL_WATER, 1, 0.2, pressure_pa=P_ATM)
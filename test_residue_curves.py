@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from residue_curves import _parameter_hash, residue_curve_map, simplex_grid
+from test_phase_diagrams import ETHANOL, METHANOL, P_ATM, WATER
+from vapor_pressure import VaporPressureEngine
+from vle_solver import GammaPhiModel
+from wilson import WilsonModel
+
+VAPOR_PRESSURE = VaporPressureEngine([METHANOL, ETHANOL, WATER], component_ids=['67-56-1', '64-17-5', '7732-18-5'])
+
+
+def _wilson(ethanol_water=0.17):
+    lam = np.zeros((3, 3))
+    lam[1, 2], lam[2, 1] = np.log(ethanol_water), np.log(0.87)
+    return WilsonModel(lam)
+
+
+def _kinds(result):
+    return [(tuple(np.round(p['x'], 3)), p['kind']) for p in result['singular_points']]
+
+
+def test_simplex_grid():
+    grid = simplex_grid(3, 4)
+    assert grid.shape == (3, 3) and (grid > 0.0).all()
+    np.testing.assert_allclose(grid.sum(axis=1), 1.0)
+    assert simplex_grid(3, 2).shape == (0,)
+
+
+@pytest.fixture(scope='module')
+def ideal_map(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp('residue')
+    return residue_curve_map(GammaPhiModel(VAPOR_PRESSURE), P_ATM, n_divisions=4, cache_dir=str(cache_dir)), cache_dir
+
+
+def test_ideal_map_runs_light_to_heavy(ideal_map):
+    result, _ = ideal_map
+    assert _kinds(result) == [((1.0, 0.0, 0.0), 'unstable node'), ((0.0, 1.0, 0.0), 'saddle'),
+                              ((0.0, 0.0, 1.0), 'stable node')]
+    for curve, temps, length in zip(result['curves'], result['temperatures'], result['lengths']):
+        np.testing.assert_allclose(curve[0], [1.0, 0.0, 0.0], atol=1e-3)
+        np.testing.assert_allclose(curve[length - 1], [0.0, 0.0, 1.0], atol=1e-3)
+        assert np.all(np.diff(temps[:length]) >= -1e-9)
+        assert np.isnan(temps[length:]).all()
+
+
+def test_wilson_map_has_a_distillation_boundary():
+    result = residue_curve_map(GammaPhiModel(VAPOR_PRESSURE, _wilson()), P_ATM, n_divisions=4)
+    kinds = dict(_kinds(result))
+    # the ethanol/water azeotrope is the saddle and ethanol becomes a second heavy end
+    assert kinds[(0.0, 1.0, 0.0)] == 'stable node'
+    assert kinds[(0.0, 0.895, 0.105)] == 'saddle'
+    ends = {(tuple(np.round(curve[0], 3)), tuple(np.round(curve[-1], 3))) for curve, _ in result['boundaries']}
+    assert ((1.0, 0.0, 0.0), (0.0, 0.895, 0.105)) in ends
+
+
+def test_map_cache_is_keyed_on_parameters(ideal_map):
+    first, cache_dir = ideal_map
+    again = residue_curve_map(GammaPhiModel(VaporPressureEngine(VAPOR_PRESSURE.coeffs, VAPOR_PRESSURE.component_ids)),
+                              P_ATM, n_divisions=4, cache_dir=str(cache_dir))
+    assert again['stats']['cached'] and again['stats']['cache_path'] == first['stats']['cache_path']
+    np.testing.assert_array_equal(again['curves'], first['curves'])
+    assert _kinds(again) == _kinds(first)
+
+    # same components and property method, different numbers
+    assert _parameter_hash(GammaPhiModel(VAPOR_PRESSURE, _wilson())) == _parameter_hash(GammaPhiModel(VAPOR_PRESSURE, _wilson()))
+    assert _parameter_hash(GammaPhiModel(VAPOR_PRESSURE, _wilson())) != _parameter_hash(GammaPhiModel(VAPOR_PRESSURE, _wilson(0.2)))
+    shifted = VaporPressureEngine(VAPOR_PRESSURE.coeffs + [[0.01] + [0.0] * 8] * 3, VAPOR_PRESSURE.component_ids)
+    assert _parameter_hash(GammaPhiModel(shifted)) != _parameter_hash(GammaPhiModel(VAPOR_PRESSURE))
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from result_cache import PARAMETER_SOURCE, ResultCache, cached_bubble_point, plain_values, result_key
+
+COMPONENTS = ['64-19-7', '7732-18-5']
+
+
+def test_result_key_is_canonical():
+    key = result_key(COMPONENTS, 'WILS-HOC', parameters={'a': 1, 'b': [0.5, 2]}, streams={'FEED': {'T': 350}})
+    assert key == result_key([' 64-19-7', '7732-18-5'], 'wils-hoc ', parameters={'b': (np.float64(0.5), 2.0), 'a': 1.0},
+                             streams={'FEED': {'T': 350.0000000000001}})
+    assert key != result_key(COMPONENTS[::-1], 'WILS-HOC', parameters={'a': 1, 'b': [0.5, 2]}, streams={'FEED': {'T': 350}})
+    assert key != result_key(COMPONENTS, 'WILS-HOC', parameters={'a': 1, 'b': [0.5, 2]}, streams={'FEED': {'T': 350.001}})
+    assert key != result_key(COMPONENTS, 'WILS-HOC', parameters={'a': 1, 'b': [0.5, 2], 'source': PARAMETER_SOURCE},
+                             streams={'FEED': {'T': 350}})
+
+
+def test_plain_values():
+    node = SimpleNamespace(value=np.float64(1.5))
+    params = {'WATER': [node, SimpleNamespace(value=(1, 2))], 'ACETIC-ACID': SimpleNamespace(c1=np.int64(3), _handle=object())}
+    assert plain_values(params) == {'WATER': [1.5, [1, 2]], 'ACETIC-ACID': {'c1': 3}}
+    assert plain_values(np.arange(3)) == [0, 1, 2] and plain_values('PLXANT') == 'PLXANT'
+    # the same numbers behind different handle objects give the same key
+    other = {'WATER': [SimpleNamespace(value=1.5), SimpleNamespace(value=[1, 2])], 'ACETIC-ACID': SimpleNamespace(c1=3)}
+    assert result_key(COMPONENTS, 'WILS-HOC', plain_values(params)) == result_key(COMPONENTS, 'WILS-HOC', plain_values(other))
+
+
+def test_lru_eviction_and_hit_rate(tmp_path):
+    with ResultCache(str(tmp_path / 'results.sqlite'), max_entries=2) as cache:
+        cache.put('a', 1)
+        cache.put('b', {'p': [1.0, 2.0]})
+        assert cache.get('a') == 1
+        # 'b' is now the least recently used entry
+        cache.put('c', 3)
+        assert 'b' not in cache and 'a' in cache and 'c' in cache
+        assert cache.get('b', 'missing') == 'missing'
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 1, 1, 2)
+        assert stats['hit_rate'] == 0.5
+
+
+def test_size_eviction(tmp_path):
+    with ResultCache(str(tmp_path / 'results.sqlite'), max_bytes=2500) as cache:
+        for key in 'abc':
+            cache.put(key, b'x' * 1000)
+        assert cache.stats()['entries'] == 2 and 'a' not in cache
+        assert cache.stats()['bytes'] <= 2500
+
+
+def test_entries_persist(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    with ResultCache(path) as cache:
+        cache.put('a', np.array([1.0, 2.0]))
+    with ResultCache(path) as cache:
+        np.testing.assert_array_equal(cache.get('a'), [1.0, 2.0])
+        cache.clear()
+        assert 'a' not in cache
+
+
+def test_cached_bubble_point_skips_failures(tmp_path):
+    calls = []
+
+    def compute(result):
+        def run():
+            calls.append(result)
+            return result
+        return run
+
+    with ResultCache(str(tmp_path / 'results.sqlite')) as cache:
+        args = (COMPONENTS, 'WILS-HOC', {'source': PARAMETER_SOURCE}, [0.6, 0.4])
+        assert cached_bubble_point(cache, *args, 80.0, compute((None, None))) == (None, None)
+        assert cached_bubble_point(cache, *args, 80.0, compute((355.0, [0.3, 0.7]))) == (355.0, [0.3, 0.7])
+        assert cached_bubble_point(cache, *args, 80.0, compute((0.0, [0.0, 0.0]))) == (355.0, [0.3, 0.7])
+        assert len(calls) == 2 and cache.stats()['hits'] == 1
+    assert cached_bubble_point(None, *args, 80.0, compute((1.0, [1.0, 0.0]))) == (1.0, [1.0, 0.0])
@@ -0,0 +1,61 @@
+import functools
+import math
+
+import numpy as np
+import pytest
+
+from aspen_pool import FakeApp
+from sweep_runner import case_grid, run_sweep
+
+FEED_T = r'\Data\Streams\FEED\Input\Temperature'
+RESULT_P = r'\Data\Results\Blocks\FLASH1\Output\Pressure'
+
+
+def _expected(temp):
+    # Clausius-Clapeyron-like pressure for the feed temperature
+    return math.exp(20.0 - 4000.0 / temp)
+
+
+def _flash_solver(values):
+    return {RESULT_P: _expected(values.get('Data\\Streams\\FEED\\Input\\Temperature'))}
+
+
+def _configure(sim):
+    sim.getNode(r'\Data\Blocks\FLASH1\Input\Block Type').value = 'FLASH2'
+
+
+def _run_case(sim, case):
+    if case.get('poison') == 'always' or (case.get('poison') == 'warm' and sim.runs > 0):
+        raise RuntimeError('flash did not converge')
+    sim.getNode(FEED_T).value = case['temperature']
+    sim.run()
+    return sim.getNode(RESULT_P).value
+
+
+def test_case_grid():
+    assert case_grid(a=[1, 2], b='xy') == [{'a': 1, 'b': 'x'}, {'a': 1, 'b': 'y'}, {'a': 2, 'b': 'x'}, {'a': 2, 'b': 'y'}]
+
+
+def test_run_sweep_fake_app():
+    cases = case_grid(temperature=np.linspace(300.0, 400.0, 6))
+    app_factory = functools.partial(FakeApp, solver=_flash_solver)
+    seen = []
+    records, stats = run_sweep(cases, _run_case, configure=_configure, app_factory=app_factory, workers=2,
+                               on_result=seen.append, verbose=False)
+    assert stats['cases'] == len(cases) and stats['failed'] == 0 and stats['retries'] == 0
+    assert [record['index'] for record in records] == list(range(len(cases)))
+    assert len(seen) == len(cases) and sum(worker['cases'] for worker in stats['workers'].values()) == len(cases)
+    for record in records:
+        assert record['error'] is None and record['attempt'] == 0
+        assert record['result'] == pytest.approx(_expected(record['case']['temperature']))
+
+
+def test_failed_case_is_retried_on_a_fresh_instance():
+    # one worker runs the cases in order, so the poisoned cases land on an instance that has run
+    cases = [{'temperature': 320.0}, {'temperature': 340.0, 'poison': 'warm'}, {'temperature': 360.0, 'poison': 'always'}]
+    records, stats = run_sweep(cases, _run_case, configure=_configure, app_factory=functools.partial(FakeApp, solver=_flash_solver),
+                               workers=1, max_retries=1, verbose=False)
+    assert stats['retries'] == 2 and stats['failed'] == 1
+    assert records[1]['error'] is None and records[1]['attempt'] == 1
+    assert records[1]['result'] == pytest.approx(_expected(340.0))
+    assert records[2]['error'] == 'RuntimeError: flash did not converge' and records[2]['attempt'] == 1
@@ -0,0 +1,72 @@
+import os
+from types import SimpleNamespace
+
+from tree_crawler import crawl_tree, iter_tree, load_records, read_snapshot, write_legacy_text
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_TREE = os.path.join(HERE, 'aspen_data_tree.txt')
+
+
+class _BrokenNode:
+    name = 'Broken'
+
+    @property
+    def children(self):
+        raise RuntimeError('COM call failed')
+
+
+def _node(name, *children, status=2097282):
+    return SimpleNamespace(name=name, comp_status=SimpleNamespace(value=status), children=list(children))
+
+
+class _Sim:
+
+    def __init__(self):
+        self.root = _node('Data',
+                          _node('Setup', _node('Main'), _node('Global', status=2097666)),
+                          _node('Components', _node('Specifications', _BrokenNode())),
+                          _node('Streams', _node('FEED', _node('Input'))))
+
+    def getNode(self, path):
+        if path != r'\Data':
+            raise KeyError(path)
+        return self.root
+
+
+def test_iter_tree_pre_order_and_errors():
+    records = list(iter_tree(_Sim()))
+    assert [record['path'] for record in records] == [
+        r'\Data\Setup', r'\Data\Setup\Main', r'\Data\Setup\Global', r'\Data\Components',
+        r'\Data\Components\Specifications', r'\Data\Components\Specifications\?', r'\Data\Streams',
+        r'\Data\Streams\FEED', r'\Data\Streams\FEED\Input']
+    assert records[2]['comp_status'] == 2097666 and records[2]['depth'] == 2 and records[0]['n_children'] == 2
+    assert records[5]['error'] == 'RuntimeError: COM call failed' and records[5]['depth'] == 3
+
+
+def test_iter_tree_roots_depth_and_exclude():
+    records = list(iter_tree(_Sim(), roots=['Data', r'\Missing'], max_depth=1, exclude=[r'\Data\Comp*'],
+                             include_roots=True))
+    assert [record['path'] for record in records] == [r'\Data', r'\Data\Setup', r'\Data\Streams', r'\Missing']
+    assert records[0]['depth'] == 0 and records[0]['n_children'] == 3
+    assert records[-1]['error'].startswith('KeyError')
+
+
+def test_crawl_tree_round_trips(tmp_path):
+    out_path, legacy_path = str(tmp_path / 'tree.jsonl'), str(tmp_path / 'tree.txt')
+    stats = crawl_tree(_Sim(), out_path, legacy_text_path=legacy_path)
+    assert stats['nodes'] == 8 and stats['errors'] == 1
+    assert list(load_records(out_path)) == list(read_snapshot(out_path)) == list(iter_tree(_Sim()))
+    with open(legacy_path, encoding='utf-8') as f:
+        assert f.readline() == 'Data.Setup - comp status 2097282\n'
+    legacy = list(load_records(legacy_path))
+    assert len(legacy) == 8 and legacy[2]['path'] == r'\Data\Setup\Global' and legacy[2]['comp_status'] == 2097666
+
+
+def test_legacy_snapshot(tmp_path):
+    records = list(load_records(DATA_TREE))
+    assert records[0] == {'path': r'\Data\Setup', 'name': 'Setup', 'depth': 1, 'comp_status': 2097282, 'n_children': None}
+    assert len(records) == 171 and all(record['path'].startswith('\\Data\\') for record in records)
+    out_path = str(tmp_path / 'copy.txt')
+    write_legacy_text(records, out_path)
+    with open(DATA_TREE, encoding='utf-8') as original, open(out_path, encoding='utf-8') as copy:
+        assert copy.read().splitlines() == [line for line in original.read().splitlines() if line.strip()]
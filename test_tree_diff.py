@@ -0,0 +1,61 @@
+import json
+import os
+
+from tree_diff import diff_snapshots, iter_diff, iter_sorted, print_diff
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_TREE = os.path.join(HERE, 'aspen_data_tree.txt')
+HOAC_TREE = os.path.join(HERE, 'hoac_h2o_aspen_data_tree.txt')
+
+
+def _snapshot(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps({'path': p, 'comp_status': status}) + '\n' for p, status in records)
+    return str(path)
+
+
+def test_iter_sorted_is_segment_wise_and_spills(tmp_path):
+    snapshot = _snapshot(tmp_path / 'tree.jsonl', [(r'\Data\Setup-Extra', 1), (r'\Data\Setup\Main', 2), (r'\Data\Setup', 3),
+                                                   (r'\Data\Setup\Main', 2), (r'\Data\Blocks', None)])
+    expected = [r'\Data\Blocks', r'\Data\Setup', r'\Data\Setup\Main', r'\Data\Setup-Extra']
+    assert [path for _, path, _ in iter_sorted(snapshot)] == expected
+    runs = tmp_path / 'runs'
+    runs.mkdir()
+    assert [path for _, path, _ in iter_sorted(snapshot, run_size=2, tmp_dir=str(runs))] == expected
+    assert list(runs.iterdir()) == []
+
+
+def test_iter_diff(tmp_path):
+    old = _snapshot(tmp_path / 'old.jsonl', [(r'\Data\A', 1), (r'\Data\A\X', 1), (r'\Data\B', 1)])
+    new = _snapshot(tmp_path / 'new.jsonl', [(r'\Data\B', 2), (r'\Data\C', 1), (r'\Data\A', 1)])
+    assert list(iter_diff(old, new)) == [
+        {'change': 'removed', 'path': r'\Data\A\X', 'old_status': 1, 'new_status': None},
+        {'change': 'status', 'path': r'\Data\B', 'old_status': 1, 'new_status': 2},
+        {'change': 'added', 'path': r'\Data\C', 'old_status': None, 'new_status': 1}]
+    assert list(iter_diff(old, old)) == []
+
+
+def test_diff_snapshots(tmp_path, capsys):
+    summary = diff_snapshots(DATA_TREE, HOAC_TREE)
+    assert (summary['added'], summary['removed'], summary['status_changed']) == (10, 89, 19)
+    groups = summary['groups']
+    # a removed subtree is listed once, at its top node
+    assert groups[r'\Data\Convergence']['removed'] == 8
+    assert [(c['path'], c['subtree_nodes']) for c in groups[r'\Data\Convergence']['changes']] == [(r'\Data\Convergence', 8)]
+    assert groups[r'\Data\Setup']['added'] == 1 and groups[r'\Data\Setup']['removed'] == 24
+    components = groups[r'\Data\Components']['changes']
+    assert {'change': 'status', 'path': r'\Data\Components\Specifications', 'old_status': 2097218,
+            'new_status': 2097282} in components
+    properties = groups[r'\Data\Properties']
+    assert (properties['added'], properties['removed'], properties['status_changed']) == (9, 1, 15)
+    assert properties['truncated'] and len(properties['changes']) == 20
+
+    spilled = diff_snapshots(DATA_TREE, HOAC_TREE, run_size=16, tmp_dir=str(tmp_path))
+    assert spilled['groups'] == groups and list(tmp_path.iterdir()) == []
+    coarse = diff_snapshots(DATA_TREE, HOAC_TREE, group_depth=1, max_paths=3)
+    assert list(coarse['groups']) == [r'\Data'] and len(coarse['groups'][r'\Data']['changes']) == 3
+
+    print_diff(summary)
+    out = capsys.readouterr().out
+    assert '10 added, 89 removed, 19 status changes' in out
+    assert r'- \Data\Convergence (+7 below)' in out and r'+ \Data\Setup\Units-Sets\METCBAR' in out
@@ -0,0 +1,127 @@
+import os
+import shutil
+
+import pytest
+
+from tree_crawler import crawl_tree, split_path
+from tree_index import PathIndex
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_TREE = os.path.join(HERE, 'aspen_data_tree.txt')
+BINARY = r'\Data\Properties\Parameters\Binary Interaction'
+
+
+@pytest.fixture(scope='module')
+def index():
+    return PathIndex.from_snapshot(DATA_TREE)
+
+
+def test_glob(index):
+    assert index.glob(BINARY + r'\*-1') == [BINARY + '\\' + name for name in
+                                            ['ANDKIJ-1', 'ANDMIJ-1', 'MLQKIJ-1', 'MUKIJ-1', 'MULIJ-1', 'RKTKIJ-1']]
+    assert index.glob(r'\data\properties\parameters\binary interaction\mu*') == [BINARY + r'\MUKIJ-1', BINARY + r'\MULIJ-1']
+    # '**' reaches every depth, and each path comes back once
+    every = index.glob(r'\Data\**\*KIJ-1')
+    assert every == [BINARY + r'\ANDKIJ-1', BINARY + r'\MLQKIJ-1', BINARY + r'\MUKIJ-1', BINARY + r'\RKTKIJ-1']
+    assert len(index.glob(r'\**')) == len(index) == 171
+    assert index.glob(BINARY + r'\*', limit=2) == [BINARY + r'\ANDKIJ-1', BINARY + r'\ANDMIJ-1']
+    # the legacy dump stops at the Specifications nodes
+    assert index.glob(r'\Data\Components\Specifications\*\*') == []
+    assert index.glob(r'\Data\Properties\Specifications\*\*') == []
+
+
+def test_prefix_and_children(index):
+    properties = index.prefix(r'\Data\Prop')
+    assert properties[:3] == [r'\Data\Properties', r'\Data\Properties\Specifications', r'\Data\Properties\Property Methods']
+    assert all(path.startswith(r'\Data\Properties') for path in properties)
+    assert index.prefix(r'\Data\Properties' + '\\') == properties[1:]
+    assert index.prefix(BINARY + r'\MU') == [BINARY + r'\MUKIJ-1', BINARY + r'\MULIJ-1']
+    assert index.prefix(r'\Data\Nothing') == [] and index.prefix(r'\Data\Prop', limit=1) == [r'\Data\Properties']
+    assert index.children(r'\Data\Properties\Estimation') == [r'\Data\Properties\Estimation\Estimate',
+                                                              r'\Data\Properties\Estimation\Compare']
+    assert r'\DATA\SETUP\MAIN' in index and index.path(r'\data\setup\main') == r'\Data\Setup\Main'
+
+
+def test_search_and_resolve(index):
+    assert index.search('binary interaction')[0] == BINARY
+    assert index.resolve('Binary Interaction') == BINARY
+    assert index.resolve('MUKIJ-1') == BINARY + r'\MUKIJ-1'
+    assert index.resolve('Estimatoin') == r'\Data\Properties\Estimation'
+    assert index.fuzzy('zzzzqqq') == [] and index.resolve('zzzzqqq') is None
+
+
+def test_load_reuses_the_cache(tmp_path):
+    snapshot = str(tmp_path / 'tree.txt')
+    shutil.copy(DATA_TREE, snapshot)
+    first = PathIndex.load(snapshot)
+    assert os.path.exists(str(tmp_path / 'tree.pidx'))
+    again = PathIndex.load(snapshot)
+    assert again.paths == first.paths and again.glob(BINARY + r'\*') == first.glob(BINARY + r'\*')
+    with open(snapshot, 'a', encoding='utf-8') as f:
+        f.write('Data.Setup.Extra - comp status 2097282\n')
+    assert r'\Data\Setup\Extra' in PathIndex.load(snapshot)
+
+
+class _Node:
+
+    def __init__(self, name, *children):
+        self.name = name
+        self.children = list(children)
+        self.value = None
+
+    def hasChildren(self):
+        return len(self.children) > 0
+
+
+class _Sim:
+
+    def __init__(self):
+        self.root = _Node('Data',
+                          _Node('Components', _Node('Specifications',
+                                                    _Node('Input', _Node('CASN', _Node('ACETIC-ACID'), _Node('WATER')),
+                                                          _Node('TYPE')))),
+                          _Node('Properties', _Node('Specifications',
+                                                    _Node('Input', _Node('GOPSETNAME'), _Node('METHOD'),
+                                                          _Node('PROP-DATA')))))
+
+    def getNode(self, path):
+        node = self.root
+        for name in split_path(path)[1:]:
+            node = next(child for child in node.children if child.name == name)
+        return node
+
+    def values(self):
+        values, stack = {}, [(self.root, '')]
+        while stack:
+            node, parent = stack.pop()
+            path = f'{parent}\\{node.name}'
+            values[path] = node.value
+            stack.extend((child, path) for child in node.children)
+        return values
+
+
+def _configured(tree_index):
+    aspen_testing_3 = pytest.importorskip('aspen_testing_3')
+    sim = _Sim()
+    calculator = aspen_testing_3.AspenVLECalculator(tree_index=tree_index)
+    calculator._add_components(sim)
+    calculator._set_property_method(sim)
+    return sim.values()
+
+
+def test_indexed_lookup_matches_the_live_walk(tmp_path):
+    pytest.importorskip('emnengr.aspen.com')
+    snapshot = str(tmp_path / 'flowsheet.jsonl')
+    crawl_tree(_Sim(), snapshot)
+    live = _configured(None)
+    assert live[r'\Data\Components\Specifications\Input\CASN\ACETIC-ACID'] == '64-19-7'
+    assert live[r'\Data\Properties\Specifications\Input\METHOD'] == 'WILS-HOC'
+    assert live[r'\Data\Properties\Specifications\Input\PROP-DATA'] == 'WILS-HOC'
+    assert live[r'\Data\Properties\Specifications\Input\GOPSETNAME'] is None
+    indexed = PathIndex.from_snapshot(snapshot)
+    calculator = pytest.importorskip('aspen_testing_3').AspenVLECalculator(tree_index=indexed)
+    nodes = calculator._indexed_nodes(_Sim(), r'\Data\Properties\Specifications', lambda name: 'PROP' in name.upper())
+    assert [node.name for node in nodes] == ['PROP-DATA']
+    assert _configured(indexed) == live
+    # nothing below Specifications in the legacy dump, so the live walk takes over
+    assert _configured(PathIndex.from_snapshot(DATA_TREE)) == live
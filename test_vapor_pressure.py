@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import vapor_pressure
+from vapor_pressure import (VaporPressureEngine, antoine_mmhg_celsius_coeffs, coeffs_from_tdep_set, dippr101_coeffs,
+                            load_vapor_pressure_engine, plxant_coeffs)
+
+# water: log10 P[mmHg] = 8.07131 - 1730.63 / (T[C] + 233.426)
+WATER_ANTOINE = (8.07131, 1730.63, 233.426)
+# water, DIPPR 101 in K and Pa
+WATER_DIPPR = (73.649, -7258.2, -7.3037, 4.1653e-6, 2.0)
+
+
+def _tdep(equation, *c, **fields):
+    values = {f'C{k + 1}': value for k, value in enumerate(c)}
+    return SimpleNamespace(Equation=equation, **values, **fields)
+
+
+def test_conversions_agree_at_the_normal_boiling_point():
+    antoine = VaporPressureEngine(antoine_mmhg_celsius_coeffs(*WATER_ANTOINE))
+    dippr = VaporPressureEngine(dippr101_coeffs(*WATER_DIPPR))
+    np.testing.assert_allclose(antoine.psat([373.15]), [[101325.0]], rtol=2e-3)
+    np.testing.assert_allclose(dippr.psat([373.15]), [[101325.0]], rtol=2e-3)
+    np.testing.assert_allclose(antoine.ln_psat([300.0, 350.0]), dippr.ln_psat([300.0, 350.0]), atol=0.01)
+
+
+def test_coeffs_from_tdep_set():
+    dippr = _tdep('dippr 101', *WATER_DIPPR, 273.16, 647.1)
+    np.testing.assert_allclose(coeffs_from_tdep_set(dippr), dippr101_coeffs(*WATER_DIPPR, t_min=273.16, t_max=647.1))
+    antoine = _tdep('ANTOINE', *WATER_ANTOINE, Tmin=274.0, Tmax=373.0)
+    np.testing.assert_allclose(coeffs_from_tdep_set(antoine), antoine_mmhg_celsius_coeffs(*WATER_ANTOINE, 274.0, 373.0))
+    # a zero Tmax means no upper limit
+    assert coeffs_from_tdep_set(_tdep('EXTANTOINE', 70.0, -7000.0, 0, 0, -7.0, 0, 0, 200.0, 0.0))[8] == np.inf
+    assert coeffs_from_tdep_set(_tdep('WAGNER101', -7.8, 1.8, -2.6, -1.1)) is None
+
+
+def test_engine_mixes_equations():
+    engine = VaporPressureEngine([antoine_mmhg_celsius_coeffs(*WATER_ANTOINE, 274.0, 373.0),
+                                  plxant_coeffs(*WATER_DIPPR[:2], 0.0, 0.0, *WATER_DIPPR[2:])],
+                                 component_ids=[12, 13])
+    psat = engine.psat([330.0, 380.0])
+    assert psat.shape == (2, 2)
+    np.testing.assert_allclose(psat[:, 0], psat[:, 1], rtol=0.02)
+    assert engine.in_range([330.0, 380.0]).tolist() == [[True, True], [False, True]]
+    np.testing.assert_allclose(engine.subset([13]).psat([330.0])[0, 0], psat[0, 1])
+    with pytest.raises(ValueError):
+        VaporPressureEngine(np.zeros((2, 5)))
+
+
+@pytest.fixture
+def fake_tdep_sets(monkeypatch):
+    pytest.importorskip('emnengr.apex.emnphysprop2')
+    from emnengr.apex import emnphysprop2
+
+    sets_of = {}
+    calls = []
+
+    def from_id(chem_id, session):
+        calls.append(chem_id)
+        if chem_id not in sets_of:
+            raise ConnectionError('server went away')
+        return SimpleNamespace(getTDepCoeffSets=lambda props, session: sets_of[chem_id])
+
+    monkeypatch.setattr(emnphysprop2.ChemInfo, 'from_id', staticmethod(from_id), raising=False)
+    monkeypatch.setattr(vapor_pressure, '_vp_coeff_cache', {})
+    return sets_of, calls
+
+
+def test_load_ranks_aliases_and_keys_on_preference(fake_tdep_sets):
+    sets_of, calls = fake_tdep_sets
+    sets_of[12] = [_tdep('ANTOINE', *WATER_ANTOINE), _tdep('DIPPR', *WATER_DIPPR), _tdep('WAGNER101', 1.0)]
+    sets_of[13] = [_tdep('EXTANTOINE', 70.0, -7000.0, 0, 0, -7.0)]
+    engine = load_vapor_pressure_engine([12, 13, 12], session=object())
+    np.testing.assert_allclose(engine.coeffs[0], dippr101_coeffs(*WATER_DIPPR))
+    np.testing.assert_allclose(engine.coeffs[2], engine.coeffs[0])
+    assert engine.coeffs[1][0] == 70.0 and calls == [12, 13]
+
+    # a different preference is a different cache entry, and aliases are accepted there too
+    engine = load_vapor_pressure_engine([12], session=object(), preferred_equations=('antoine', 'dippr-101'))
+    np.testing.assert_allclose(engine.coeffs[0], antoine_mmhg_celsius_coeffs(*WATER_ANTOINE))
+    load_vapor_pressure_engine([12, 13], session=object())
+    assert calls == [12, 13, 12]
+
+
+def test_load_does_not_cache_failures(fake_tdep_sets):
+    sets_of, calls = fake_tdep_sets
+    engine = load_vapor_pressure_engine([14], session=object())
+    assert np.isnan(engine.coeffs).all()
+    sets_of[14] = [_tdep('DIPPR101', *WATER_DIPPR)]
+    engine = load_vapor_pressure_engine([14], session=object())
+    np.testing.assert_allclose(engine.coeffs[0], dippr101_coeffs(*WATER_DIPPR))
+    assert calls == [14, 14]
@@ -0,0 +1,95 @@
+import numpy as np
+
+from hoc import HOCModel
+from vapor_pressure import VaporPressureEngine, antoine_mmhg_celsius_coeffs
+from vle_solver import (GammaPhiModel, bubble_pressure, bubble_temperature, dew_pressure, dew_temperature,
+                        rachford_rice, tp_flash)
+from wilson import WilsonModel
+
+P_ATM = 101325.0
+# acetic acid, water
+VAPOR_PRESSURE = VaporPressureEngine([antoine_mmhg_celsius_coeffs(7.38782, 1533.313, 222.309),
+                                      antoine_mmhg_celsius_coeffs(8.07131, 1730.63, 233.426)])
+WILSON = WilsonModel([[0.0, 0.2], [-0.3, 0.0]], [[0.0, -150.0], [-400.0, 0.0]])
+HOC = HOCModel([591.95, 647.096], [57.86e5, 220.64e5], [2.595, 0.615], [1.74, 1.85], eta=[[4.5, 2.5], [2.5, 1.7]])
+MODEL = GammaPhiModel(VAPOR_PRESSURE, WILSON, HOC)
+
+
+def _binary(x1):
+    x1 = np.asarray(x1, dtype=float)
+    return np.column_stack([x1, 1.0 - x1])
+
+
+def test_ideal_bubble_pressure_is_raoult():
+    x = _binary([0.0, 0.3, 1.0])
+    result = bubble_pressure(GammaPhiModel(VAPOR_PRESSURE), 370.0, x)
+    psat = VAPOR_PRESSURE.psat([370.0])[0]
+    np.testing.assert_allclose(result['pressure_pa'], x @ psat)
+    np.testing.assert_allclose(result['y'], x * psat / result['pressure_pa'][:, None])
+    assert result['converged'].all()
+
+
+def test_bubble_and_dew_are_consistent():
+    x = _binary(np.linspace(0.0, 1.0, 11))
+    bubble = bubble_temperature(MODEL, P_ATM, x)
+    assert bubble['converged'].all()
+    np.testing.assert_allclose(bubble['temperature_k'][[0, -1]], [373.15, 391.05], atol=0.1)
+    np.testing.assert_allclose(bubble['y'].sum(axis=1), 1.0)
+
+    # the bubble pressure at the bubble temperature is the pressure we started from
+    back = bubble_pressure(MODEL, bubble['temperature_k'], x)
+    np.testing.assert_allclose(back['pressure_pa'], P_ATM, rtol=1e-8)
+    # bubble_pressure stops on P, so its phi loop leaves y slightly less settled
+    np.testing.assert_allclose(back['y'], bubble['y'], atol=1e-5)
+
+    # the incipient vapor dews at the same point
+    dew = dew_temperature(MODEL, P_ATM, bubble['y'])
+    assert dew['converged'].all()
+    np.testing.assert_allclose(dew['temperature_k'], bubble['temperature_k'], atol=1e-6)
+    np.testing.assert_allclose(dew['x'], x, atol=1e-7)
+    dew = dew_pressure(MODEL, bubble['temperature_k'], bubble['y'])
+    assert dew['converged'].all()
+    np.testing.assert_allclose(dew['pressure_pa'], P_ATM, rtol=1e-7)
+
+
+def test_bubble_temperature_keeps_converged_roots():
+    # the safeguard used to swap a root for a bisection midpoint and return NaN (x_HOAc = 0.004 here)
+    x1 = np.concatenate([[0.004], np.linspace(0.09, 0.12, 301), np.random.default_rng(0).uniform(0.0, 1.0, 500)])
+    result = bubble_temperature(MODEL, P_ATM, _binary(x1))
+    assert result['converged'].all() and np.isfinite(result['temperature_k']).all()
+    assert result['iterations'].max() <= 10
+
+
+def test_bubble_temperature_outside_bounds_is_nan():
+    result = bubble_temperature(MODEL, P_ATM, _binary([0.5]), t_bounds=(200.0, 300.0))
+    assert not result['converged'][0] and np.isnan(result['temperature_k'][0])
+
+
+def test_rachford_rice_extreme_k():
+    z = np.array([[0.5, 0.5, 0.0], [0.3, 0.4, 0.3], [1.0 - 1e-6, 1e-6, 0.0]])
+    k = np.array([[1e6, 1e-6, 1.0], [1e12, 0.5, 1e-10], [0.9999, 1e8, 1.0]])
+    beta, converged = rachford_rice(z, k)
+    assert converged.all()
+    residual = (z * (k - 1.0) / (1.0 + beta[:, None] * (k - 1.0))).sum(axis=1)
+    np.testing.assert_allclose(residual, 0.0, atol=1e-10)
+    np.testing.assert_allclose(beta[0], 0.5, atol=1e-5)
+
+    beta, converged = rachford_rice([[0.5, 0.5], [0.5, 0.5]], [[2.0, 3.0], [0.1, 1.0]])
+    assert beta.tolist() == [np.inf, -np.inf] and converged.all()
+
+
+def test_tp_flash_between_bubble_and_dew():
+    z = _binary([0.4])
+    t_bubble = bubble_temperature(MODEL, P_ATM, z)['temperature_k'][0]
+    t_dew = dew_temperature(MODEL, P_ATM, z)['temperature_k'][0]
+    assert t_bubble < t_dew
+    flash = tp_flash(MODEL, [t_bubble - 1.0, 0.5 * (t_bubble + t_dew), t_dew + 1.0], P_ATM, np.repeat(z, 3, axis=0))
+    assert flash['converged'].all()
+    assert flash['two_phase'].tolist() == [False, True, False]
+    assert flash['beta'][0] == 0.0 and flash['beta'][2] == 1.0
+    beta = flash['beta'][1]
+    np.testing.assert_allclose((1.0 - beta) * flash['x'][1] + beta * flash['y'][1], z[0], atol=1e-8)
+    # the split phases are in equilibrium
+    bubble = bubble_pressure(MODEL, flash['temperature_k'][1], flash['x'][1])
+    np.testing.assert_allclose(bubble['pressure_pa'], P_ATM, rtol=1e-4)
+    np.testing.assert_allclose(bubble['y'][0], flash['y'][1], atol=1e-4)
@@ -0,0 +1,75 @@
+import functools
+import math
+
+import pytest
+
+from aspen_pool import AspenSessionPool, FakeApp
+from node_cache import NodeCache
+from sweep_runner import case_grid
+from test_sweep_runner import _configure, _expected, _flash_solver, _run_case
+from warm_sweep import order_cases, run_warm_sweep
+
+
+class _WarmApp(FakeApp):
+    '''FakeApp that knows whether it holds a solution from an earlier run.'''
+
+    def __init__(self, **kwargs):
+        super().__init__(solver=_flash_solver, **kwargs)
+        self.warm = False
+
+    def reinitialize(self):
+        super().reinitialize()
+        self.warm = False
+
+    def run(self):
+        super().run()
+        self.warm = True
+
+
+def _run_stiff_case(sim, case):
+    # a stiff case only converges from a clean state; a broken one never does
+    if case.get('broken') or (case.get('stiff') and sim.warm):
+        return math.nan
+    return _run_case(sim, case)
+
+
+def test_order_cases():
+    cases = case_grid(pressure=[1.0, 2.0], temperature=[10.0, 20.0, 30.0])
+    assert order_cases(cases) == [0, 1, 2, 5, 4, 3]
+    assert order_cases(cases, method=None) == list(range(6))
+    scattered = [{'t': 0.0}, {'t': 0.9}, {'t': 0.1}, {'t': 0.5}]
+    assert order_cases(scattered, method='nearest') == [0, 2, 3, 1]
+    assert order_cases([]) == []
+    with pytest.raises(ValueError):
+        order_cases(cases, method='random')
+
+
+def test_warm_sweep_fake_app_node_cache():
+    cases = case_grid(temperature=[380.0, 300.0, 340.0])
+    with AspenSessionPool(size=1, app_factory=functools.partial(FakeApp, solver=_flash_solver),
+                          configure=_configure, node_cache=True) as pool:
+        with pool.session() as sim:
+            records, stats = run_warm_sweep(sim, cases, _run_case, iterations=lambda sim: sim.runs)
+            assert isinstance(sim, NodeCache)
+            assert sim.stats['hits'] > 0
+    assert stats['failed'] == 0 and stats['reinitializations'] == 1 and stats['warm_cases'] == 2
+    assert [record['result'] for record in records] == pytest.approx([_expected(case['temperature']) for case in cases])
+    # run in temperature order, reported in case order
+    assert [record['iterations'] for record in records] == [3, 1, 2]
+    assert [record['reinitialized'] for record in records] == [False, True, False]
+
+
+def test_warm_failure_is_retried_cold():
+    sim = _WarmApp()
+    cases = [{'temperature': 300.0}, {'temperature': 320.0, 'stiff': True}, {'temperature': 340.0, 'broken': True},
+             {'temperature': 360.0}]
+    records, stats = run_warm_sweep(sim, cases, _run_stiff_case, ordering=None)
+    assert [record['converged'] for record in records] == [True, True, False, True]
+    assert [record['retried_cold'] for record in records] == [False, True, True, False]
+    # the case after a failure starts cold
+    assert [record['reinitialized'] for record in records] == [True, False, False, True]
+    assert stats['cold_retries'] == 2 and stats['failed'] == 1 and stats['reinitializations'] == 4
+    assert sim.reinitializations == 4
+
+    records, stats = run_warm_sweep(_WarmApp(), cases[:2], _run_stiff_case, ordering=None, retry_cold=False)
+    assert not records[1]['converged'] and stats['cold_retries'] == 0
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from wilson import WilsonModel, wilson_from_apex
+
+# acetic acid / water style parameters: ln A_ij = a_ij + b_ij / T
+A = np.array([[0.0, 0.2], [-0.3, 0.0]])
+B = np.array([[0.0, -150.0], [-400.0, 0.0]])
+
+
+def _binary_ln_gammas(temp_k, x1):
+    # textbook binary Wilson with Lambda_12 = A_12(T), Lambda_21 = A_21(T)
+    l12 = np.exp(A[0, 1] + B[0, 1] / temp_k)
+    l21 = np.exp(A[1, 0] + B[1, 0] / temp_k)
+    x2 = 1.0 - x1
+    d = l12 / (x1 + l12 * x2) - l21 / (x2 + l21 * x1)
+    return np.stack([-np.log(x1 + l12 * x2) + x2 * d, -np.log(x2 + l21 * x1) - x1 * d], axis=-1)
+
+
+def test_binary_matches_closed_form():
+    model = WilsonModel(A, B)
+    x1 = np.linspace(0.05, 0.95, 7)
+    temps = np.linspace(320.0, 390.0, 7)
+    x = np.column_stack([x1, 1.0 - x1])
+    np.testing.assert_allclose(model.ln_gammas(temps, x), _binary_ln_gammas(temps, x1), rtol=1e-12)
+    np.testing.assert_allclose(model.ln_gammas(350.0, x), _binary_ln_gammas(350.0, x1), rtol=1e-12)
+
+
+def test_ideal_and_infinite_dilution():
+    np.testing.assert_allclose(WilsonModel(np.zeros((3, 3))).gammas(300.0, [[0.2, 0.3, 0.5]]), 1.0)
+    model = WilsonModel(A, B)
+    # a pure component has gamma 1
+    np.testing.assert_allclose(model.gammas(340.0, [[1.0, 0.0]])[0, 0], 1.0)
+    np.testing.assert_allclose(model.gammas(340.0, [[0.0, 1.0]])[0, 1], 1.0)
+
+
+def test_gibbs_duhem():
+    model = WilsonModel([[0.0, 0.1, -0.2], [0.3, 0.0, 0.05], [-0.1, 0.2, 0.0]],
+                        [[0.0, -100.0, 50.0], [-200.0, 0.0, 80.0], [120.0, -60.0, 0.0]])
+    x = np.array([0.2, 0.3, 0.5])
+    direction = np.array([1.0, -0.5, -0.5])
+    h = 1e-6
+    dln = (model.ln_gammas(330.0, x + h * direction) - model.ln_gammas(330.0, x - h * direction)) / (2 * h)
+    assert abs(float(dln[0] @ x)) < 1e-8
+
+
+def test_gammas_grid_and_range():
+    model = WilsonModel(A, B, t_lower=[[-np.inf, 300.0], [300.0, -np.inf]], t_upper=[[np.inf, 400.0], [400.0, np.inf]])
+    temps = np.array([310.0, 350.0, 420.0])
+    x = np.array([[0.3, 0.7], [0.6, 0.4]])
+    grid = model.gammas_grid(temps, x)
+    assert grid.shape == (3, 2, 2)
+    np.testing.assert_allclose(grid[1], model.gammas(350.0, x))
+    assert model.in_range(temps).tolist() == [True, True, False]
+
+
+def test_wilson_from_apex_orders_databanks_and_flags_missing():
+    sets = [SimpleNamespace(ID=1, DatabankID=7, ChemID_i=200, ChemID_j=100),
+            SimpleNamespace(ID=2, DatabankID=3, ChemID_i=100, ChemID_j=200)]
+    rows = {1: SimpleNamespace(A_ij=9.0, A_ji=9.0, B_ij=None, B_ji=None, Tlower=None, Tupper=None),
+            2: SimpleNamespace(A_ij=0.2, A_ji=-0.3, B_ij=-150.0, B_ji=-400.0, Tlower=280.0, Tupper=400.0)}
+    model, missing = wilson_from_apex([100, 200, 300], sets, rows, databank_order=[3, 7])
+    np.testing.assert_allclose(model.terms['a'][:2, :2], A)
+    np.testing.assert_allclose(model.terms['b'][:2, :2], B)
+    assert model.t_lower[0, 1] == 280.0 and model.t_upper[1, 0] == 400.0
+    assert missing.tolist() == [[False, False, True], [False, False, True], [True, True, False]]
+
+    # without a databank order the set listed first wins, in its own (i, j) direction
+    model, _ = wilson_from_apex([100, 200], sets, rows)
+    np.testing.assert_allclose(model.terms['a'], [[0.0, 9.0], [9.0, 0.0]])
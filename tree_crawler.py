@@ -0,0 +1,161 @@
+'''
+Iterative crawler for the Aspen Plus variable tree, with structured snapshots.
+
+The tree is walked depth-first with an explicit stack, in the same pre-order as the old
+recurse_that_node. Each node gets exactly one fetch each of name, comp_status and children,
+with no hasattr probes. A failure is recorded against that node's path instead of being
+swallowed. The walk can start at chosen subtrees (roots), stop at max_depth and skip subtrees
+matching exclude globs.
+
+Snapshots are JSON lines, one record per node:
+
+    {"path": "\\Data\\Setup\\Main", "name": "Main", "depth": 2, "comp_status": 2097282, "n_children": 0}
+
+with "error" set (and the other fields possibly null) when a node could not be read. Paths use
+backslashes, so they can be passed straight to sim.getNode. read_legacy_text parses the old
+"Data.Setup.Main - comp status 2097282" dumps (aspen_data_tree.txt) into the same records, and
+write_legacy_text still produces them.
+'''
+import json
+import os
+import time
+from fnmatch import fnmatchcase
+
+LEGACY_SEPARATOR = ' - comp status '
+
+
+def join_path(parent, name):
+    return f'{parent}\\{name}'
+
+
+def split_path(path):
+    return [part for part in str(path).split('\\') if part]
+
+
+def _fetch(node):
+    '''name, comp_status value and children of node, one attribute access each.'''
+    name = getattr(node, 'name', '')
+    comp_status = getattr(node, 'comp_status', None)
+    comp_status = getattr(comp_status, 'value', comp_status)
+    children = getattr(node, 'children', None)
+    return name, comp_status, list(children) if children is not None else []
+
+
+def _status_int(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def iter_tree(sim, roots=(r'\Data',), max_depth=None, exclude=(), include_roots=False):
+    '''
+    Yield one record per node below each root path (resolved with sim.getNode), depth-first in
+    pre-order. Depth counts from the root (its children are depth 1). max_depth stops the
+    descent; exclude is a list of fnmatch globs on backslash paths whose whole subtree is
+    skipped. include_roots also yields the root nodes themselves at depth 0.
+    '''
+    for root_path in roots:
+        root_path = '\\' + '\\'.join(split_path(root_path))
+        try:
+            root = sim.getNode(root_path)
+            _, root_status, root_children = _fetch(root)
+        except Exception as e:
+            yield {'path': root_path, 'name': split_path(root_path)[-1], 'depth': 0, 'comp_status': None,
+                   'n_children': None, 'error': f'{type(e).__name__}: {e}'}
+            continue
+        if include_roots:
+            yield {'path': root_path, 'name': split_path(root_path)[-1], 'depth': 0,
+                   'comp_status': _status_int(root_status), 'n_children': len(root_children)}
+        # reversed so children come off the stack in their natural order
+        stack = [(child, root_path, 1) for child in reversed(root_children)]
+        while stack:
+            node, parent_path, depth = stack.pop()
+            try:
+                name, comp_status, children = _fetch(node)
+            except Exception as e:
+                yield {'path': join_path(parent_path, '?'), 'name': None, 'depth': depth, 'comp_status': None,
+                       'n_children': None, 'error': f'{type(e).__name__}: {e}'}
+                continue
+            path = join_path(parent_path, name)
+            if any(fnmatchcase(path, pattern) for pattern in exclude):
+                continue
+            yield {'path': path, 'name': name, 'depth': depth, 'comp_status': _status_int(comp_status),
+                   'n_children': len(children)}
+            if max_depth is None or depth < max_depth:
+                stack.extend((child, path, depth + 1) for child in reversed(children))
+
+
+def write_snapshot(records, out_path):
+    '''Write records as JSON lines (atomically, via a temp file). Returns counts and timing.'''
+    start = time.perf_counter()
+    stats = {'nodes': 0, 'errors': 0}
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            stats['errors' if 'error' in record else 'nodes'] += 1
+    os.replace(tmp_path, out_path)
+    stats['elapsed_s'] = time.perf_counter() - start
+    stats['nodes_per_s'] = stats['nodes'] / stats['elapsed_s'] if stats['elapsed_s'] > 0 else float('inf')
+    return stats
+
+
+def crawl_tree(sim, out_path, roots=(r'\Data',), max_depth=None, exclude=(), legacy_text_path=None):
+    '''
+    Crawl sim and write a JSON-lines snapshot to out_path (and, optionally, the old flat text
+    format to legacy_text_path). Returns the write_snapshot stats.
+    '''
+    records = iter_tree(sim, roots=roots, max_depth=max_depth, exclude=exclude)
+    if legacy_text_path is None:
+        stats = write_snapshot(records, out_path)
+    else:
+        records = list(records)
+        stats = write_snapshot(records, out_path)
+        write_legacy_text(records, legacy_text_path)
+    print(f'crawled {stats["nodes"]} nodes ({stats["errors"]} errors) in {stats["elapsed_s"]:.2f} s -> {out_path}')
+    return stats
+
+
+def read_snapshot(path):
+    '''Yield the records of a JSON-lines snapshot.'''
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_legacy_text(path):
+    '''
+    Yield records from an old "Data.Setup.Main - comp status 2097282" dump. Dotted paths become
+    backslash paths, so names that themselves contain dots cannot be told apart.
+    '''
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            dotted, _, status = line.partition(LEGACY_SEPARATOR)
+            parts = [part for part in dotted.split('.') if part]
+            yield {'path': '\\' + '\\'.join(parts), 'name': parts[-1] if parts else '', 'depth': len(parts) - 1,
+                   'comp_status': _status_int(status.strip()), 'n_children': None}
+
+
+def load_records(path):
+    '''Records from either snapshot format, chosen by the first character of the file.'''
+    with open(path, encoding='utf-8') as f:
+        first = f.read(1)
+    return read_snapshot(path) if first == '{' else read_legacy_text(path)
+
+
+def write_legacy_text(records, out_path):
+    '''Write records in the old flat text format (error records are left out).'''
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            if 'error' in record:
+                continue
+            status = '' if record['comp_status'] is None else record['comp_status']
+            f.write(f"{'.'.join(split_path(record['path']))}{LEGACY_SEPARATOR}{status}\n")
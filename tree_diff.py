@@ -0,0 +1,167 @@
+'''
+Streaming structural diff between two Aspen variable-tree snapshots.
+
+Either snapshot format that tree_crawler reads works (JSON lines or the legacy text dump).
+Neither tree is loaded into a dict. Each snapshot is instead:
+- externally sorted by path, in runs of run_size records that spill to temporary files;
+- streamed back through a k-way merge.
+
+The two sorted streams are then merged side by side. Memory is bounded by run_size plus one
+record per run, whatever the size of the flowsheet. Paths are sorted segment-wise, so a subtree
+comes out contiguous, straight after its root. That lets an added or removed subtree be reported
+once, at its top node, and changes be tallied per subtree as they stream past.
+'''
+import heapq
+import os
+import tempfile
+import time
+
+from tree_crawler import _status_int, load_records, split_path
+
+_SEGMENT_SEPARATOR = '\x00'  # sorts below every printable character, so children follow their parent
+
+
+def _sort_key(path):
+    return _SEGMENT_SEPARATOR.join(split_path(path))
+
+
+def _write_run(run, tmp_dir):
+    run.sort()
+    fd, run_path = tempfile.mkstemp(prefix='tree_diff_', suffix='.run', dir=tmp_dir)
+    # tab-separated key, path, status: paths never contain tabs, and this is much cheaper than JSON
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.writelines(f'{key}\t{path}\t{"" if status is None else status}\n' for key, path, status in run)
+    return run_path
+
+
+def _read_run(run_path):
+    with open(run_path, encoding='utf-8') as f:
+        for line in f:
+            key, path, status = line.rstrip('\n').split('\t')
+            yield key, path, _status_int(status)
+
+
+def iter_sorted(snapshot_path, run_size=100000, tmp_dir=None):
+    '''
+    Yield (key, path, comp_status) for every readable record of a snapshot in segment-wise path
+    order. Records are sorted in runs of run_size; runs spill to tmp_dir and are merged back, so
+    at most run_size records are held at once. A path that occurs twice is yielded once.
+    '''
+    run, run_paths = [], []
+    try:
+        for record in load_records(snapshot_path):
+            if 'error' in record:
+                continue
+            run.append((_sort_key(record['path']), record['path'], record.get('comp_status')))
+            if len(run) >= run_size:
+                run_paths.append(_write_run(run, tmp_dir))
+                run = []
+        if len(run_paths) == 0:
+            # small enough to sort in memory
+            run.sort()
+            merged = iter(run)
+        else:
+            if run:
+                run_paths.append(_write_run(run, tmp_dir))
+                run = []
+            merged = heapq.merge(*(_read_run(run_path) for run_path in run_paths))
+        last_key = None
+        for item in merged:
+            if item[0] != last_key:
+                yield item
+                last_key = item[0]
+    finally:
+        for run_path in run_paths:
+            try:
+                os.remove(run_path)
+            except OSError:
+                pass
+
+
+def iter_diff(old_path, new_path, run_size=100000, tmp_dir=None):
+    '''
+    Yield one change per differing node, in path order: dicts with change ('added', 'removed'
+    or 'status'), path, old_status and new_status. Unchanged nodes yield nothing.
+    '''
+    end = object()
+    old_items = iter_sorted(old_path, run_size=run_size, tmp_dir=tmp_dir)
+    new_items = iter_sorted(new_path, run_size=run_size, tmp_dir=tmp_dir)
+    old = next(old_items, end)
+    new = next(new_items, end)
+    while old is not end or new is not end:
+        if new is end or (old is not end and old[0] < new[0]):
+            yield {'change': 'removed', 'path': old[1], 'old_status': old[2], 'new_status': None}
+            old = next(old_items, end)
+        elif old is end or new[0] < old[0]:
+            yield {'change': 'added', 'path': new[1], 'old_status': None, 'new_status': new[2]}
+            new = next(new_items, end)
+        else:
+            if old[2] != new[2]:
+                yield {'change': 'status', 'path': new[1], 'old_status': old[2], 'new_status': new[2]}
+            old = next(old_items, end)
+            new = next(new_items, end)
+
+
+def _subtree(path, group_depth):
+    return '\\' + '\\'.join(split_path(path)[:group_depth])
+
+
+def _keep(group, entry, max_paths):
+    if len(group['changes']) < max_paths:
+        group['changes'].append(entry)
+    else:
+        group['truncated'] = True
+
+
+def diff_snapshots(old_path, new_path, group_depth=2, max_paths=20, run_size=100000, tmp_dir=None):
+    '''
+    Summarize iter_diff grouped by the subtree at group_depth segments (\\Data\\Setup at the
+    default of 2). An added or removed subtree is listed once, at its top node, with the number
+    of nodes under it. Each group holds counts and up to max_paths example entries. Returns a
+    dict with totals, groups and elapsed_s.
+    '''
+    start = time.perf_counter()
+    summary = {'old': old_path, 'new': new_path, 'added': 0, 'removed': 0, 'status_changed': 0, 'groups': {}}
+    open_roots = {'added': None, 'removed': None}  # (key, entry) of the subtree currently being added/removed
+    for change in iter_diff(old_path, new_path, run_size=run_size, tmp_dir=tmp_dir):
+        kind = change['change']
+        summary['status_changed' if kind == 'status' else kind] += 1
+        group = summary['groups'].setdefault(_subtree(change['path'], group_depth),
+                                             {'added': 0, 'removed': 0, 'status_changed': 0, 'changes': [], 'truncated': False})
+        group['status_changed' if kind == 'status' else kind] += 1
+        if kind == 'status':
+            _keep(group, change, max_paths)
+            continue
+        key = _sort_key(change['path'])
+        root = open_roots[kind]
+        if root is not None and key.startswith(root[0] + _SEGMENT_SEPARATOR):
+            root[1]['subtree_nodes'] += 1
+            continue
+        entry = dict(change, subtree_nodes=1)
+        open_roots[kind] = (key, entry)
+        _keep(group, entry, max_paths)
+    summary['elapsed_s'] = time.perf_counter() - start
+    return summary
+
+
+def _status_text(status):
+    return '-' if status is None else str(status)
+
+
+def print_diff(summary):
+    print(f'{summary["old"]} -> {summary["new"]}: {summary["added"]} added, {summary["removed"]} removed, '
+          f'{summary["status_changed"]} status changes ({summary["elapsed_s"]:.3f} s)')
+    for subtree, group in sorted(summary['groups'].items()):
+        print(f'  {subtree}: +{group["added"]} -{group["removed"]} ~{group["status_changed"]}')
+        for change in group['changes']:
+            if change['change'] == 'status':
+                print(f'    ~ {change["path"]}: {_status_text(change["old_status"])} -> {_status_text(change["new_status"])}')
+            else:
+                below = f' (+{change["subtree_nodes"] - 1} below)' if change['subtree_nodes'] > 1 else ''
+                print(f'    {"+" if change["change"] == "added" else "-"} {change["path"]}{below}')
+        if group['truncated']:
+            print('    ...')
+
+
+if __name__ == '__main__':
+    print_diff(diff_snapshots('aspen_data_tree.txt', 'hoac_h2o_aspen_data_tree.txt'))
@@ -0,0 +1,223 @@
+'''
+Offline index over Aspen variable-tree snapshots, for resolving node paths without walking the
+live COM tree.
+
+Built from any snapshot tree_crawler can read (JSON lines or the legacy aspen_data_tree.txt
+dump). It has two parts:
+- a trie on the upper-cased path segments, for prefix, child and glob queries;
+- a token index on node names, for word and fuzzy searches.
+
+All matching is case-insensitive. Like cheminfo_index, the built index is pickled next to the
+snapshot and reused while the snapshot is unchanged.
+'''
+import difflib
+import os
+import pickle
+import re
+from fnmatch import fnmatchcase
+
+from tree_crawler import load_records, split_path
+
+CACHE_VERSION = 1
+_TOKEN_SPLIT = re.compile(r'[^0-9A-Z]+')
+_PATH_ROW = None  # trie key holding the row of the path that ends at a node
+
+
+def _tokens(name):
+    return [token for token in _TOKEN_SPLIT.split(str(name).upper()) if token]
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class PathIndex:
+
+    def __init__(self, records):
+        self.paths = []
+        self.names = []
+        self.comp_status = []
+        for record in records:
+            if 'error' in record:
+                continue
+            self.paths.append('\\' + '\\'.join(split_path(record['path'])))
+            self.names.append(record.get('name') or split_path(record['path'])[-1])
+            self.comp_status.append(record.get('comp_status'))
+        self._build()
+
+    def _build(self):
+        self.row_of = {}
+        self.trie = {}
+        self.token_index = {}
+        for row, (path, name) in enumerate(zip(self.paths, self.names)):
+            self.row_of.setdefault(path.upper(), row)
+            node = self.trie
+            for segment in split_path(path.upper()):
+                node = node.setdefault(segment, {})
+            node.setdefault(_PATH_ROW, row)
+            for token in set(_tokens(name)):
+                self.token_index.setdefault(token, []).append(row)
+        self.vocabulary = sorted(self.token_index)
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path):
+        return cls(load_records(snapshot_path))
+
+    @classmethod
+    def load(cls, snapshot_path, cache_path=None):
+        '''Load from the binary cache if it matches the snapshot, otherwise rebuild and rewrite it.'''
+        cache_path = cache_path or os.path.splitext(snapshot_path)[0] + '.pidx'
+        signature = _source_signature(snapshot_path)
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                payload = pickle.load(cache_file)
+            if payload.get('version') == CACHE_VERSION and payload.get('source') == signature:
+                index = cls.__new__(cls)
+                index.__dict__.update(payload['state'])
+                return index
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError):
+            pass
+        index = cls.from_snapshot(snapshot_path)
+        try:
+            payload = {'version': CACHE_VERSION, 'source': signature, 'state': index.__dict__}
+            tmp_path = f'{cache_path}.tmp'
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump(payload, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f'could not write tree index cache {cache_path}.  error: {e}')
+        return index
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return self._normal(path) in self.row_of
+
+    @staticmethod
+    def _normal(path):
+        return '\\' + '\\'.join(split_path(str(path).upper()))
+
+    def _node(self, path):
+        node = self.trie
+        for segment in split_path(str(path).upper()):
+            node = node.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def _subtree_rows(self, node, rows, limit):
+        # explicit stack, children in insertion (snapshot) order
+        stack = [node]
+        while stack and (limit is None or len(rows) < limit):
+            current = stack.pop()
+            if _PATH_ROW in current:
+                rows.append(current[_PATH_ROW])
+            stack.extend(child for key, child in reversed(list(current.items())) if key is not _PATH_ROW)
+        return rows
+
+    def path(self, path):
+        '''The stored spelling of path, or None when it is not in the snapshot.'''
+        row = self.row_of.get(self._normal(path))
+        return None if row is None else self.paths[row]
+
+    def children(self, path):
+        node = self._node(path)
+        if node is None:
+            return []
+        return [self.paths[child[_PATH_ROW]] for key, child in node.items() if key is not _PATH_ROW and _PATH_ROW in child]
+
+    def prefix(self, prefix, limit=None):
+        '''
+        Paths starting with prefix, segment-wise: r'\\Data\\Prop' matches \\Data\\Properties and
+        everything below it; a trailing backslash restricts to descendants of a complete segment.
+        '''
+        segments = split_path(str(prefix).upper())
+        complete = str(prefix).endswith('\\') or len(segments) == 0
+        parent = self._node('\\'.join(segments if complete else segments[:-1]))
+        if parent is None:
+            return []
+        rows = []
+        if complete:
+            for key, child in parent.items():
+                if key is not _PATH_ROW:
+                    self._subtree_rows(child, rows, limit)
+        else:
+            for key, child in parent.items():
+                if key is not _PATH_ROW and key.startswith(segments[-1]):
+                    self._subtree_rows(child, rows, limit)
+        return [self.paths[row] for row in rows[:limit]]
+
+    def glob(self, pattern, limit=None):
+        r'''
+        Paths matching a segment-wise fnmatch pattern, e.g. r'\Data\Properties\Parameters\*\*-1';
+        a '**' segment matches any number of segments.
+        '''
+        segments = split_path(str(pattern).upper())
+        rows = []
+        stack = [(self.trie, 0)]
+        seen = set()
+        while stack and (limit is None or len(rows) < limit):
+            node, k = stack.pop()
+            if (id(node), k) in seen:
+                continue
+            seen.add((id(node), k))
+            if k == len(segments):
+                if _PATH_ROW in node:
+                    rows.append(node[_PATH_ROW])
+                continue
+            segment = segments[k]
+            children = [(key, child) for key, child in node.items() if key is not _PATH_ROW]
+            if segment == '**':
+                # zero segments, or one segment while staying on '**'
+                stack.extend((child, k) for _, child in reversed(children))
+                stack.append((node, k + 1))
+                continue
+            stack.extend((child, k + 1) for key, child in reversed(children) if fnmatchcase(key, segment))
+        return [self.paths[row] for row in dict.fromkeys(rows)]
+
+    def search(self, text, limit=None):
+        '''Paths whose name contains every word of text (whole tokens), shallowest first.'''
+        tokens = _tokens(text)
+        if len(tokens) == 0:
+            return []
+        rows = set(self.token_index.get(tokens[0], []))
+        for token in tokens[1:]:
+            rows.intersection_update(self.token_index.get(token, []))
+        ordered = sorted(rows, key=lambda row: (self.paths[row].count('\\'), row))
+        return [self.paths[row] for row in ordered[:limit]]
+
+    def fuzzy(self, query, limit=10, cutoff=0.6):
+        '''
+        (path, score) pairs for names close to query, best first. Candidates come from tokens
+        within difflib distance of the query's tokens; the score is the name similarity.
+        '''
+        query_tokens = _tokens(query)
+        query_text = ' '.join(query_tokens)
+        candidates = set()
+        for token in query_tokens:
+            for close in difflib.get_close_matches(token, self.vocabulary, n=8, cutoff=cutoff):
+                candidates.update(self.token_index[close])
+        scored = []
+        for row in candidates:
+            score = difflib.SequenceMatcher(None, query_text, ' '.join(_tokens(self.names[row]))).ratio()
+            if score >= cutoff:
+                scored.append((score, -self.paths[row].count('\\'), row))
+        scored.sort(reverse=True)
+        return [(self.paths[row], score) for score, _, row in scored[:limit]]
+
+    def resolve(self, query, cutoff=0.6):
+        '''
+        Best single path for query: an exact path, else the shallowest exact name match, else
+        the best fuzzy match. Returns None when nothing scores above cutoff.
+        '''
+        exact = self.path(query)
+        if exact is not None:
+            return exact
+        name = str(query).strip().upper()
+        named = [row for row in self.token_index.get((_tokens(name) or [''])[0], []) if self.names[row].upper() == name]
+        if len(named) > 0:
+            return self.paths[min(named, key=lambda row: (self.paths[row].count('\\'), row))]
+        matches = self.fuzzy(query, limit=1, cutoff=cutoff)
+        return matches[0][0] if matches else None
@@ -0,0 +1,163 @@
+'''
+Pure-component vapor pressure engine driven by Apex temperature-dependent (TDep) coefficient sets.
+
+Every supported correlation is mapped onto Aspen's extended Antoine (PLXANT) form in SI units,
+
+    ln P[Pa] = C1 + C2 / (T + C3) + C4 T + C5 ln T + C6 T^C7      Tmin <= T[K] <= Tmax
+
+so any mix of PLXANT, DIPPR 101 and classic Antoine components is evaluated for an
+(n_T x n_components) grid in one vectorized expression.
+'''
+import numpy as np
+
+LN10 = np.log(10.0)
+PA_PER_MMHG = 133.322368
+KELVIN_OFFSET = 273.15
+
+# column layout of a normalized coefficient row
+N_COEFFS = 9  # C1..C7, Tmin, Tmax
+
+# attribute names on the sets returned by ChemInfo.getTDepCoeffSets(['VP'], session)
+TDEP_EQUATION_FIELD = 'Equation'
+TDEP_COEFF_FIELDS = tuple(f'C{k}' for k in range(1, 10))
+TDEP_TMIN_FIELD = 'Tmin'
+TDEP_TMAX_FIELD = 'Tmax'
+
+# spellings of the supported equations found in Apex, mapped to one canonical name
+_EQUATION_ALIASES = {
+    'PLXANT': 'PLXANT', 'EXTANTOINE': 'PLXANT', 'EXTENDEDANTOINE': 'PLXANT',
+    'DIPPR101': 'DIPPR101', 'DIPPR': 'DIPPR101', 'DIPPR-101': 'DIPPR101',
+    'ANTOINE': 'ANTOINE',
+}
+
+
+def _equation_name(equation):
+    '''Canonical name of a TDep equation (unknown equations are only upper-cased).'''
+    equation = str(equation or '').upper().replace(' ', '')
+    return _EQUATION_ALIASES.get(equation, equation)
+
+
+def plxant_coeffs(c1, c2, c3=0.0, c4=0.0, c5=0.0, c6=0.0, c7=0.0, t_min=0.0, t_max=np.inf):
+    '''Aspen PLXANT in SI units (K, Pa).'''
+    return np.array([c1, c2, c3, c4, c5, c6, c7, t_min, t_max], dtype=float)
+
+
+def dippr101_coeffs(a, b, c=0.0, d=0.0, e=0.0, t_min=0.0, t_max=np.inf):
+    '''DIPPR 101: ln P[Pa] = A + B/T + C ln T + D T^E.'''
+    return plxant_coeffs(a, b, 0.0, 0.0, c, d, e, t_min, t_max)
+
+
+def antoine_mmhg_celsius_coeffs(a, b, c, t_min=0.0, t_max=np.inf):
+    '''Classic Antoine log10 P[mmHg] = A - B / (T[C] + C), with the range given in K.'''
+    return plxant_coeffs(a * LN10 + np.log(PA_PER_MMHG), -b * LN10, c - KELVIN_OFFSET, t_min=t_min, t_max=t_max)
+
+
+def _value(coeff_set, field, default=0.0):
+    value = getattr(coeff_set, field, None)
+    return default if value is None else float(value)
+
+
+def coeffs_from_tdep_set(coeff_set):
+    '''Normalize one Apex TDep VP coefficient set; returns None for unsupported equations.'''
+    equation = _equation_name(getattr(coeff_set, TDEP_EQUATION_FIELD, ''))
+    c = [_value(coeff_set, field) for field in TDEP_COEFF_FIELDS]
+    if equation == 'PLXANT':
+        return plxant_coeffs(*c[:7], t_min=c[7], t_max=c[8] if c[8] > 0 else np.inf)
+    # Wagner sets (ln(P/Pc) = (Tc/T)(a tau + b tau^1.5 + c tau^3 + d tau^6)) have no PLXANT form and fall through to None
+    if equation == 'DIPPR101':
+        return dippr101_coeffs(*c[:5], t_min=c[5], t_max=c[6] if c[6] > 0 else np.inf)
+    if equation == 'ANTOINE':
+        return antoine_mmhg_celsius_coeffs(c[0], c[1], c[2],
+                                           t_min=_value(coeff_set, TDEP_TMIN_FIELD),
+                                           t_max=_value(coeff_set, TDEP_TMAX_FIELD, np.inf))
+    return None
+
+
+class VaporPressureEngine:
+
+    def __init__(self, coeffs, component_ids=None):
+        coeffs = np.atleast_2d(np.asarray(coeffs, dtype=float))
+        if coeffs.shape[1] != N_COEFFS:
+            raise ValueError(f'expected (n_components, {N_COEFFS}) coefficients, got {coeffs.shape}')
+        self.coeffs = coeffs
+        self.n_components = coeffs.shape[0]
+        self.component_ids = list(component_ids) if component_ids is not None else list(range(self.n_components))
+        c = coeffs.T
+        self._c1, self._c2, self._c3, self._c4, self._c5, self._c6, self._c7 = c[:7]
+        self.t_min, self.t_max = c[7], c[8]
+        self._has_power = bool(np.any(self._c6 != 0.0))
+        self._has_linear = bool(np.any(self._c4 != 0.0))
+        self._has_log = bool(np.any(self._c5 != 0.0))
+
+    def ln_psat(self, temp_k):
+        '''ln Psat[Pa]; temp_k of shape (n_T,) gives (n_T, n_components).'''
+        temp_k = np.asarray(temp_k, dtype=float).reshape(-1, 1)
+        ln_p = self._c1 + self._c2 / (temp_k + self._c3)
+        if self._has_linear:
+            ln_p = ln_p + self._c4 * temp_k
+        if self._has_log:
+            ln_p = ln_p + self._c5 * np.log(temp_k)
+        if self._has_power:
+            ln_p = ln_p + self._c6 * temp_k ** self._c7
+        return ln_p
+
+    def psat(self, temp_k):
+        return np.exp(self.ln_psat(temp_k))
+
+    def in_range(self, temp_k):
+        '''(n_T, n_components) mask of temperatures inside each correlation's validity range.'''
+        temp_k = np.asarray(temp_k, dtype=float).reshape(-1, 1)
+        return (temp_k >= self.t_min) & (temp_k <= self.t_max)
+
+    def psat_with_mask(self, temp_k):
+        return self.psat(temp_k), self.in_range(temp_k)
+
+    def subset(self, component_ids):
+        rows = [self.component_ids.index(component_id) for component_id in component_ids]
+        return VaporPressureEngine(self.coeffs[rows], component_ids=component_ids)
+
+
+# (ChemID, preferred equations) -> normalized coefficient row (None when Apex has no usable VP set)
+_vp_coeff_cache = {}
+
+
+def load_vapor_pressure_engine(chem_ids, session=None, preferred_equations=('PLXANT', 'DIPPR101', 'ANTOINE')):
+    '''
+    Engine for chem_ids with coefficients loaded from Apex in one session. Sets already loaded by
+    an earlier call with the same preferred_equations are reused; a lookup that fails is retried
+    next time. Components without a usable VP set get NaN coefficients.
+    '''
+    from emnengr_utils import _session_scope
+    from emnengr.apex.emnphysprop2 import ChemInfo
+
+    chem_ids = list(chem_ids)
+    preferred = tuple(dict.fromkeys(_equation_name(equation) for equation in preferred_equations))
+    rows_of = {chem_id: _vp_coeff_cache[chem_id, preferred] for chem_id in chem_ids if (chem_id, preferred) in _vp_coeff_cache}
+    missing = [chem_id for chem_id in dict.fromkeys(chem_ids) if chem_id not in rows_of]
+    if len(missing) > 0:
+        # supported equations that were not asked for rank after all preferred ones
+        rank = {equation: r for r, equation in enumerate(preferred)}
+        with _session_scope(session) as session:
+            for chem_id in missing:
+                best, best_rank = None, len(rank) + 1
+                try:
+                    component = ChemInfo.from_id(chem_id, session)
+                    coeff_sets = component.getTDepCoeffSets(['VP'], session) or []
+                except Exception as e:
+                    print(f'could not load VP coefficients for ChemID {chem_id}.  error: {e}')
+                    rows_of[chem_id] = None
+                    continue
+                for coeff_set in coeff_sets:
+                    coeffs = coeffs_from_tdep_set(coeff_set)
+                    if coeffs is None:
+                        continue
+                    r = rank.get(_equation_name(getattr(coeff_set, TDEP_EQUATION_FIELD, '')), len(rank))
+                    if r < best_rank:
+                        best, best_rank = coeffs, r
+                rows_of[chem_id] = _vp_coeff_cache[chem_id, preferred] = best
+    rows = [rows_of[chem_id] if rows_of[chem_id] is not None else np.full(N_COEFFS, np.nan) for chem_id in chem_ids]
+    return VaporPressureEngine(np.array(rows), component_ids=chem_ids)
+
+
+def clear_vapor_pressure_cache():
+    _vp_coeff_cache.clear()
@@ -0,0 +1,434 @@
+'''
+Gamma-phi VLE solvers vectorized over whole grids of (T or P, x) points.
+
+    y_i phi_i(T, P, y) P = x_i gamma_i(T, x) phi_i^sat(T) Psat_i(T)
+
+The property models are the NumPy engines in this repo: wilson.WilsonModel (or any object with
+gammas(T, x)), vapor_pressure.VaporPressureEngine (psat(T)) and optionally hoc.HOCModel
+(phi(T, P, y) and phi_pure(T, P)). Temperatures are in K and pressures in Pa. Every solver works
+on all points at once, only re-evaluating points that have not converged yet, and returns
+per-point convergence masks and iteration counts.
+'''
+import numpy as np
+
+DEFAULT_T_BOUNDS = (150.0, 800.0)
+_N_T_SCAN = 32
+
+
+class GammaPhiModel:
+
+    def __init__(self, vapor_pressure, activity=None, fugacity=None):
+        self.vapor_pressure = vapor_pressure
+        self.activity = activity
+        self.fugacity = fugacity
+        self.n_components = vapor_pressure.n_components
+
+    def gammas(self, temp_k, x):
+        if self.activity is None:
+            return np.ones_like(x)
+        return self.activity.gammas(temp_k, x)
+
+    def psat(self, temp_k):
+        return self.vapor_pressure.psat(temp_k)
+
+    def phi(self, temp_k, pressure_pa, y):
+        if self.fugacity is None:
+            return np.ones_like(y)
+        return self.fugacity.phi(temp_k, pressure_pa, y)
+
+    def phi_sat(self, temp_k, psat):
+        if self.fugacity is None:
+            return np.ones_like(psat)
+        return self.fugacity.phi_pure(temp_k, psat)
+
+    def liquid_fugacity(self, temp_k, x):
+        '''x_i gamma_i phi_i^sat Psat_i, the pressure-independent part of the liquid fugacity.'''
+        psat = self.psat(temp_k)
+        return x * self.gammas(temp_k, x) * psat * self.phi_sat(temp_k, psat)
+
+
+def _as_points(values, x):
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    values = np.broadcast_to(np.asarray(values, dtype=float).ravel(), (x.shape[0],)).copy()
+    return values, x
+
+
+def bubble_pressure(model, temp_k, x, tol=1e-9, max_iter=50):
+    '''
+    Bubble pressure and vapor composition for every (temp_k[p], x[p]).
+    Gamma and Psat do not depend on P, so only the phi loop is iterated.
+    '''
+    temp_k, x = _as_points(temp_k, x)
+    n_points = x.shape[0]
+    f_liq = model.liquid_fugacity(temp_k, x)
+    pressure = f_liq.sum(axis=1)
+    y = f_liq / pressure[:, np.newaxis]
+    phi = np.ones_like(y)
+    iterations = np.ones(n_points, dtype=int)
+    converged = np.isfinite(pressure)
+    if model.fugacity is not None:
+        converged[:] = False
+        for iteration in range(1, max_iter + 1):
+            active = np.flatnonzero(~converged & np.isfinite(pressure))
+            if active.size == 0:
+                break
+            phi_a = model.phi(temp_k[active], pressure[active], y[active])
+            f_a = f_liq[active] / phi_a
+            p_new = f_a.sum(axis=1)
+            done = np.abs(p_new - pressure[active]) <= tol * p_new
+            pressure[active] = p_new
+            y[active] = f_a / p_new[:, np.newaxis]
+            phi[active] = phi_a
+            iterations[active] = iteration
+            converged[active] = done
+    return {
+        'temperature_k': temp_k,
+        'pressure_pa': pressure,
+        'x': x,
+        'y': y,
+        'phi': phi,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def _initial_temperatures(model, pressure_pa, x, t_bounds, scan_fn):
+    # ideal-solution scan on a shared T grid gives a starting point and a bracket for every point
+    t_grid = np.linspace(t_bounds[0], t_bounds[1], _N_T_SCAN)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ln_f = np.log(scan_fn(t_grid, x)) - np.log(pressure_pa)[:, np.newaxis]
+    ln_f = np.where(np.isfinite(ln_f), ln_f, np.nan)
+    above = ln_f > 0.0
+    first_above = np.where(above.any(axis=1), above.argmax(axis=1), _N_T_SCAN - 1)
+    hi_idx = np.clip(first_above, 1, _N_T_SCAN - 1)
+    lo_idx = hi_idx - 1
+    rows = np.arange(x.shape[0])
+    f_lo, f_hi = ln_f[rows, lo_idx], ln_f[rows, hi_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.clip(f_lo / (f_lo - f_hi), 0.0, 1.0)
+    frac = np.where(np.isfinite(frac), frac, 0.5)
+    t_lo, t_hi = t_grid[lo_idx], t_grid[hi_idx]
+    return t_lo + frac * (t_hi - t_lo), np.full(x.shape[0], t_bounds[0]), np.full(x.shape[0], t_bounds[1])
+
+
+def _ideal_bubble_scan(model, t_grid, x):
+    return x @ model.psat(t_grid).T
+
+
+def _newton_temperature(model, pressure_pa, x, residual_fn, t_guess, t_bounds, tol, max_iter, scan_fn):
+    '''
+    Safeguarded Newton on residual_fn(T, P, x, state, settle) -> (f, state, settled), f increasing
+    in T. state carries the composition of the other phase between iterations; settled marks the
+    rows where it converged at that T, so that f can be trusted to move the bracket. The slope
+    only needs an approximate f, so it is taken with settle=False (one substitution pass).
+    '''
+    n_points = x.shape[0]
+    if t_guess is None:
+        temp, t_lo, t_hi = _initial_temperatures(model, pressure_pa, x, t_bounds, scan_fn)
+    else:
+        temp = np.broadcast_to(np.asarray(t_guess, dtype=float).ravel(), (n_points,)).copy()
+        t_lo, t_hi = np.full(n_points, t_bounds[0]), np.full(n_points, t_bounds[1])
+    state = np.full(x.shape, np.nan)
+    has_state = np.zeros(n_points, dtype=bool)
+    converged = np.zeros(n_points, dtype=bool)
+    finished = np.zeros(n_points, dtype=bool)
+    iterations = np.zeros(n_points, dtype=int)
+    for iteration in range(1, max_iter + 1):
+        active = np.flatnonzero(~finished)
+        if active.size == 0:
+            break
+        t_a = temp[active]
+        prev = state[active] if has_state[active].all() else None
+        f_a, s_a, settled = residual_fn(t_a, pressure_pa[active], x[active], prev, True)
+        dt = 1e-4 * t_a
+        f_d, _, _ = residual_fn(t_a + dt, pressure_pa[active], x[active], s_a, False)
+        slope = (f_d - f_a) / dt
+        state[active] = s_a
+        has_state[active] = True
+
+        # an unsettled composition can give f the wrong sign, so only settled points move the bracket
+        too_hot = settled & (f_a > 0.0)
+        too_cold = settled & (f_a < 0.0)
+        t_hi[active] = np.where(too_hot, np.minimum(t_hi[active], t_a), t_hi[active])
+        t_lo[active] = np.where(too_cold, np.maximum(t_lo[active], t_a), t_lo[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = f_a / slope
+        # judged on the raw Newton step: at the root the step is below float resolution, so t_new
+        # can land exactly on a bound that was just moved to t_a and be replaced by a bisection
+        done = settled & np.isfinite(f_a) & (np.abs(f_a) < tol) & ~(np.abs(step) >= 1e3 * tol * t_a)
+        t_new = t_a - step
+        bad_step = ~np.isfinite(t_new) | ~(slope > 0.0) | (t_new <= t_lo[active]) | (t_new >= t_hi[active])
+        t_new = np.where(bad_step, 0.5 * (t_lo[active] + t_hi[active]), t_new)
+
+        # a bracket that collapsed on a settled point means there is no solution inside t_bounds;
+        # if the composition is still moving, stay at the midpoint and keep iterating it
+        narrow = ~done & (t_hi[active] - t_lo[active] < 1e-9 * t_a)
+        collapsed = narrow & settled
+        temp[active] = np.where(done, t_a, np.where(collapsed, np.nan, t_new))
+        iterations[active] = iteration
+        converged[active] = done
+        finished[active] = done | collapsed
+    return temp, state, converged, iterations
+
+
+def _bubble_residual(model, inner_iter=20, inner_tol=1e-10):
+    # y (and so phi) is converged at each trial T, as x is in _dew_residual, so the residual is a
+    # function of T alone and its sign can be trusted for the bracket
+    def residual(temp_k, pressure_pa, x, y_prev, settle=True):
+        f_liq = model.liquid_fugacity(temp_k, x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = f_liq / f_liq.sum(axis=1, keepdims=True) if y_prev is None else y_prev.copy()
+            s = np.full(x.shape[0], np.nan)
+            settled = np.zeros(x.shape[0], dtype=bool)
+            rows = np.arange(x.shape[0])
+            for _ in range(inner_iter if model.fugacity is not None and settle else 1):
+                phi = model.phi(temp_k[rows], pressure_pa[rows], y[rows])
+                k_x = f_liq[rows] / (phi * pressure_pa[rows, np.newaxis])
+                s[rows] = k_x.sum(axis=1)
+                y_new = k_x / s[rows, np.newaxis]
+                delta = np.abs(y_new - y[rows]).max(axis=1)
+                y[rows] = y_new
+                still = ~(delta < inner_tol)
+                settled[rows[~still]] = True
+                rows = rows[still & np.isfinite(delta)]
+                if rows.size == 0:
+                    break
+            if model.fugacity is None:
+                settled[:] = True
+            return np.log(s), y, settled
+    return residual
+
+
+def bubble_temperature(model, pressure_pa, x, t_guess=None, t_bounds=DEFAULT_T_BOUNDS, tol=1e-10, max_iter=100):
+    '''
+    Bubble temperature and vapor composition for every (pressure_pa[p], x[p]): solves
+    ln sum_i K_i x_i = 0 by Newton with a bisection safeguard inside t_bounds. y (and so phi)
+    is converged at every trial T, starting from the previous iterate.
+    '''
+    pressure_pa, x = _as_points(pressure_pa, x)
+    temp, y, converged, iterations = _newton_temperature(
+        model, pressure_pa, x, _bubble_residual(model), t_guess, t_bounds, tol, max_iter,
+        lambda t_grid, x_pts: _ideal_bubble_scan(model, t_grid, x_pts),
+    )
+    return {
+        'temperature_k': temp,
+        'pressure_pa': pressure_pa,
+        'x': x,
+        'y': y,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def dew_pressure(model, temp_k, y, tol=1e-9, max_iter=100):
+    '''
+    Dew pressure and liquid composition for every (temp_k[p], y[p]) by successive substitution
+    on x (through gamma) and P (through phi).
+    '''
+    temp_k, y = _as_points(temp_k, y)
+    n_points = y.shape[0]
+    psat = model.psat(temp_k)
+    phi_sat = model.phi_sat(temp_k, psat)
+    f_pure = psat * phi_sat
+    pressure = 1.0 / (y / f_pure).sum(axis=1)
+    x = y * pressure[:, np.newaxis] / f_pure
+    x /= x.sum(axis=1, keepdims=True)
+    converged = np.zeros(n_points, dtype=bool)
+    finished = ~np.isfinite(pressure)
+    iterations = np.zeros(n_points, dtype=int)
+    for iteration in range(1, max_iter + 1):
+        active = np.flatnonzero(~finished)
+        if active.size == 0:
+            break
+        t_a, y_a, x_a = temp_k[active], y[active], x[active]
+        gamma = model.gammas(t_a, x_a)
+        phi = model.phi(t_a, pressure[active], y_a)
+        y_over_k = y_a * phi / (gamma * f_pure[active])
+        p_new = 1.0 / y_over_k.sum(axis=1)
+        x_new = y_over_k * p_new[:, np.newaxis]
+        done = (np.abs(p_new - pressure[active]) <= tol * p_new) & (np.abs(x_new - x_a).max(axis=1) <= tol ** 0.5)
+        pressure[active] = p_new
+        x[active] = x_new
+        iterations[active] = iteration
+        converged[active] = done
+        finished[active] = done | ~np.isfinite(p_new)
+    return {
+        'temperature_k': temp_k,
+        'pressure_pa': pressure,
+        'x': x,
+        'y': y,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def _dew_residual(model, inner_iter=20, inner_tol=1e-10):
+    # x is converged at each trial T so the residual is a function of T alone and the bracket stays valid
+    def residual(temp_k, pressure_pa, y, x_prev, settle=True):
+        psat = model.psat(temp_k)
+        f_pure = psat * model.phi_sat(temp_k, psat)
+        phi = model.phi(temp_k, pressure_pa, y)
+        x = y / f_pure if x_prev is None else x_prev
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = x / x.sum(axis=1, keepdims=True)
+            s = np.full(y.shape[0], np.nan)
+            settled = np.zeros(y.shape[0], dtype=bool)
+            rows = np.arange(y.shape[0])
+            for _ in range(inner_iter if settle else 1):
+                y_over_k = y[rows] * phi[rows] * pressure_pa[rows, np.newaxis] / (model.gammas(temp_k[rows], x[rows]) * f_pure[rows])
+                s[rows] = y_over_k.sum(axis=1)
+                x_new = y_over_k / s[rows, np.newaxis]
+                delta = np.abs(x_new - x[rows]).max(axis=1)
+                x[rows] = x_new
+                still = ~(delta < inner_tol)
+                settled[rows[~still]] = True
+                rows = rows[still & np.isfinite(delta)]
+                if rows.size == 0:
+                    break
+            return -np.log(s), x, settled
+    return residual
+
+
+def _ideal_dew_scan(model, t_grid, y):
+    with np.errstate(divide='ignore'):
+        return 1.0 / (y @ (1.0 / model.psat(t_grid)).T)
+
+
+def dew_temperature(model, pressure_pa, y, t_guess=None, t_bounds=DEFAULT_T_BOUNDS, tol=1e-10, max_iter=100):
+    '''
+    Dew temperature and liquid composition for every (pressure_pa[p], y[p]): solves
+    ln sum_i y_i / K_i = 0 with the same safeguarded Newton as bubble_temperature.
+    '''
+    pressure_pa, y = _as_points(pressure_pa, y)
+    temp, x, converged, iterations = _newton_temperature(
+        model, pressure_pa, y, _dew_residual(model), t_guess, t_bounds, tol, max_iter,
+        lambda t_grid, y_pts: _ideal_dew_scan(model, t_grid, y_pts),
+    )
+    return {
+        'temperature_k': temp,
+        'pressure_pa': pressure_pa,
+        'x': x,
+        'y': y,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def rachford_rice(z, k, tol=1e-12, max_iter=100):
+    '''
+    Vapor fraction beta for every row of (z, K): root of sum z (K - 1) / (1 + beta (K - 1)) = 0.
+    Newton with a bisection safeguard inside the asymptote window
+    (1 / (1 - K_max), 1 / (1 - K_min)), so it also converges for extreme K values.
+    Rows with all K >= 1 or all K <= 1 return +inf / -inf. Returns (beta, converged).
+    '''
+    z = np.atleast_2d(np.asarray(z, dtype=float))
+    k = np.atleast_2d(np.asarray(k, dtype=float))
+    km1 = k - 1.0
+    k_max, k_min = k.max(axis=1), k.min(axis=1)
+    n_points = z.shape[0]
+    beta = np.full(n_points, np.nan)
+    converged = np.zeros(n_points, dtype=bool)
+    all_vapor = k_min >= 1.0
+    all_liquid = k_max <= 1.0
+    beta[all_vapor] = np.inf
+    beta[all_liquid & ~all_vapor] = -np.inf
+    converged[all_vapor | all_liquid] = True
+    two_sided = ~(all_vapor | all_liquid) & np.isfinite(km1).all(axis=1)
+    idx = np.flatnonzero(two_sided)
+    if idx.size == 0:
+        return beta, converged
+    lo = 1.0 / (1.0 - k_max[idx])
+    hi = 1.0 / (1.0 - k_min[idx])
+    b = 0.5 * (lo + hi)
+    zk, kk = z[idx], km1[idx]
+    done = np.zeros(idx.size, dtype=bool)
+    for _ in range(max_iter):
+        denom = 1.0 + b[:, None] * kk
+        g = (zk * kk / denom).sum(axis=1)
+        dg = -(zk * kk ** 2 / denom ** 2).sum(axis=1)
+        # g decreases in beta: g > 0 means the root lies above b
+        lo = np.where(g > 0.0, b, lo)
+        hi = np.where(g > 0.0, hi, b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b_new = b - g / dg
+        outside = ~np.isfinite(b_new) | (b_new <= lo) | (b_new >= hi)
+        b_new = np.where(outside, 0.5 * (lo + hi), b_new)
+        done = np.abs(b_new - b) <= tol * np.maximum(1.0, np.abs(b_new))
+        b = b_new
+        if done.all():
+            break
+    beta[idx] = b
+    converged[idx] = done
+    return beta, converged
+
+
+def tp_flash(model, temp_k, pressure_pa, z, tol=1e-10, max_iter=200):
+    '''
+    Isothermal flash for every (temp_k[p], pressure_pa[p], z[p]) by successive substitution on
+    K = gamma phi_sat Psat / (phi P), with a Rachford-Rice solve each pass. beta is the vapor
+    fraction clipped to [0, 1]; two_phase marks points that actually split.
+    '''
+    z = np.atleast_2d(np.asarray(z, dtype=float))
+    n_points = z.shape[0]
+    temp_k = np.broadcast_to(np.asarray(temp_k, dtype=float).ravel(), (n_points,)).copy()
+    pressure_pa = np.broadcast_to(np.asarray(pressure_pa, dtype=float).ravel(), (n_points,)).copy()
+    psat = model.psat(temp_k)
+    f_pure = psat * model.phi_sat(temp_k, psat)
+    ln_k = np.log(f_pure / pressure_pa[:, np.newaxis])
+    beta = np.zeros(n_points)
+    x, y = z.copy(), z.copy()
+    converged = np.zeros(n_points, dtype=bool)
+    finished = ~np.isfinite(ln_k).all(axis=1)
+    iterations = np.zeros(n_points, dtype=int)
+    for iteration in range(1, max_iter + 1):
+        active = np.flatnonzero(~finished)
+        if active.size == 0:
+            break
+        z_a, k_a = z[active], np.exp(ln_k[active])
+        b_raw, _ = rachford_rice(z_a, k_a)
+        b_a = np.clip(b_raw, 0.0, 1.0)
+        x_a = z_a / (1.0 + b_a[:, None] * (k_a - 1.0))
+        y_a = k_a * x_a
+        # outside the two-phase window keep the incipient phase composition for the next K update
+        x_a /= x_a.sum(axis=1, keepdims=True)
+        y_a /= y_a.sum(axis=1, keepdims=True)
+        t_a, p_a = temp_k[active], pressure_pa[active]
+        ln_k_new = np.log(model.gammas(t_a, x_a) * f_pure[active] / (model.phi(t_a, p_a, y_a) * p_a[:, None]))
+        done = np.abs(ln_k_new - ln_k[active]).max(axis=1) <= tol ** 0.5
+        ln_k[active] = ln_k_new
+        beta[active], x[active], y[active] = b_a, x_a, y_a
+        iterations[active] = iteration
+        converged[active] = done
+        finished[active] = done | ~np.isfinite(ln_k_new).all(axis=1)
+    two_phase = converged & (beta > 0.0) & (beta < 1.0)
+    return {
+        'temperature_k': temp_k,
+        'pressure_pa': pressure_pa,
+        'z': z,
+        'beta': beta,
+        'x': x,
+        'y': y,
+        'k': np.exp(ln_k),
+        'two_phase': two_phase,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def load_gamma_phi_model(chem_ids, databank_name_list=None, fugacity=None, session=None):
+    '''
+    Wilson + vapor-pressure GammaPhiModel for chem_ids with all parameters loaded from Apex in one
+    session. fugacity is an optional vapor model (e.g. hoc.HOCModel); without it the vapor is ideal.
+    '''
+    from emnengr_utils import _session_scope
+    from vapor_pressure import load_vapor_pressure_engine
+    from wilson import load_wilson_model
+
+    chem_ids = list(chem_ids)
+    with _session_scope(session) as session:
+        activity, missing = load_wilson_model(chem_ids, databank_name_list=databank_name_list, session=session)
+        vapor_pressure = load_vapor_pressure_engine(chem_ids, session=session)
+    if missing.any():
+        pairs = [(chem_ids[i], chem_ids[j]) for i, j in zip(*np.nonzero(np.triu(missing)))]
+        print(f'no Wilson coefficients for pairs {pairs}; treating them as ideal')
+    return GammaPhiModel(vapor_pressure, activity=activity, fugacity=fugacity)
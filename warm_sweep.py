@@ -0,0 +1,139 @@
+'''
+Warm-start sweeps: run cases in one Aspen Plus instance without reinitialize() between them.
+
+Cases are ordered so consecutive points are close. serpentine walks a grid back and forth
+along the inner axes; nearest is a greedy nearest-neighbour tour for scattered cases. Each case
+then starts from the previous converged solution. The instance is only reinitialized before the
+first case, after a failure, and for one cold retry of a case that failed warm. Every case records
+its run time and, if an iterations callable is given, the solver iterations.
+'''
+import time
+
+import numpy as np
+
+
+def _case_vector(case, keys):
+    '''Flatten the numeric values of case[key] for every key (dicts and lists included).'''
+    values = []
+    for key in keys:
+        value = case[key]
+        if isinstance(value, dict):
+            values.extend(float(v) for _, v in sorted(value.items()))
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            values.extend(float(v) for v in np.ravel(value))
+        else:
+            values.append(float(value))
+    return values
+
+
+def _scaled_points(cases, keys):
+    points = np.array([_case_vector(case, keys) for case in cases], dtype=float)
+    span = points.max(axis=0) - points.min(axis=0)
+    return (points - points.min(axis=0)) / np.where(span > 0.0, span, 1.0)
+
+
+def serpentine_order(cases, keys):
+    '''Sort by keys with the direction of each inner key flipped on every other outer group.'''
+    def order(indices, depth, descending):
+        if depth == len(keys) or len(indices) <= 1:
+            return indices
+        groups = {}
+        for i in indices:
+            groups.setdefault(tuple(_case_vector(cases[i], [keys[depth]])), []).append(i)
+        ordered = []
+        for g, value in enumerate(sorted(groups, reverse=descending)):
+            ordered.extend(order(groups[value], depth + 1, g % 2 == 1))
+        return ordered
+    return order(list(range(len(cases))), 0, False)
+
+
+def nearest_neighbor_order(cases, keys):
+    '''Greedy tour from the lowest case, always moving to the closest unvisited one (keys scaled to [0, 1]).'''
+    points = _scaled_points(cases, keys)
+    remaining = np.ones(len(cases), dtype=bool)
+    current = int(np.lexsort(points.T[::-1])[0])
+    tour = [current]
+    remaining[current] = False
+    for _ in range(len(cases) - 1):
+        distance = np.where(remaining, np.abs(points - points[current]).sum(axis=1), np.inf)
+        current = int(np.argmin(distance))
+        tour.append(current)
+        remaining[current] = False
+    return tour
+
+
+def order_cases(cases, keys=None, method='serpentine'):
+    '''Indices of cases in run order; keys default to every key of the first case.'''
+    cases = list(cases)
+    if len(cases) == 0:
+        return []
+    keys = list(cases[0]) if keys is None else list(keys)
+    if method == 'serpentine':
+        return serpentine_order(cases, keys)
+    if method == 'nearest':
+        return nearest_neighbor_order(cases, keys)
+    if method is None:
+        return list(range(len(cases)))
+    raise ValueError(f'unknown ordering {method!r}; use serpentine, nearest or None')
+
+
+def _default_converged(result):
+    if result is None:
+        return False
+    try:
+        return bool(np.all(np.isfinite(np.asarray(result, dtype=float))))
+    except (TypeError, ValueError):
+        return True
+
+
+def run_warm_sweep(sim, cases, run_case, keys=None, ordering='serpentine', converged=None, iterations=None,
+                   retry_cold=True):
+    '''
+    Run run_case(sim, case) for every case in warm-start order. run_case must not call
+    sim.reinitialize() itself. converged(result) decides success (default: no exception and a
+    finite result). iterations(sim), if given, is read after each run. Returns (records in
+    original case order, stats). Each record has index, case, result, converged, reinitialized,
+    retried_cold, run_s and iterations.
+    '''
+    cases = list(cases)
+    converged = converged or _default_converged
+    records = [None] * len(cases)
+    stats = {'cases': len(cases), 'failed': 0, 'reinitializations': 0, 'cold_retries': 0,
+             'warm_run_s': 0.0, 'cold_run_s': 0.0, 'warm_cases': 0, 'cold_cases': 0, 'elapsed_s': 0.0}
+    start = time.perf_counter()
+    need_reinit = True
+
+    def attempt(case, reinit):
+        if reinit:
+            sim.reinitialize()
+            stats['reinitializations'] += 1
+        t0 = time.perf_counter()
+        try:
+            result = run_case(sim, case)
+            ok = converged(result)
+        except Exception as e:
+            print(f'case {case} failed.  error: {e}')
+            result, ok = None, False
+        run_s = time.perf_counter() - t0
+        stats['cold_run_s' if reinit else 'warm_run_s'] += run_s
+        stats['cold_cases' if reinit else 'warm_cases'] += 1
+        n_iter = iterations(sim) if iterations is not None else None
+        return result, ok, run_s, n_iter
+
+    for index in order_cases(cases, keys, ordering):
+        case = cases[index]
+        result, ok, run_s, n_iter = attempt(case, need_reinit)
+        record = {'index': index, 'case': case, 'result': result, 'converged': ok, 'reinitialized': need_reinit,
+                  'retried_cold': False, 'run_s': run_s, 'iterations': n_iter}
+        if not ok and retry_cold and not need_reinit:
+            # a warm start that fails gets one attempt from a clean state
+            stats['cold_retries'] += 1
+            result, ok, retry_s, n_iter = attempt(case, True)
+            record.update(result=result, converged=ok, retried_cold=True, run_s=run_s + retry_s, iterations=n_iter)
+        stats['failed'] += not ok
+        need_reinit = not ok
+        records[index] = record
+    stats['elapsed_s'] = time.perf_counter() - start
+    for mode in ('warm', 'cold'):
+        stats[f'mean_{mode}_run_s'] = stats[f'{mode}_run_s'] / stats[f'{mode}_cases'] if stats[f'{mode}_cases'] else None
+    return records, stats
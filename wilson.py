@@ -0,0 +1,161 @@
+'''
+Wilson activity-coefficient model evaluated with NumPy.
+
+Uses Aspen's temperature-dependent form of the Wilson parameter
+
+    ln A_ij = a_ij + b_ij / T + c_ij ln T + d_ij T + e_ij / T^2      (T in K)
+
+    ln gamma_i = 1 - ln(sum_j x_j A_ij) - sum_k x_k A_ki / sum_j x_j A_kj
+
+and evaluates gammas for N components over any number of (T, x) points in one call.
+Coefficients come from Apex BinCoeffSet/BinCoeff rows (see load_wilson_model) or can be passed in directly.
+'''
+import numpy as np
+
+WILSON_TERMS = ('a', 'b', 'c', 'd', 'e')
+
+# BinCoeff attribute names holding each term for the (i, j) and (j, i) directions of a coefficient set
+WILSON_APEX_FIELDS = {
+    'a': ('A_ij', 'A_ji'),
+    'b': ('B_ij', 'B_ji'),
+    'c': ('C_ij', 'C_ji'),
+    'd': ('D_ij', 'D_ji'),
+    'e': ('E_ij', 'E_ji'),
+}
+WILSON_APEX_T_LIMITS = ('Tlower', 'Tupper')
+
+WILSON_DATABANKS = ['ASPEN VLE-IG', 'ASPEN VLE-HOC', 'ASPEN VLE-RK']
+
+
+class WilsonModel:
+
+    def __init__(self, a, b=None, c=None, d=None, e=None, t_lower=None, t_upper=None, component_ids=None):
+        a = np.asarray(a, dtype=float)
+        n = a.shape[0]
+        if a.shape != (n, n):
+            raise ValueError(f'Wilson parameters must be square, got {a.shape}')
+        self.n_components = n
+        self.component_ids = list(component_ids) if component_ids is not None else list(range(n))
+        self.terms = {}
+        for term, values in zip(WILSON_TERMS, (a, b, c, d, e)):
+            values = np.zeros((n, n)) if values is None else np.array(values, dtype=float)
+            np.fill_diagonal(values, 0.0)
+            self.terms[term] = values
+        self.t_lower = np.full((n, n), -np.inf) if t_lower is None else np.asarray(t_lower, dtype=float)
+        self.t_upper = np.full((n, n), np.inf) if t_upper is None else np.asarray(t_upper, dtype=float)
+        # the c, d and e terms are usually zero, so skip them when they are
+        self._active = [term for term in WILSON_TERMS if np.any(self.terms[term] != 0.0)]
+
+    def ln_lambdas(self, temp_k):
+        '''ln A_ij for each temperature: shape (n_T, n, n).'''
+        temp_k = np.asarray(temp_k, dtype=float).reshape(-1, 1, 1)
+        ln_a = np.zeros((temp_k.shape[0], self.n_components, self.n_components))
+        for term in self._active:
+            if term == 'a':
+                ln_a += self.terms['a']
+            elif term == 'b':
+                ln_a += self.terms['b'] / temp_k
+            elif term == 'c':
+                ln_a += self.terms['c'] * np.log(temp_k)
+            elif term == 'd':
+                ln_a += self.terms['d'] * temp_k
+            else:
+                ln_a += self.terms['e'] / temp_k ** 2
+        return ln_a
+
+    def lambdas(self, temp_k):
+        return np.exp(self.ln_lambdas(temp_k))
+
+    def ln_gammas(self, temp_k, x):
+        '''
+        ln gamma for points (temp_k[p], x[p]): temp_k is a scalar or shape (n_points,), x is (n_points, n).
+        A scalar temperature is applied to every composition.
+        '''
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        temp_k = np.asarray(temp_k, dtype=float).ravel()
+        lam = self.lambdas(temp_k)
+        if temp_k.size == 1:
+            lam_x = x @ lam[0].T
+            ratio = x / lam_x
+            return 1.0 - np.log(lam_x) - ratio @ lam[0]
+        lam_x = np.einsum('pij,pj->pi', lam, x)
+        ratio = x / lam_x
+        return 1.0 - np.log(lam_x) - np.einsum('pk,pki->pi', ratio, lam)
+
+    def gammas(self, temp_k, x):
+        return np.exp(self.ln_gammas(temp_k, x))
+
+    def gammas_grid(self, temps_k, x):
+        '''Gammas for every temperature against every composition: shape (n_T, n_points, n).'''
+        temps_k = np.asarray(temps_k, dtype=float).ravel()
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        temp_points = np.repeat(temps_k, x.shape[0])
+        x_points = np.tile(x, (temps_k.size, 1))
+        return self.gammas(temp_points, x_points).reshape(temps_k.size, x.shape[0], self.n_components)
+
+    def in_range(self, temp_k):
+        '''True where every binary pair is inside its regressed temperature range.'''
+        temp_k = np.asarray(temp_k, dtype=float).reshape(-1, 1, 1)
+        return ((temp_k >= self.t_lower) & (temp_k <= self.t_upper)).all(axis=(1, 2))
+
+
+def _coeff_value(coeff_row, field):
+    value = getattr(coeff_row, field, None)
+    return 0.0 if value is None else float(value)
+
+
+def wilson_from_apex(chem_ids, coeff_sets_info, coeff_set_dict, fields=WILSON_APEX_FIELDS,
+                     t_limits=WILSON_APEX_T_LIMITS, databank_order=None):
+    '''
+    Build a WilsonModel for chem_ids from BinCoeffSet rows (get_mixture_coeff_sets_info /
+    get_coeff_sets_info) and the BinCoeff rows keyed by set ID (get_coeff_set_dict).
+    When a pair has sets in several databanks the first in databank_order (a list of DatabankIDs)
+    wins, otherwise the first set listed. Returns (model, missing) where missing[i, j] marks pairs
+    with no coefficients; those are left ideal (A_ij = 1).
+    '''
+    chem_ids = list(chem_ids)
+    position = {chem_id: i for i, chem_id in enumerate(chem_ids)}
+    n = len(chem_ids)
+    terms = {term: np.zeros((n, n)) for term in fields}
+    t_lower = np.full((n, n), -np.inf)
+    t_upper = np.full((n, n), np.inf)
+    missing = ~np.eye(n, dtype=bool)
+
+    rank = {bank_id: r for r, bank_id in enumerate(databank_order or [])}
+    ordered_sets = sorted(coeff_sets_info, key=lambda s: rank.get(getattr(s, 'DatabankID', None), len(rank)))
+    for coeff_set in ordered_sets:
+        i = position.get(coeff_set.ChemID_i)
+        j = position.get(coeff_set.ChemID_j)
+        coeff_row = coeff_set_dict.get(coeff_set.ID)
+        if i is None or j is None or i == j or coeff_row is None or not missing[i, j]:
+            continue
+        for term, (field_ij, field_ji) in fields.items():
+            terms[term][i, j] = _coeff_value(coeff_row, field_ij)
+            terms[term][j, i] = _coeff_value(coeff_row, field_ji)
+        low = getattr(coeff_row, t_limits[0], None)
+        high = getattr(coeff_row, t_limits[1], None)
+        if low is not None:
+            t_lower[i, j] = t_lower[j, i] = float(low)
+        if high is not None:
+            t_upper[i, j] = t_upper[j, i] = float(high)
+        missing[i, j] = missing[j, i] = False
+
+    model = WilsonModel(t_lower=t_lower, t_upper=t_upper, component_ids=chem_ids,
+                        **{term: terms[term] for term in WILSON_TERMS if term in terms})
+    return model, missing
+
+
+def load_wilson_model(chem_ids, databank_name_list=None, session=None):
+    '''Fetch Wilson coefficient sets for every pair in chem_ids from Apex in one session.'''
+    from emnengr_utils import _session_scope, get_databanks, get_mixture_coeff_sets_info, get_coeff_set_dict
+
+    databank_name_list = databank_name_list or WILSON_DATABANKS
+    with _session_scope(session) as session:
+        banks = get_databanks(databank_name_list=databank_name_list, description_contains='WILSON', session=session)
+        coeff_sets_info = get_mixture_coeff_sets_info(chem_ids, banks, session=session)
+        coeff_set_dict = get_coeff_set_dict(coeff_sets_info, session=session)
+    bank_ids = {bank.Name: bank.ID for bank in banks}
+    databank_order = [bank_ids[name] for name in databank_name_list if name in bank_ids]
+    return wilson_from_apex(chem_ids, coeff_sets_info, coeff_set_dict, databank_order=databank_order)